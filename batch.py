@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+"""
+Solve several seasons, or variants of them, at once. The route and exchange data is loaded and turned into facts once
+for every job in the manifest, then the jobs run on a process pool, each on its own number of cores.
+"""
+
+import argparse
+import datetime
+import functools
+import json
+import os
+import pathlib
+
+from tabulate import tabulate
+
+from run_scheduler.batch import load_manifest, job_statements, run_job, summary_rows, describe_overrides
+from run_scheduler.cache import prepare
+from run_scheduler.program import referenced_predicates
+from run_scheduler.routes import OVERLAP_CELL_SIZE, MIN_OVERLAP
+from run_scheduler.schedule import EXTRACTED_PREDICATES
+from run_scheduler.tuning import run_packed
+
+
+def main(args):
+    jobs = load_manifest(args.manifest)
+    cores = args.cores or os.cpu_count()
+    # One snapshot with every fact family any of the jobs can observe
+    predicates = None
+    if not args.all_facts:
+        predicates = set(EXTRACTED_PREDICATES)
+        for job in jobs:
+            predicates |= referenced_predicates(job_statements(job, args.distance_precision))
+        predicates = tuple(sorted(predicates))
+    snapshot = prepare(args.routes_table.expanduser(), args.routes_dir.expanduser(), args.exchanges.expanduser(),
+                       args.cache_dir, distance_precision=args.distance_precision,
+                       duration_precision=args.duration_precision, rebuild=args.rebuild_cache,
+                       pair_radius=args.pair_radius, pair_neighbors=args.pair_neighbors,
+                       overlap_cell_size=args.overlap_cell_size, min_overlap=args.min_overlap, predicates=predicates)
+    print(f"{'Loaded' if snapshot['cached'] else 'Prepared'} dataset snapshot {snapshot['facts_path']}")
+
+    start_time = datetime.datetime.now()
+    out_dir = args.out_dir or f"solutions/{args.manifest.stem}_{start_time.isoformat().replace(':', '_')}"
+    os.makedirs(out_dir, exist_ok=True)
+    print(f"Running {len(jobs)} jobs on {cores} cores")
+    run = functools.partial(run_job, facts_path=snapshot["facts_path"], distance_precision=args.distance_precision,
+                            duration_precision=args.duration_precision, out_dir=out_dir,
+                            ignore_tuning=args.ignore_tuning)
+    results = []
+    for job, future in run_packed(run, jobs, lambda job: job["cores"], cores):
+        try:
+            result = future.result()
+        except Exception as e:
+            result = {"name": job["name"], "season": job["season"], "overrides": describe_overrides(job),
+                      "cores": job["cores"], "status": f"error: {e}", "costs": None}
+        print(f"{result['name']}: {result['status']}, {result['costs']}")
+        results.append(result)
+
+    # In manifest order, whatever order they finished in
+    order = [job["name"] for job in jobs]
+    results.sort(key=lambda result: order.index(result["name"]))
+    with open(f"{out_dir}/summary.json", "w") as f:
+        json.dump({"manifest": str(args.manifest), "startTime": start_time.isoformat(), "cores": cores,
+                   "facts_path": str(snapshot["facts_path"]), "jobs": results}, f, indent=2)
+    headers, rows = summary_rows(results)
+    print(tabulate(rows, headers=headers, floatfmt=".2f"))
+    print(f"Saved the summary to {out_dir}/summary.json")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("manifest", type=pathlib.Path, help="YAML file listing the jobs to run")
+    parser.add_argument("routes_table", type=pathlib.Path, help="Path to YAML file of route data")
+    parser.add_argument("routes_dir", type=pathlib.Path, help="Path to directory containing route geojson files")
+    parser.add_argument("exchanges", type=pathlib.Path, help="Path to file containing exchange metadata")
+    parser.add_argument("--out-dir", type=pathlib.Path, help="Path to directory to save each job's solutions and the summary in")
+    parser.add_argument("--cores", type=int, help="Number of cores to share between the jobs (default: all)")
+    parser.add_argument("--distance-precision", default=2.0, type=float, help="Number of decimal places of fixed precision to convert distance terms to")
+    parser.add_argument("--duration-precision", default=0.0, type=float, help="Number of decimal places of fixed precision to convert distance terms to")
+    parser.add_argument("--pair-radius", type=float, help="Only generate routePairDistance facts for routes whose centroids are within this many miles")
+    parser.add_argument("--pair-neighbors", type=int, help="Only generate routePairDistance facts for each route's k nearest routes")
+    parser.add_argument("--overlap-cell-size", default=OVERLAP_CELL_SIZE, type=float, help="Side in miles of the grid cells route tracks are compared on for routeOverlap facts")
+    parser.add_argument("--min-overlap", default=MIN_OVERLAP, type=float, help="Only generate routeOverlap facts for routes sharing at least this fraction of the shorter one's track")
+    parser.add_argument("--cache-dir", default=pathlib.Path(".cache"), type=pathlib.Path, help="Path to directory to store dataset snapshots in")
+    parser.add_argument("--rebuild-cache", action="store_true", help="Regenerate the dataset snapshot even if the inputs haven't changed")
+    parser.add_argument("--all-facts", action="store_true", help="Generate every fact family from the route data, even those no rule refers to")
+    parser.add_argument("--ignore-tuning", action="store_true", help="Use the default solver configuration even if a season has been tuned")
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Compare the ways of turning a loaded dataset into facts for clingo: clorm Predicate instances (routes_to_facts),
+clingo symbols built directly (routes_to_symbols), both written out as text and loaded the way snapshots are, and
+symbols added straight through the backend.
+
+    python -m benchmarks.facts --scale large --pair-neighbors 50
+"""
+
+import argparse
+import pathlib
+import tempfile
+import time
+
+import clingo
+from tabulate import tabulate
+
+from benchmarks.run import DATA_DIR, SCALES
+from benchmarks.synthetic import generate_dataset
+from run_scheduler.routes import load_dataset, routes_to_facts, routes_to_symbols
+
+
+def add_symbols(ctrl, symbols, batch_size=10000):
+    """
+    Add symbols as facts through the backend, a batch per backend session.
+    """
+    for start in range(0, len(symbols), batch_size):
+        with ctrl.backend() as backend:
+            for symbol in symbols[start:start + batch_size]:
+                backend.add_rule([backend.add_atom(symbol)])
+
+
+def _via_text(build, legs, exchanges, fact_options, path):
+    start = time.perf_counter()
+    facts = build(legs, exchanges, **fact_options)
+    built = time.perf_counter()
+    with open(path, "w") as f:
+        for fact in facts:
+            f.write(f"{fact}.\n")
+    written = time.perf_counter()
+    ctrl = clingo.Control(["--warn=none"])
+    ctrl.load(str(path))
+    ctrl.ground([("base", [])])
+    loaded = time.perf_counter()
+    return {"build": built - start, "write": written - built, "load": loaded - written,
+            "facts": len(facts), "atoms": {str(atom.symbol) for atom in ctrl.symbolic_atoms}}
+
+
+def _via_backend(legs, exchanges, fact_options):
+    start = time.perf_counter()
+    symbols = routes_to_symbols(legs, exchanges, **fact_options)
+    built = time.perf_counter()
+    ctrl = clingo.Control(["--warn=none"])
+    add_symbols(ctrl, symbols)
+    ctrl.ground([("base", [])])
+    loaded = time.perf_counter()
+    return {"build": built - start, "write": 0.0, "load": loaded - built,
+            "facts": len(symbols), "atoms": {str(atom.symbol) for atom in ctrl.symbolic_atoms}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=SCALES, default="medium", help="Dataset size")
+    parser.add_argument("--seed", default=0, type=int, help="Seed for the synthetic data generator")
+    parser.add_argument("--distance-precision", default=2.0, type=float)
+    parser.add_argument("--pair-radius", type=float)
+    parser.add_argument("--pair-neighbors", type=int)
+    args = parser.parse_args()
+
+    data_dir = DATA_DIR / f"{args.scale}-{args.seed}"
+    if not (data_dir / "routes.yml").exists():
+        generate_dataset(data_dir, seed=args.seed, **SCALES[args.scale])
+    legs, exchanges = load_dataset(data_dir / "routes.yml", data_dir / "geojson", data_dir / "locations.geojson")
+    fact_options = {"distance_precision": args.distance_precision, "duration_precision": 0.0,
+                    "pair_radius": args.pair_radius, "pair_neighbors": args.pair_neighbors}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {
+            "clorm, text": _via_text(routes_to_facts, legs, exchanges, fact_options, pathlib.Path(tmp) / "clorm.lp"),
+            "symbols, text": _via_text(routes_to_symbols, legs, exchanges, fact_options,
+                                       pathlib.Path(tmp) / "symbols.lp"),
+            "symbols, backend": _via_backend(legs, exchanges, fact_options),
+        }
+    reference = results["clorm, text"]["atoms"]
+    rows = [[path, result["facts"], f"{result['build']:.2f}", f"{result['write']:.2f}", f"{result['load']:.2f}",
+             f"{result['build'] + result['write'] + result['load']:.2f}", result["atoms"] == reference]
+            for path, result in results.items()]
+    print(tabulate(rows, headers=["path", "facts", "build", "write", "load", "total", "same facts"]))
+
+
+if __name__ == "__main__":
+    main()
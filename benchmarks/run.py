@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Run the scheduler end to end on synthetic datasets of increasing size and record how long each stage takes.
+
+    python -m benchmarks.run --scales small medium
+    python -m benchmarks.run --compare benchmarks/results/a.json benchmarks/results/b.json
+"""
+
+import argparse
+import concurrent.futures
+import datetime
+import json
+import multiprocessing
+import os
+import pathlib
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import clingo
+from tabulate import tabulate
+
+from benchmarks.synthetic import generate_dataset
+from run_scheduler.cache import prepare
+from run_scheduler.domain import make_standard_func_ctx
+from run_scheduler.program import parse_season, add_program, referenced_predicates
+
+DATA_DIR = pathlib.Path("benchmarks/data")
+RESULTS_DIR = pathlib.Path("benchmarks/results")
+
+SCALES = {
+    "small": {"routes": 100, "exchanges": 20, "days": 10},
+    "medium": {"routes": 500, "exchanges": 60, "days": 12},
+    "large": {"routes": 2000, "exchanges": 150, "days": 26},
+    "xlarge": {"routes": 5000, "exchanges": 300, "days": 52},
+}
+
+# Stage timings compared between runs, in the order they happen
+METRICS = ["load", "build_facts", "ground", "first_model", "optimum", "peak_rss_mb"]
+
+
+def _peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS. Routes are parsed in child processes, so count those too
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return max(resource.getrusage(who).ru_maxrss for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)) / scale
+
+
+def _abandon_grounding(ground_timeout):
+    print(f"Grounding took longer than {ground_timeout}s, giving up on this scale", flush=True)
+    # Grounding can't be interrupted, so the process goes with it
+    os._exit(1)
+
+
+def run_scale(name, sizes, seed, season, time_limit, threads, distance_precision=2.0, duration_precision=0.0,
+              ground_timeout=None):
+    """
+    Generate (or reuse) the dataset for a scale, then build its facts, ground and solve it the way solve.py does.
+    Meant to run in a fresh process, so that peak RSS is this scale's alone. If grounding takes longer than
+    ground_timeout seconds, the process exits.
+    """
+    data_dir = DATA_DIR / f"{name}-{seed}"
+    paths = {"routes_table": data_dir / "routes.yml", "routes_dir": data_dir / "geojson",
+             "exchanges": data_dir / "locations.geojson", "season": data_dir / "season.lp"}
+    if not paths["routes_table"].exists():
+        paths = generate_dataset(data_dir, seed=seed, **sizes)
+    season_file = pathlib.Path(f"schedules/{season}.lp") if season else paths["season"]
+
+    statements = parse_season(season, season_file)
+    predicates = tuple(sorted(referenced_predicates(statements) | {("route", 4), ("routeDistance", 2)}))
+    with tempfile.TemporaryDirectory() as cache_dir:
+        snapshot = prepare(paths["routes_table"], paths["routes_dir"], paths["exchanges"], pathlib.Path(cache_dir),
+                           distance_precision=distance_precision, duration_precision=duration_precision,
+                           rebuild=True, predicates=predicates)
+        ctrl = clingo.Control([f"--parallel-mode={threads}", "--opt-mode=opt", "--warn=none"])
+        watchdog = threading.Timer(ground_timeout, _abandon_grounding, [ground_timeout]) if ground_timeout else None
+        if watchdog:
+            watchdog.start()
+        start = time.perf_counter()
+        add_program(ctrl, statements, snapshot["facts_path"])
+        ctrl.ground([("base", [])], context=make_standard_func_ctx())
+        ground = time.perf_counter() - start
+        if watchdog:
+            watchdog.cancel()
+
+    first_model = None
+    cost = None
+    models = 0
+
+    def on_model(model):
+        nonlocal first_model, cost, models
+        if first_model is None:
+            first_model = time.perf_counter() - solve_start
+        cost = list(model.cost)
+        models += 1
+
+    solve_start = time.perf_counter()
+    with ctrl.solve(on_model=on_model, async_=True) as handle:
+        finished = handle.wait(time_limit)
+        if not finished:
+            handle.cancel()
+        result = handle.get()
+    elapsed = time.perf_counter() - solve_start
+
+    return {
+        "scale": name,
+        **sizes,
+        "seed": seed,
+        "season": season or "synthetic",
+        "load": snapshot["timings"]["load"],
+        "build_facts": snapshot["timings"]["build_facts"],
+        "ground": ground,
+        "first_model": first_model,
+        "optimum": elapsed if finished and result.exhausted and models else None,
+        "unsatisfiable": bool(finished and result.unsatisfiable),
+        "cost": cost,
+        "models": models,
+        "atoms": len(ctrl.symbolic_atoms),
+        "rules": int(ctrl.statistics["problem"]["lp"]["rules"]),
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_suite(scales, seed, season, time_limit, threads, ground_timeout=None):
+    revision = _git_revision()
+    results = []
+    # A fresh interpreter per scale keeps memory measurements and clingo state independent
+    context = multiprocessing.get_context("spawn")
+    for name in scales:
+        print(f"Running {name}: {SCALES[name]}")
+        with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            try:
+                result = executor.submit(run_scale, name, SCALES[name], seed, season, time_limit, threads,
+                                         ground_timeout=ground_timeout).result()
+            except concurrent.futures.process.BrokenProcessPool:
+                # Grounding ran out of time, or the process died some other way. Either way there's nothing to time
+                result = {"scale": name, **SCALES[name], "seed": seed, "season": season or "synthetic",
+                          "failed": True, **{metric: None for metric in METRICS}}
+        print(tabulate([[metric, _format(result[metric])] for metric in METRICS]))
+        results.append(result)
+    out = {
+        "revision": revision,
+        "runTime": datetime.datetime.now().isoformat(),
+        "timeLimit": time_limit,
+        "threads": threads,
+        "results": results,
+    }
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    out_path = RESULTS_DIR / f"{revision}_{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    with open(out_path, "w") as f:
+        json.dump(out, f, indent=2)
+    print(f"Saved results to {out_path}")
+    return out
+
+
+def _format(value):
+    return "-" if value is None else f"{value:.2f}"
+
+
+def compare(baseline_path, candidate_path, threshold):
+    """
+    Print each metric of the scales two result files have in common, and whether it got worse by more than the
+    threshold ratio. Returns the number of regressions.
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    with open(candidate_path) as f:
+        candidate = json.load(f)
+    baseline_results = {result["scale"]: result for result in baseline["results"]}
+    rows = []
+    regressions = 0
+    for result in candidate["results"]:
+        before = baseline_results.get(result["scale"])
+        if before is None:
+            continue
+        for metric in METRICS:
+            old, new = before[metric], result[metric]
+            if old is None or new is None:
+                # A solve that stopped proving optimality within the limit is a regression
+                flag = "REGRESSION" if old is not None and new is None else ""
+                ratio = "-"
+            else:
+                ratio = new / old if old else float("inf") if new else 1.0
+                flag = "REGRESSION" if ratio > threshold else ""
+                ratio = f"{ratio:.2f}x"
+            regressions += flag != ""
+            rows.append([result["scale"], metric, _format(old), _format(new), ratio, flag])
+    print(f"{baseline['revision']} -> {candidate['revision']}")
+    print(tabulate(rows, headers=["scale", "metric", "before", "after", "ratio", ""]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", nargs="+", choices=SCALES, default=["small", "medium"], help="Dataset sizes to run")
+    parser.add_argument("--seed", default=0, type=int, help="Seed for the synthetic data generator")
+    parser.add_argument("--season", help="Solve this season from `schedules/` instead of a generated one")
+    parser.add_argument("--time-limit", default=120.0, type=float, help="Seconds each scale gets to prove optimality")
+    parser.add_argument("--threads", default=1, type=int, help="Solver threads")
+    parser.add_argument("--ground-timeout", default=600.0, type=float,
+                        help="Seconds a scale may spend grounding before it's given up on (0 for no limit)")
+    parser.add_argument("--compare", nargs=2, type=pathlib.Path, metavar=("BASELINE", "CANDIDATE"),
+                        help="Compare two result files instead of running")
+    parser.add_argument("--threshold", default=1.25, type=float,
+                        help="Ratio over the baseline at which --compare reports a regression")
+    args = parser.parse_args()
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.threshold) else 0)
+    run_suite(args.scales, args.seed, args.season, args.time_limit, args.threads, args.ground_timeout or None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Generate synthetic route tables, route GeoJSON, exchanges and a season in the formats solve.py consumes.
+
+Exchanges are scattered around a handful of neighborhood centers. Routes start at an exchange and either loop back to
+it or end at one of its nearest neighbors, so routes chain into multi-route days the way real ones do. Distances follow
+the track length, with a detour factor for point-to-point routes.
+"""
+
+import json
+import math
+import pathlib
+import random
+
+import yaml
+
+from run_scheduler.distances import EARTH_RADIUS_MI
+
+CENTER = (47.62, -122.33)
+SURFACES = ["road", "road", "road", "trail", "mixed"]
+OBJECTIVES = ["coarse-neighborhood-visitation", "exchange-diversity", "split-route-mix", "short-after-long", "reachability",
+              "week-to-week-exchange-diversity", "route-recency"]
+
+
+def _offset(point, north_mi, east_mi):
+    lat, long = point
+    return (lat + math.degrees(north_mi / EARTH_RADIUS_MI),
+            long + math.degrees(east_mi / (EARTH_RADIUS_MI * math.cos(math.radians(lat)))))
+
+
+def _distance_mi(a, b):
+    d_north = math.radians(b[0] - a[0]) * EARTH_RADIUS_MI
+    d_east = math.radians(b[1] - a[1]) * EARTH_RADIUS_MI * math.cos(math.radians(a[0]))
+    return math.hypot(d_north, d_east)
+
+
+def generate_exchanges(rng, count, neighborhoods):
+    centers = [_offset(CENTER, rng.gauss(0, 4), rng.gauss(0, 3)) for _ in range(neighborhoods)]
+    exchanges = []
+    for i in range(count):
+        neighborhood = rng.randrange(neighborhoods)
+        exchanges.append({
+            "id": f"X{i}",
+            "name": f"Exchange {i}",
+            "point": _offset(centers[neighborhood], rng.gauss(0, 0.8), rng.gauss(0, 0.8)),
+            "reachability": rng.choice([0, 0, 1, 1, 2, 3, 5]),
+            "neighborhood": f"Neighborhood {neighborhood}",
+            # Pairs of neighborhood clusters roll up into coarse ones
+            "coarse_neighborhood": f"Area {neighborhood // 2}",
+        })
+    return exchanges
+
+
+def _track(rng, start, end, distance_mi, points_per_mile):
+    points = max(2, int(distance_mi * points_per_mile))
+    if start == end:
+        # Loop: wobble around a circle through the start
+        radius = distance_mi / (2 * math.pi)
+        heading = rng.uniform(0, 2 * math.pi)
+        center = _offset(start, radius * math.cos(heading), radius * math.sin(heading))
+        track = []
+        for i in range(points):
+            angle = heading + math.pi + 2 * math.pi * i / (points - 1)
+            wobble = radius * rng.uniform(0.9, 1.1)
+            track.append(_offset(center, wobble * math.cos(angle), wobble * math.sin(angle)))
+    else:
+        track = []
+        for i in range(points):
+            t = i / (points - 1)
+            lat = start[0] + t * (end[0] - start[0])
+            long = start[1] + t * (end[1] - start[1])
+            jitter = 0.1 * math.sin(math.pi * t)
+            track.append(_offset((lat, long), rng.gauss(0, jitter), rng.gauss(0, jitter)))
+    elevation = rng.uniform(0, 100)
+    coordinates = []
+    for lat, long in track:
+        elevation = max(0.0, elevation + rng.gauss(0, 2))
+        coordinates.append([round(long, 6), round(lat, 6), round(elevation, 1)])
+    return coordinates
+
+
+def generate_routes(rng, exchanges, count, points_per_mile, dates):
+    nearest = {}
+    for exchange in exchanges:
+        others = sorted((other for other in exchanges if other is not exchange),
+                        key=lambda other: _distance_mi(exchange["point"], other["point"]))
+        nearest[exchange["id"]] = others[:6]
+    routes = []
+    for i in range(count):
+        start = rng.choice(exchanges)
+        if rng.random() < 0.3 or not nearest[start["id"]]:
+            end = start
+            distance_mi = min(22.0, max(2.0, rng.lognormvariate(math.log(6), 0.45)))
+        else:
+            end = rng.choice(nearest[start["id"]])
+            straight = _distance_mi(start["point"], end["point"])
+            distance_mi = min(22.0, max(2.0, straight * rng.uniform(1.2, 1.6) + rng.uniform(0, 4)))
+        coordinates = _track(rng, start["point"], end["point"], distance_mi, points_per_mile)
+        ascent = int(distance_mi * rng.uniform(5, 40))
+        route = {
+            "name": f"Route {i}",
+            "id": f"R{i}",
+            "distance_mi": round(distance_mi, 2),
+            "ascent_m": ascent,
+            "descent_m": max(0, ascent + rng.randint(-20, 20)),
+            "start": start["id"],
+            "end": end["id"],
+            "surface": rng.choice(SURFACES),
+            "neighborhoods": sorted({start["neighborhood"], end["neighborhood"]}),
+            "coarse_neighborhoods": sorted({start["coarse_neighborhood"], end["coarse_neighborhood"]}),
+            "dates_run": sorted(rng.sample(dates, rng.choice([0, 0, 1, 1, 2, 3]))),
+        }
+        if rng.random() < 0.02:
+            route["deprecated"] = True
+        routes.append((route, coordinates))
+    return routes
+
+
+def season_program(days, slots=2, objectives=OBJECTIVES, rng=None):
+    """
+    A season file in the style of the ones in `schedules/`. The one difference is that the distance range constraints
+    compare the aggregate directly. The seasons' `Total = #sum{...}` form grounds a constraint for every total a day
+    could add up to, so at 100 routes grounding alone doesn't finish in minutes.
+    """
+    rng = rng or random.Random(0)
+    lines = [f"day(1..{days}).", f"daySlot(1..{slots}).", ""]
+    for day in range(1, days + 1):
+        lower = rng.choice([8, 10, 12, 12, 13])
+        upper = lower + rng.choice([3, 4, 5])
+        lines.append(f"dayDistRange({day}, @k({lower}, K), @k({upper}, K)) :- distancePrecision(K).")
+    lines.append("")
+    weighted = "; ".join(f'{len(objectives) - i}, "{name}"' for i, name in enumerate(objectives))
+    lines.append(f"objective({weighted}).")
+    lines.append("""
+0{ slotAssignment(D, S, R): route(R) }1 :- day(D), daySlot(S).
+
+:- day(D), #count{S: slotAssignment(D, S, R)} < 1.
+:- slotAssignment(D, S, R1), slotAssignment(D, S, R2), R1 != R2, day(D).
+:- IndexCount != MaxIndex, day(D), IndexCount=#count{S: slotAssignment(D, S, R), daySlot(S)},  MaxIndex=#max{S: slotAssignment(D, S, R), daySlot(S)}.
+:- slotAssignment(D1, _, R), slotAssignment(D2, _, R), D1 != D2.
+:- slotAssignment(D, S1, R), slotAssignment(D, S2, R), S1 != S2.
+:- dayDistRange(D, Min, Max), #sum{Distance, R: routeDistance(R, Distance), slotAssignment(D, S, R), daySlot(S)} > Max, day(D).
+:- dayDistRange(D, Min, Max), #sum{Distance, R: routeDistance(R, Distance), slotAssignment(D, S, R), daySlot(S)} < Min, day(D).
+:- slotAssignment(D, S1, R1), slotAssignment(D, S2, R2), S2 = S1 + 1, R1End != R2Start, route(R1, _, _, R1End), route(R2, _, R2Start, _).
+""")
+    return "\n".join(lines)
+
+
+def generate_dataset(out_dir: pathlib.Path, routes=100, exchanges=20, days=10, seed=0, points_per_mile=40):
+    """
+    Write `routes.yml`, `geojson/*.geojson`, `locations.geojson` and `season.lp` to out_dir. Returns their paths.
+    """
+    rng = random.Random(seed)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    geojson_dir = out_dir / "geojson"
+    geojson_dir.mkdir(exist_ok=True)
+    dates = [f"20{year}-{month:02}-01" for year in range(20, 25) for month in range(1, 13)]
+
+    exchange_data = generate_exchanges(rng, exchanges, neighborhoods=max(2, exchanges // 8))
+    features = [{
+        "type": "Feature",
+        "properties": {"id": exchange["id"], "name": exchange["name"], "reachability": exchange["reachability"]},
+        "geometry": {"type": "Point", "coordinates": [exchange["point"][1], exchange["point"][0]]},
+    } for exchange in exchange_data]
+    with open(out_dir / "locations.geojson", "w") as f:
+        json.dump({"type": "FeatureCollection", "features": features}, f)
+
+    table = []
+    for route, coordinates in generate_routes(rng, exchange_data, routes, points_per_mile, dates):
+        table.append(route)
+        properties = {key: route[key] for key in
+                      ["name", "id", "distance_mi", "ascent_m", "descent_m", "start", "end", "surface"]}
+        if route.get("deprecated"):
+            properties["deprecated"] = True
+        with open(geojson_dir / f"{route['id']}.geojson", "w") as f:
+            json.dump({"type": "Feature", "properties": properties,
+                       "geometry": {"type": "LineString", "coordinates": coordinates}}, f)
+    with open(out_dir / "routes.yml", "w") as f:
+        yaml.safe_dump(table, f)
+
+    with open(out_dir / "season.lp", "w") as f:
+        f.write(season_program(days, rng=rng))
+    return {"routes_table": out_dir / "routes.yml", "routes_dir": geojson_dir,
+            "exchanges": out_dir / "locations.geojson", "season": out_dir / "season.lp"}
@@ -1,27 +1,46 @@
 #!/usr/bin/env python3
 
 """
-Pretty print a schedule from a solution JSON file.
+Pretty print a schedule from a run's solution log, or from an exported solution JSON file.
 """
 
 import argparse
 import json
+import pathlib
 
 from run_scheduler.schedule import schedule_to_str
+from run_scheduler.solution_log import SolutionLog, export_record, EXPORT_FORMATS
 
 
 def main(args):
-    solution_path = args.solution_json
-    with open(solution_path) as f:
-        solution = json.load(f)
+    solution_path = pathlib.Path(args.solution)
+    if solution_path.is_dir():
+        with SolutionLog(solution_path) as log:
+            model_id = log.best_id() if args.model is None else args.model
+            if model_id is None:
+                print(f"{solution_path} has no solutions")
+                return
+            solution = log.read(model_id)
+            print(f"Model {solution['id']} of {len(log)}{' (optimal)' if solution['optimal'] else ''}")
+    else:
+        with open(solution_path) as f:
+            solution = json.load(f)
     costs = solution["costs"].items()
     schedule = solution["schedule"]
     print(schedule_to_str(schedule))
     print(costs)
+    if args.export:
+        out_dir = args.out_dir or (solution_path if solution_path.is_dir() else solution_path.parent)
+        file_name = f"solution_{solution['id']}" if "id" in solution else solution_path.stem
+        export_record(solution, out_dir, file_name, args.export.split(","))
+        print(f"Exported {args.export} to {out_dir}/{file_name}")
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument("solution_json", type=str)
+    parser.add_argument("solution", type=str, help="A run's folder in solutions/, or a solution JSON file")
+    parser.add_argument("--model", type=int, help="Id of the model to print from the run's solution log (default: the best). Negative ids count back from the last")
+    parser.add_argument("--export", help=f"Comma separated formats ({', '.join(EXPORT_FORMATS)}) to also write the solution as")
+    parser.add_argument("--out-dir", type=pathlib.Path, help="Folder to export to (default: next to the solution)")
     args = parser.parse_args()
     main(args)
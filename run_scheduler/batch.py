@@ -0,0 +1,215 @@
+import datetime
+import os
+import time
+
+import clingo
+import yaml
+from clingo import ast
+from clingo.ast import ASTType, Sign, Transformer, parse_string
+
+from run_scheduler.domain import kPrecision, make_standard_func_ctx
+from run_scheduler.program import _SignatureCollector, add_program, parse_season
+from run_scheduler.schedule import DECISION_SIGNATURES, index_instance, extract_schedule, costs_by_objective, \
+    solution_hash
+from run_scheduler.solution_log import SolutionLog, solution_record
+from run_scheduler.tuning import config_arguments, load_tuned_config, DEFAULT_CONFIG
+from run_scheduler.writer import SolutionWriter
+
+# Keys a job in a manifest can override the manifest's defaults with
+JOB_DEFAULTS = ("time_limit", "cores")
+
+
+def load_manifest(path):
+    """
+    Read a batch manifest: a YAML mapping with a list of `jobs`, each naming a `season` and any overrides of it, and
+    defaults for every job's `time_limit` (seconds) and `cores`.
+    """
+    with open(path) as f:
+        manifest = yaml.safe_load(f)
+    jobs = []
+    names = set()
+    for index, job in enumerate(manifest["jobs"]):
+        job = {key: manifest[key] for key in JOB_DEFAULTS if key in manifest} | job
+        job.setdefault("name", f"{index}_{job['season']}")
+        job.setdefault("cores", 1)
+        if job["name"] in names:
+            raise ValueError(f"More than one job in {path} is named {job['name']}")
+        names.add(job["name"])
+        jobs.append(job)
+    return jobs
+
+
+def _is_fact_of(statement, signature):
+    if statement.ast_type != ASTType.Rule or statement.head.ast_type != ASTType.Literal:
+        return False
+    collector = _SignatureCollector()
+    collector(statement.head)
+    return collector.signatures == {signature}
+
+
+class _DeferDayRanges(Transformer):
+    """
+    Adds `not rangeOverride(D)` to rules deriving dayDistRange(D, _, _), so that days given a range by an override
+    only get that one. A day that isn't a variable (`dayDistRange(1..12, ...)`) is bound to one first.
+    """
+
+    def visit_Rule(self, rule):
+        if not _is_fact_of(rule, ("dayDistRange", 3)) or rule.head.atom.symbol.ast_type != ASTType.Function:
+            return rule
+        location = rule.location
+        symbol = rule.head.atom.symbol
+        day, *bounds = symbol.arguments
+        body = list(rule.body)
+        if day.ast_type != ASTType.Variable:
+            variable = ast.Variable(location, "Day__")
+            body.append(ast.Literal(location, Sign.NoSign, ast.Comparison(
+                variable, [ast.Guard(ast.ComparisonOperator.Equal, day)])))
+            day = variable
+        body.append(ast.Literal(location, Sign.Negation, ast.SymbolicAtom(
+            ast.Function(location, "rangeOverride", [day], 0))))
+        head = rule.head.update(atom=rule.head.atom.update(symbol=symbol.update(arguments=[day, *bounds])))
+        return rule.update(head=head, body=body)
+
+
+def override_program(job, distance_precision):
+    """
+    ASP for a job's overrides:
+
+    - `objectives`: objective names from most to least important, so the first gets the highest priority
+    - `ban`: exchange ids no route may start or end at
+    - `day_ranges`: [min, max] miles for a day number, or for `all` days not given their own
+    """
+    lines = []
+    objectives = job.get("objectives", [])
+    for index, name in enumerate(objectives):
+        lines.append(f"objective({len(objectives) - index}, {clingo.String(name)}).")
+    for exchange in job.get("ban", []):
+        exchange = clingo.String(exchange)
+        lines.append(f":- slotAssignment(_, _, R), routeStart(R, {exchange}).")
+        lines.append(f":- slotAssignment(_, _, R), routeEnd(R, {exchange}).")
+    for day, (lower, upper) in job.get("day_ranges", {}).items():
+        lower, upper = kPrecision(lower, distance_precision), kPrecision(upper, distance_precision)
+        if day == "all":
+            lines.append(f"dayDistRange(D, {lower}, {upper}) :- day(D), not rangeOverride(D).")
+        else:
+            lines.append(f"rangeOverride({day}). dayDistRange({day}, {lower}, {upper}).")
+    return "\n".join(lines)
+
+
+def job_statements(job, distance_precision):
+    """
+    Parse a job's season and apply its overrides. Objectives and `all` day ranges replace the season's; ranges for
+    single days replace the season's range for just those days.
+    """
+    statements = parse_season(job["season"])
+    if "objectives" in job:
+        statements = [statement for statement in statements if not _is_fact_of(statement, ("objective", 2))]
+    day_ranges = job.get("day_ranges", {})
+    if "all" in day_ranges:
+        statements = [statement for statement in statements if not _is_fact_of(statement, ("dayDistRange", 3))]
+    elif day_ranges:
+        defer = _DeferDayRanges()
+        statements = [defer(statement) for statement in statements]
+    parse_string(override_program(job, distance_precision), statements.append)
+    return statements
+
+
+def describe_overrides(job):
+    parts = []
+    if "objectives" in job:
+        parts.append(f"objectives {', '.join(job['objectives'])}")
+    if job.get("ban"):
+        parts.append(f"ban {', '.join(job['ban'])}")
+    for day, (lower, upper) in job.get("day_ranges", {}).items():
+        parts.append(f"day {day} {lower}-{upper} mi")
+    return "; ".join(parts)
+
+
+def job_config(job, ignore_tuning=False):
+    """
+    The season's tuned solver configuration (or the default), running on exactly the job's cores.
+    """
+    config = (not ignore_tuning and load_tuned_config(job["season"])) or DEFAULT_CONFIG
+    return {**config, "threads": job["cores"]}
+
+
+def run_job(job, facts_path, distance_precision, duration_precision, out_dir, ignore_tuning=False):
+    """
+    Ground and solve one job over a prepared facts file, logging every model to `<out_dir>/<job name>`, and return a
+    summary of the run. Stops at the job's time_limit, if it has one.
+    """
+    config = job_config(job, ignore_tuning)
+    # optN reports the optimum again once it's proven, so the log knows which model it is. One is enough
+    ctrl = clingo.Control(config_arguments(config) + ["--opt-mode=optN", "--models=1", "--warn=none"])
+    run_dir = f"{out_dir}/{job['name']}"
+    os.makedirs(run_dir, exist_ok=True)
+    start = time.perf_counter()
+    add_program(ctrl, job_statements(job, distance_precision), facts_path, shown=DECISION_SIGNATURES)
+    ctrl.ground([("base", [])], context=make_standard_func_ctx())
+    instance = index_instance(ctrl.symbolic_atoms, distance_precision)
+    ground = time.perf_counter() - start
+    solve_start_time = datetime.datetime.now()
+    best = None
+
+    def write_models(records):
+        for record in records:
+            log.append(solution_record({
+                "costs": costs_by_objective(instance, record["priority"], record["cost"]),
+                "distance_precision": distance_precision,
+                "duration_precision": duration_precision,
+                "optimal": record["optimal"],
+                "schedule": extract_schedule(record["atoms"], instance),
+                "hash": solution_hash(record["atoms"]),
+            }, solve_start_time, atoms=record["atoms"], found_time=record["found_time"]))
+
+    def on_model(model):
+        nonlocal best
+        best = {
+            "atoms": model.symbols(shown=True),
+            "cost": model.cost,
+            "priority": model.priority,
+            "optimal": model.optimality_proven,
+            "found_time": datetime.datetime.now(),
+        }
+        writer.submit(best)
+
+    start = time.perf_counter()
+    with SolutionLog(run_dir, "a") as log, SolutionWriter(write_models) as writer:
+        with ctrl.solve(on_model=on_model, async_=True) as handle:
+            finished = handle.wait(job.get("time_limit"))
+            if not finished:
+                handle.cancel()
+            result = handle.get()
+    solve = time.perf_counter() - start
+    if best is None:
+        status = "unsatisfiable" if result.unsatisfiable else "no schedule"
+    else:
+        status = "optimal" if best["optimal"] else "time limit"
+    return {
+        "name": job["name"],
+        "season": job["season"],
+        "overrides": describe_overrides(job),
+        "arguments": config_arguments(config),
+        "cores": job["cores"],
+        "status": status,
+        "costs": best and costs_by_objective(instance, best["priority"], best["cost"]),
+        "models": int(ctrl.statistics["summary"]["models"]["enumerated"]),
+        "ground": ground,
+        "solve": solve,
+        "out_dir": run_dir,
+    }
+
+
+def summary_rows(results):
+    """
+    One row per job for a comparison table, with a column for every objective any job optimized.
+    """
+    objectives = list(dict.fromkeys(name for result in results for name in result.get("costs") or {}))
+    headers = ["Job", "Season", "Overrides", "Cores", "Status", "Ground (s)", "Solve (s)", "Models", *objectives]
+    rows = []
+    for result in results:
+        costs = result.get("costs") or {}
+        rows.append([result["name"], result["season"], result["overrides"], result["cores"], result["status"],
+                     result.get("ground"), result.get("solve"), result.get("models"),
+                     *(costs.get(name, "") for name in objectives)])
+    return headers, rows
@@ -0,0 +1,72 @@
+import pathlib
+import pickle
+import time
+
+import clingo
+import xxhash
+
+from run_scheduler.domain import DistancePrecision, DurationPrecision
+from run_scheduler.routes import load_dataset, routes_to_symbols, OVERLAP_CELL_SIZE
+
+# Bump whenever the snapshot layout or the facts generated from the same inputs change
+SNAPSHOT_VERSION = 3
+
+
+def input_digest(routes_table: pathlib.Path, routes_dir: pathlib.Path, exchanges_path: pathlib.Path, **params):
+    """
+    Hash of the contents of every input file and of the parameters used to turn them into facts.
+    """
+    digest = xxhash.xxh64()
+    digest.update(f"v{SNAPSHOT_VERSION}".encode())
+    for path in [routes_table, exchanges_path, *sorted(routes_dir.glob("*.geojson"))]:
+        digest.update(path.name.encode())
+        digest.update(path.read_bytes())
+    digest.update(repr(sorted(params.items())).encode())
+    return digest.hexdigest()
+
+
+def prepare(routes_table: pathlib.Path, routes_dir: pathlib.Path, exchanges_path: pathlib.Path, cache_dir: pathlib.Path,
+            distance_precision, duration_precision, rebuild=False, build_facts=routes_to_symbols,
+            overlap_cell_size=OVERLAP_CELL_SIZE, **fact_options):
+    """
+    Load the parsed dataset and a facts file for it, reusing the snapshot in cache_dir if none of the inputs changed.
+
+    A snapshot is two files named by the input digest: a pickle of the parsed routes and exchanges, and the generated
+    facts as ASP text which clingo can parse much faster than we can rebuild them.
+
+    build_facts is routes_to_symbols or routes_to_facts. They produce the same facts, so it isn't part of the digest.
+    overlap_cell_size is the grid the tracks are reduced to as they're loaded, for the routeOverlap facts.
+    """
+    digest = input_digest(routes_table, routes_dir, exchanges_path, distance_precision=distance_precision,
+                          duration_precision=duration_precision, overlap_cell_size=overlap_cell_size, **fact_options)
+    data_path = cache_dir / f"{digest}.pickle"
+    facts_path = cache_dir / f"{digest}.lp"
+    start = time.perf_counter()
+    if not rebuild and data_path.exists() and facts_path.exists():
+        with open(data_path, "rb") as f:
+            legs, exchanges = pickle.load(f)
+        return {"digest": digest, "legs": legs, "exchanges": exchanges, "facts_path": facts_path, "cached": True,
+                "timings": {"load_snapshot": time.perf_counter() - start}}
+
+    legs, exchanges = load_dataset(routes_table, routes_dir, exchanges_path, cell_size=overlap_cell_size)
+    loaded = time.perf_counter()
+    facts = build_facts(legs, exchanges, distance_precision=distance_precision,
+                        duration_precision=duration_precision, **fact_options)
+    facts += [clingo.Function(DistancePrecision.meta.name, [clingo.String(str(distance_precision))]),
+              clingo.Function(DurationPrecision.meta.name, [clingo.String(str(duration_precision))])]
+    built = time.perf_counter()
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    # Write to temporary names first so an interrupted run can't leave a partial snapshot behind
+    tmp_facts_path = facts_path.with_suffix(".lp.tmp")
+    with open(tmp_facts_path, "w") as f:
+        for fact in facts:
+            f.write(f"{fact}.\n")
+    tmp_data_path = data_path.with_suffix(".pickle.tmp")
+    with open(tmp_data_path, "wb") as f:
+        pickle.dump((legs, exchanges), f, protocol=pickle.HIGHEST_PROTOCOL)
+    tmp_facts_path.replace(facts_path)
+    tmp_data_path.replace(data_path)
+    return {"digest": digest, "legs": legs, "exchanges": exchanges, "facts_path": facts_path, "cached": False,
+            "timings": {"load": loaded - start, "build_facts": built - loaded,
+                        "write_snapshot": time.perf_counter() - built}}
@@ -0,0 +1,159 @@
+import numpy as np
+
+# Mean earth radius in miles, matching what the haversine package uses
+EARTH_RADIUS_MI = 6371.0088 * 0.621371192
+
+
+def track_points(coords):
+    """
+    A GeoJSON track's [long, lat, (ele)] points as an array of (lat, long) rows. Raises ValueError for a track without
+    points, or with points that aren't all the same length with numeric coordinates.
+    """
+    try:
+        points = np.asarray(coords, dtype=float)
+    except (TypeError, ValueError):
+        raise ValueError("track points aren't all [long, lat] or [long, lat, ele] numbers") from None
+    if points.ndim != 2 or len(points) == 0 or points.shape[1] < 2:
+        raise ValueError(f"track needs at least one [long, lat] point, got an array of shape {points.shape}")
+    if not np.isfinite(points[:, :2]).all():
+        raise ValueError("track has points with non-finite coordinates")
+    return points[:, 1::-1]
+
+
+def summarize_points(coords):
+    """
+    Reduce a list of GeoJSON [long, lat, (ele)] points to its geographic mean (lat, long), bounding box
+    (min lat, min long, max lat, max long) and point count.
+    """
+    points = track_points(coords)
+    centroid = points.mean(axis=0)
+    bbox = np.concatenate([points.min(axis=0), points.max(axis=0)])
+    return tuple(centroid.tolist()), tuple(bbox.tolist()), len(points)
+
+
+def haversine_matrix(points_a, points_b):
+    """
+    Great-circle distance in miles between every (lat, long) row of points_a and every row of points_b.
+    """
+    lat_a, long_a = np.radians(points_a).T
+    lat_b, long_b = np.radians(points_b).T
+    d_lat = lat_b[None, :] - lat_a[:, None]
+    d_long = long_b[None, :] - long_a[:, None]
+    a = np.sin(d_lat / 2) ** 2 + np.cos(lat_a)[:, None] * np.cos(lat_b)[None, :] * np.sin(d_long / 2) ** 2
+    return 2 * EARTH_RADIUS_MI * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def pairwise_distances(points, radius=None, neighbors=None, block_size=1024):
+    """
+    Distances between all ordered pairs of (lat, long) points, each pair (including a point with itself) once.
+
+    Far-apart pairs can be dropped before they're ever materialized: `radius` keeps only pairs within that many miles,
+    `neighbors` keeps only each point's k nearest other points. If both are given, a pair has to satisfy both. Rows are
+    processed in blocks so memory stays bounded even when the full matrix wouldn't fit.
+
+    Returns (rows, cols, dists) arrays.
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    n = len(points)
+    rows, cols, dists = [], [], []
+    for start in range(0, n, block_size):
+        block = haversine_matrix(points[start:start + block_size], points)
+        block_rows = np.arange(start, start + len(block))
+        # A point is always its own nearest neighbor, regardless of floating point noise
+        block[np.arange(len(block)), block_rows] = 0.0
+        keep = np.ones(block.shape, dtype=bool)
+        if radius is not None:
+            keep &= block <= radius
+        if neighbors is not None and neighbors + 1 < n:
+            nearest = np.argpartition(block, neighbors, axis=1)[:, :neighbors + 1]
+            in_nearest = np.zeros(block.shape, dtype=bool)
+            np.put_along_axis(in_nearest, nearest, True, axis=1)
+            in_nearest[np.arange(len(block)), block_rows] = True
+            keep &= in_nearest
+        i, j = np.nonzero(keep)
+        rows.append(i + start)
+        cols.append(j)
+        dists.append(block[i, j])
+    if not rows:
+        return np.empty(0, dtype=int), np.empty(0, dtype=int), np.empty(0)
+    return np.concatenate(rows), np.concatenate(cols), np.concatenate(dists)
+
+
+MILES_PER_DEGREE_LAT = np.pi * EARTH_RADIUS_MI / 180
+
+
+def densify(points, spacing):
+    """
+    Add points along each segment of a (lat, long) track so that consecutive points are at most `spacing` miles
+    apart, measured on a local flat projection.
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    if len(points) < 2:
+        return points
+    steps = np.diff(points, axis=0)
+    lengths = np.hypot(steps[:, 0], steps[:, 1] * np.cos(np.radians(points[:-1, 0]))) * MILES_PER_DEGREE_LAT
+    counts = np.maximum(1, np.ceil(lengths / spacing).astype(np.int64))
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    dense = np.repeat(points[:-1], counts, axis=0) + np.repeat(steps / counts[:, None], counts, axis=0) * offsets[:, None]
+    return np.vstack([dense, points[-1:]])
+
+
+def grid_cells(coords, cell_size):
+    """
+    Sorted ids of the cells of a grid of cell_size mile squares that a GeoJSON [long, lat, (ele)] track passes through.
+    The track is densified first so no cell it crosses is skipped over. Rows of the grid are a fixed number of degrees
+    of latitude tall; each row's columns are narrowed in degrees of longitude by its latitude, so cells stay square and
+    every track is gridded the same way without a shared origin.
+    """
+    points = densify(track_points(coords), cell_size / 2)
+    cell_degrees = cell_size / MILES_PER_DEGREE_LAT
+    rows = np.floor(points[:, 0] / cell_degrees).astype(np.int64)
+    widths = cell_degrees / np.cos(np.radians((rows + 0.5) * cell_degrees))
+    cols = np.floor(points[:, 1] / widths).astype(np.int64)
+    return np.unique((rows << 32) + (cols + (1 << 31)))
+
+
+def _merge_counts(codes, counts, new_codes, new_counts):
+    codes, inverse = np.unique(np.concatenate([codes, new_codes]), return_inverse=True)
+    return codes, np.bincount(inverse, weights=np.concatenate([counts, new_counts])).astype(np.int64)
+
+
+def route_overlaps(cells, min_overlap=0.0, block_size=1 << 22):
+    """
+    For every pair of tracks that pass through a common cell, the fraction of the cells of the smaller one that the
+    other passes through too: 1 if one track runs entirely along the other. cells is a list of each track's sorted
+    grid_cells.
+
+    Tracks are only ever compared through the cells they share. An inverted index of the tracks through each cell
+    (all cells sorted together) yields the pairs in each cell, and the number of times a pair comes up is the number of
+    cells they share. Cells with the same number of tracks are handled together, in blocks of at most block_size
+    pairs, so memory is bounded by the number of overlapping pairs rather than by the tracks' lengths.
+
+    Returns (rows, cols, fractions) arrays with rows < cols, keeping the pairs that overlap by at least min_overlap.
+    """
+    sizes = np.array([len(track_cells) for track_cells in cells], dtype=np.int64)
+    n = len(cells)
+    if n < 2 or not sizes.any():
+        return np.empty(0, dtype=int), np.empty(0, dtype=int), np.empty(0)
+    all_cells = np.concatenate(cells)
+    # Stable, so the tracks through a cell stay in ascending order
+    order = np.argsort(all_cells, kind="stable")
+    tracks = np.repeat(np.arange(n), sizes)[order]
+    boundaries = np.flatnonzero(np.diff(all_cells[order])) + 1
+    starts = np.concatenate([[0], boundaries])
+    group_sizes = np.diff(np.concatenate([starts, [len(order)]]))
+
+    codes, counts = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    for group_size in np.unique(group_sizes[group_sizes > 1]).tolist():
+        first, second = np.triu_indices(group_size, k=1)
+        group_starts = starts[group_sizes == group_size]
+        per_block = max(1, block_size // len(first))
+        for block in range(0, len(group_starts), per_block):
+            block_starts = group_starts[block:block + per_block, None]
+            pair_codes = (tracks[block_starts + first] * n + tracks[block_starts + second]).ravel()
+            block_codes, block_counts = np.unique(pair_codes, return_counts=True)
+            codes, counts = _merge_counts(codes, counts, block_codes, block_counts)
+    rows, cols = codes // n, codes % n
+    fractions = counts / np.minimum(sizes[rows], sizes[cols])
+    keep = fractions >= min_overlap
+    return rows[keep], cols[keep], fractions[keep]
@@ -0,0 +1,369 @@
+import datetime
+import itertools
+import multiprocessing
+import queue
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener, wait
+
+import clingo
+from clingo.ast import parse_string
+
+from run_scheduler.domain import make_standard_func_ctx
+
+# The exchange each day's first route starts at. Cubes fix it for the first few days
+CUBE_RULE = """
+#program base.
+cubeDayStart(D, E) :- slotAssignment(D, S, R), routeStart(R, E), S = #min{ S2: slotAssignment(D, S2, _) }.
+"""
+
+
+def add_cube_rule(statements):
+    statements = list(statements)
+    parse_string(CUBE_RULE, statements.append)
+    return statements
+
+
+def parse_address(address):
+    """
+    HOST:PORT for TCP, anything else is the path of a Unix socket.
+    """
+    host, separator, port = address.rpartition(":")
+    if separator and port.isdigit():
+        return host or "localhost", int(port)
+    return address
+
+
+def format_address(address):
+    return f"{address[0]}:{address[1]}" if isinstance(address, tuple) else address
+
+
+def worker_setup(statements, facts_path=None, extra_program="", arguments=()):
+    """
+    Everything a worker needs to ground the same program as the coordinator, even on a host without the route data:
+    the program as text, the facts and the solver arguments.
+    """
+    program = "\n".join(str(statement) for statement in statements)
+    facts = ""
+    if facts_path:
+        with open(facts_path) as f:
+            facts = f.read()
+    return {"program": f"{program}\n#program base.\n{extra_program}", "facts": facts, "arguments": list(arguments)}
+
+
+def enumerate_cubes(symbolic_atoms, cube_days):
+    """
+    Every combination of start exchanges (or no route at all) for the first cube_days days, as tuples of (day,
+    exchange id or None). Each schedule falls in exactly one cube.
+    """
+    starts = {}
+    for atom in symbolic_atoms.by_signature("cubeDayStart", 2):
+        day, exchange = atom.symbol.arguments
+        starts.setdefault(day.number, set()).add(exchange.string)
+    days = sorted(atom.symbol.arguments[0].number for atom in symbolic_atoms.by_signature("day", 1))[:cube_days]
+    options = [[(day, exchange) for exchange in sorted(starts.get(day, ()))] + [(day, None)] for day in days]
+    return list(itertools.product(*options))
+
+
+def describe_cube(cube):
+    return ", ".join(f"day {day} {'from ' + exchange if exchange else 'empty'}" for day, exchange in cube)
+
+
+def _strict(bound):
+    # Opt-mode bounds are inclusive, and costs are integers
+    return [*bound[:-1], bound[-1] - 1]
+
+
+class CubeWorker:
+    """
+    Solves the cubes a coordinator sends it, one at a time, on its own ground copy of the program. A cube is a set of
+    assumptions on cubeDayStart/2, searched until it's exhausted or its time slice runs out. Every model is sent back
+    as it's found. Bounds found by other workers arrive while solving; a better one restarts the search under it,
+    keeping what the solver has learned.
+    """
+
+    def __init__(self, ctrl: clingo.Control, conn):
+        self.ctrl = ctrl
+        self.conn = conn
+        self.starts = {}
+        for atom in ctrl.symbolic_atoms.by_signature("cubeDayStart", 2):
+            day, exchange = atom.symbol.arguments
+            self.starts.setdefault(day.number, {})[exchange.string] = atom
+        self.bound = None
+        self.tightened = False
+        self.stopped = False
+
+    def assumptions(self, cube):
+        """
+        The assumptions selecting a cube, or None if no schedule can be in it.
+        """
+        assumptions = []
+        for day, exchange in cube:
+            starts = self.starts.get(day, {})
+            if exchange is None:
+                if any(atom.is_fact for atom in starts.values()):
+                    return None
+                assumptions += [-atom.literal for atom in starts.values()]
+            elif exchange not in starts:
+                return None
+            elif not starts[exchange].is_fact:
+                assumptions.append(starts[exchange].literal)
+        return assumptions
+
+    def _tighten(self, bound):
+        if self.bound is None or bound < self.bound:
+            self.bound = bound
+            self.tightened = True
+
+    def _receive(self):
+        while not self.stopped and self.conn.poll():
+            message = self.conn.recv()
+            if message[0] == "bound":
+                self._tighten(message[1])
+            elif message[0] == "stop":
+                self.stopped = True
+
+    def solve(self, cube_id, cube, time_slice=None):
+        assumptions = self.assumptions(cube)
+        if assumptions is None:
+            self.conn.send(("done", cube_id, True))
+            return
+        found = []
+
+        def on_model(model):
+            # Sent from the main thread, the connection isn't shared between threads
+            found.append({"atoms": [str(atom) for atom in model.symbols(shown=True)], "cost": list(model.cost),
+                          "priority": model.priority, "found_time": datetime.datetime.now()})
+
+        def flush():
+            while found:
+                record = found.pop(0)
+                if self.bound is None or record["cost"] < self.bound:
+                    self.bound = record["cost"]
+                self.conn.send(("model", cube_id, record))
+
+        deadline = None if time_slice is None else time.perf_counter() + time_slice
+        while True:
+            self.tightened = False
+            bound = self.bound
+            opt_mode = "opt" if bound is None else f"opt,{','.join(map(str, _strict(bound)))}"
+            self.ctrl.configuration.solve.opt_mode = opt_mode
+            with self.ctrl.solve(assumptions=assumptions, on_model=on_model, async_=True) as handle:
+                while not handle.wait(0.1):
+                    flush()
+                    self._receive()
+                    if self.stopped or self.tightened or (deadline is not None and time.perf_counter() > deadline):
+                        handle.cancel()
+                        break
+                result = handle.get()
+            flush()
+            if self.stopped:
+                return
+            # Another worker's schedule beat this search's bound, search again for something better than it
+            if self.tightened and not result.exhausted and (deadline is None or time.perf_counter() < deadline):
+                continue
+            self.conn.send(("done", cube_id, bool(result.exhausted)))
+            return
+
+    def serve(self):
+        while not self.stopped:
+            message = self.conn.recv()
+            if message[0] == "cube":
+                _, cube_id, cube, bound, time_slice = message
+                if bound is not None:
+                    self._tighten(bound)
+                self.solve(cube_id, cube, time_slice)
+            elif message[0] == "bound":
+                self._tighten(message[1])
+            elif message[0] == "stop":
+                self.stopped = True
+
+
+def run_worker(address, authkey, threads=None):
+    """
+    Connect to a coordinator, ground the program it sends and solve cubes until it says to stop.
+    """
+    try:
+        with Client(address, authkey=authkey) as conn:
+            setup = conn.recv()
+            arguments = setup["arguments"]
+            if threads:
+                arguments = [f"--parallel-mode={threads},split" if argument.startswith("--parallel-mode") else argument
+                             for argument in arguments]
+            ctrl = clingo.Control(arguments + ["--opt-mode=opt", "--warn=none"])
+            ctrl.add("base", [], setup["program"])
+            ctrl.add("base", [], setup["facts"])
+            ctrl.ground([("base", [])], context=make_standard_func_ctx())
+            conn.send(("ready",))
+            CubeWorker(ctrl, conn).serve()
+    except AuthenticationError:
+        print("The coordinator rejected the authkey")
+    except (EOFError, ConnectionError, KeyboardInterrupt):
+        # The coordinator is gone, or so is the run
+        pass
+
+
+def start_local_workers(address, authkey, count):
+    # Spawned, not forked: the coordinator's clingo has threads of its own
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=run_worker, args=(address, authkey), daemon=True) for _ in range(count)]
+    for worker in workers:
+        worker.start()
+    return workers
+
+
+class Coordinator:
+    """
+    Splits the search space into cubes by the start exchanges of the first days and hands them out to workers over a
+    multiprocessing connection (TCP or a Unix socket), so workers can run in other processes or on other hosts. Each
+    worker grounds the program itself from the setup it's sent when it connects.
+
+    A worker searches a cube for at most cube_time seconds (None for until it's exhausted). Cubes that aren't exhausted
+    by then go to the back of the queue with twice the time for their next turn, so every cube gets searched for a
+    while before any gets searched longer.
+    Whenever a worker finds a schedule better than any before, its cost is broadcast to the others so they only look
+    for better ones. Once every cube has been searched exhaustively, the best schedule is optimal. Workers that
+    disconnect have their cube handed to someone else.
+    """
+
+    def __init__(self, cubes, setup, address=("localhost", 0), authkey=None, cube_time=None, on_model=None,
+                 telemetry=None):
+        self.cubes = cubes
+        self.setup = setup
+        self.time_slices = [cube_time] * len(cubes)
+        self.listener = Listener(address, authkey=authkey)
+        self.on_model = on_model
+        self.telemetry = telemetry
+        self.pending = list(range(len(cubes)))
+        self.assigned = {}
+        self.idle = []
+        self.connected = []
+        self.new_connections = queue.Queue()
+        self.exhausted = 0
+        self.best = None
+        self.stopped = False
+        self.closed = threading.Event()
+        threading.Thread(target=self._accept, name="coordinator-accept", daemon=True).start()
+
+    @property
+    def address(self):
+        return self.listener.address
+
+    def _accept(self):
+        while True:
+            try:
+                conn = self.listener.accept()
+            except (OSError, EOFError, AuthenticationError):
+                # Closed, or the handshake failed
+                if self.closed.is_set():
+                    return
+                continue
+            try:
+                conn.send(self.setup)
+            except OSError:
+                continue
+            self.new_connections.put(conn)
+
+    def _send(self, conn, message):
+        try:
+            conn.send(message)
+            return True
+        except OSError:
+            self._drop(conn)
+            return False
+
+    def _drop(self, conn):
+        if conn in self.assigned:
+            self.pending.insert(0, self.assigned.pop(conn))
+        if conn in self.idle:
+            self.idle.remove(conn)
+        if conn in self.connected:
+            self.connected.remove(conn)
+            print(f"A worker disconnected, {len(self.connected)} left")
+
+    def _handle(self, conn, message):
+        if message[0] == "ready":
+            self.idle.append(conn)
+        elif message[0] == "model":
+            _, cube_id, record = message
+            if self.best is not None and record["cost"] >= self.best["cost"]:
+                return
+            self.best = {**record, "atoms": [clingo.parse_term(atom) for atom in record["atoms"]], "optimal": False}
+            print(f"Cost {record['cost']} in cube {cube_id} ({describe_cube(self.cubes[cube_id])})")
+            if self.telemetry:
+                self.telemetry.on_model(record["cost"], record["priority"])
+            if self.on_model:
+                self.on_model(self.best)
+            for other in list(self.assigned):
+                if other is not conn:
+                    self._send(other, ("bound", record["cost"]))
+        elif message[0] == "done":
+            _, cube_id, exhausted = message
+            self.assigned.pop(conn, None)
+            if exhausted:
+                self.exhausted += 1
+            else:
+                self.pending.append(cube_id)
+                if self.time_slices[cube_id] is not None:
+                    self.time_slices[cube_id] *= 2
+            self.idle.append(conn)
+
+    def run(self, time_limit=None):
+        """
+        Hand out cubes until they're all searched, the time limit is reached, or Ctrl-C. Returns the best model record,
+        marked optimal if every cube was searched exhaustively.
+        """
+        start = time.perf_counter()
+        try:
+            while self.pending or self.assigned:
+                while not self.new_connections.empty():
+                    self.connected.append(self.new_connections.get())
+                    print(f"A worker connected, {len(self.connected)} in all")
+                while self.pending and self.idle:
+                    conn = self.idle.pop()
+                    cube_id = self.pending.pop(0)
+                    message = ("cube", cube_id, self.cubes[cube_id], self.best and self.best["cost"],
+                               self.time_slices[cube_id])
+                    if self._send(conn, message):
+                        self.assigned[conn] = cube_id
+                    else:
+                        self.pending.insert(0, cube_id)
+                for conn in wait(self.connected, timeout=0.1):
+                    try:
+                        message = conn.recv()
+                    except (EOFError, OSError):
+                        self._drop(conn)
+                        continue
+                    self._handle(conn, message)
+                if self.telemetry and self.telemetry.poll():
+                    print("Stopping the stalled workers")
+                    self.stopped = True
+                    break
+                if time_limit is not None and time.perf_counter() - start > time_limit:
+                    print("Time limit reached, stopping the workers")
+                    self.stopped = True
+                    break
+        except KeyboardInterrupt:
+            print("Interrupted, stopping the workers")
+            self.stopped = True
+        finally:
+            self.close()
+        print(f"Searched {self.exhausted} of {len(self.cubes)} cubes exhaustively")
+        if self.best and self.exhausted == len(self.cubes):
+            self.best = {**self.best, "optimal": True}
+            if self.on_model:
+                # Reported again now that it's proven, like optN does
+                self.on_model(self.best)
+        return self.best
+
+    def close(self):
+        for conn in self.connected:
+            try:
+                conn.send(("stop",))
+                conn.close()
+            except OSError:
+                pass
+        self.connected = []
+        self.closed.set()
+        self.listener.close()
@@ -104,6 +104,12 @@ def PreferredDistanceK(precision=2.0):
     return PreferredDistance
 
 
+class RouteOverlap(Predicate):
+    route_a = StringField
+    route_b = StringField
+    percent = IntegerField
+
+
 class Ascent(Predicate):
     route_id = StringField
     ascent = IntegerField
@@ -0,0 +1,213 @@
+import cmd
+import datetime
+import time
+
+import clingo
+from clingo.ast import parse_files
+
+from run_scheduler.schedule import extract_schedule, costs_by_objective, schedule_to_str
+
+SKETCH_FILE = "scheduling-sketch.lp"
+
+
+def parse_sketch(statements):
+    """
+    Append the statements declaring the sketch externals to a parsed program.
+    """
+    parse_files([SKETCH_FILE], statements.append)
+    return statements
+
+
+class SketchShell(cmd.Cmd):
+    """
+    Pin routes, ban exchanges and narrow day distance ranges, then re-solve, all against one ground program. Each edit
+    only flips externals declared in `scheduling-sketch.lp`, so a solve costs search time alone.
+    """
+    intro = "Sketch a schedule. Type help or ? to list commands."
+    prompt = "(sketch) "
+
+    def __init__(self, ctrl: clingo.Control, instance, save=None):
+        super().__init__()
+        self.ctrl = ctrl
+        self.instance = instance
+        self.save = save
+        self.pins = set()
+        self.bans = set()
+        self.ranges = {}
+        self.last = None
+        self.saves = 0
+        # Only the best model of each solve is of interest here
+        self.ctrl.configuration.solve.opt_mode = "opt"
+
+    def _assign(self, symbol, truth):
+        atom = self.ctrl.symbolic_atoms[symbol]
+        if atom is None or not atom.is_external:
+            return False
+        self.ctrl.assign_external(symbol, truth)
+        return True
+
+    def _error(self, message):
+        print(f"*** {message}")
+
+    def _parse(self, arg, *types):
+        parts = arg.split()
+        if len(parts) != len(types):
+            raise ValueError(f"expected {len(types)} arguments, got {len(parts)}")
+        return [convert(part) for convert, part in zip(types, parts)]
+
+    def do_pin(self, arg):
+        """pin DAY SLOT ROUTE_ID: assign a route to a slot of a day"""
+        try:
+            day, slot, route_id = self._parse(arg, int, int, str)
+        except ValueError as e:
+            return self._error(e)
+        if not self._assign(clingo.Function("pin", [clingo.Number(day), clingo.Number(slot), clingo.String(route_id)]),
+                            True):
+            return self._error(f"No day {day}, slot {slot} or route {route_id}")
+        self.pins.add((day, slot, route_id))
+
+    def do_unpin(self, arg):
+        """unpin DAY [SLOT] | unpin all: remove pins from a day, a slot of a day, or everywhere"""
+        parts = arg.split()
+        try:
+            if parts == ["all"]:
+                removed = set(self.pins)
+            elif len(parts) == 1:
+                removed = {pin for pin in self.pins if pin[0] == int(parts[0])}
+            elif len(parts) == 2:
+                removed = {pin for pin in self.pins if pin[:2] == (int(parts[0]), int(parts[1]))}
+            else:
+                return self._error("expected DAY [SLOT] or all")
+        except ValueError as e:
+            return self._error(e)
+        for day, slot, route_id in removed:
+            self._assign(clingo.Function("pin", [clingo.Number(day), clingo.Number(slot), clingo.String(route_id)]),
+                         False)
+        self.pins -= removed
+
+    def do_ban(self, arg):
+        """ban EXCHANGE_ID: don't use routes starting or ending at an exchange"""
+        try:
+            exchange_id, = self._parse(arg, str)
+        except ValueError as e:
+            return self._error(e)
+        if not self._assign(clingo.Function("ban", [clingo.String(exchange_id)]), True):
+            return self._error(f"No route starts or ends at {exchange_id}")
+        self.bans.add(exchange_id)
+
+    def do_unban(self, arg):
+        """unban EXCHANGE_ID | unban all: allow an exchange again"""
+        if arg.strip() == "all":
+            removed = set(self.bans)
+        elif arg.strip() in self.bans:
+            removed = {arg.strip()}
+        else:
+            return self._error(f"{arg.strip()} isn't banned")
+        for exchange_id in removed:
+            self._assign(clingo.Function("ban", [clingo.String(exchange_id)]), False)
+        self.bans -= removed
+
+    def _set_range(self, day, bounds, truth):
+        for name, miles in zip(("dayMinMiles", "dayMaxMiles"), bounds):
+            if not self._assign(clingo.Function(name, [clingo.Number(day), clingo.Number(miles)]), truth):
+                return False
+        return True
+
+    def do_range(self, arg):
+        """range DAY MIN MAX: require the total distance of a day to be within whole-mile bounds"""
+        try:
+            day, lower, upper = self._parse(arg, int, int, int)
+        except ValueError as e:
+            return self._error(e)
+        previous = self.ranges.pop(day, None)
+        if previous:
+            self._set_range(day, previous, False)
+        if not self._set_range(day, (lower, upper), True):
+            # Don't leave half of the bounds set
+            self._set_range(day, (lower, upper), False)
+            if previous:
+                self._set_range(day, previous, True)
+                self.ranges[day] = previous
+            return self._error(f"No day {day}, or bounds outside 0 to the sketchMaxMiles constant")
+        self.ranges[day] = (lower, upper)
+
+    def do_unrange(self, arg):
+        """unrange DAY: go back to the season's distance range for a day"""
+        try:
+            day, = self._parse(arg, int)
+        except ValueError as e:
+            return self._error(e)
+        if day not in self.ranges:
+            return self._error(f"Day {day} has no range set")
+        self._set_range(day, self.ranges.pop(day), False)
+
+    def do_sketch(self, arg):
+        """sketch: list the pins, bans and ranges in effect"""
+        for day, slot, route_id in sorted(self.pins):
+            print(f"pin {day} {slot} {route_id} ({self.instance['routes'][route_id]['name']})")
+        for exchange_id in sorted(self.bans):
+            print(f"ban {exchange_id}")
+        for day, (lower, upper) in sorted(self.ranges.items()):
+            print(f"range {day} {lower} {upper}")
+
+    def do_solve(self, arg):
+        """solve [SECONDS]: find the best schedule for the sketch, stopping after SECONDS if given. Ctrl-C stops early"""
+        try:
+            time_limit = float(arg) if arg.strip() else None
+        except ValueError as e:
+            return self._error(e)
+        best = None
+
+        def on_model(model):
+            nonlocal best
+            best = {
+                "atoms": model.symbols(shown=True),
+                "cost": model.cost,
+                "priority": model.priority,
+                "optimal": model.optimality_proven,
+                "found_time": datetime.datetime.now(),
+            }
+
+        start = time.perf_counter()
+        with self.ctrl.solve(on_model=on_model, async_=True) as handle:
+            try:
+                while not handle.wait(1.0):
+                    if time_limit is not None and time.perf_counter() - start > time_limit:
+                        handle.cancel()
+                        break
+            except KeyboardInterrupt:
+                handle.cancel()
+            result = handle.get()
+        elapsed = time.perf_counter() - start
+        if result.unsatisfiable:
+            print(f"No schedule satisfies the sketch ({elapsed:.1f}s)")
+            return
+        if best is None:
+            print(f"No schedule found yet ({elapsed:.1f}s)")
+            return
+        best["optimal"] = best["optimal"] or bool(result.exhausted)
+        self.last = best
+        print(schedule_to_str(extract_schedule(best["atoms"], self.instance)))
+        print(costs_by_objective(self.instance, best["priority"], best["cost"]))
+        print(f"{'Optimal' if best['optimal'] else 'Best found'} after {elapsed:.1f}s")
+
+    def do_save(self, arg):
+        """save [NAME]: save the last schedule found, as NAME.json/.csv/.lp (default: sketch_<n>)"""
+        if self.last is None:
+            return self._error("Nothing solved yet")
+        if self.save is None:
+            return self._error("Saving isn't available")
+        self.saves += 1
+        self.save({**self.last, "file_name": arg.strip() or f"sketch_{self.saves}"})
+
+    def do_quit(self, arg):
+        """quit: leave the sketch shell"""
+        return True
+
+    def do_EOF(self, arg):
+        print()
+        return True
+
+    def emptyline(self):
+        # The default repeats the last command, which could be a long solve
+        pass
@@ -0,0 +1,174 @@
+import datetime
+import random
+import time
+
+import clingo
+
+NEIGHBORHOODS = ["window", "random", "exchange"]
+
+
+class LargeNeighborhoodSearch:
+    """
+    Improve a schedule by repeatedly freeing a few days and re-optimizing just those, with the assignments of every
+    other day fixed through assumptions. All iterations share one ground program, so each costs only a short search.
+
+    Neighborhoods are a window of consecutive days, a random subset of days, or the days whose routes start or end at
+    one exchange. The number of days freed grows when a neighborhood is searched exhaustively without improving, since
+    it was too small to escape the current schedule, and shrinks when the solver runs out of time on it.
+    """
+
+    def __init__(self, ctrl: clingo.Control, instance, neighborhood_size=4, iteration_time_limit=10.0, seed=0,
+                 on_improvement=None, telemetry=None):
+        self.ctrl = ctrl
+        self.instance = instance
+        self.neighborhood_size = neighborhood_size
+        self.iteration_time_limit = iteration_time_limit
+        self.rng = random.Random(seed)
+        self.on_improvement = on_improvement
+        self.telemetry = telemetry
+        self.stopped = False
+        self.literals = {}
+        self.day_literals = {}
+        for atom in ctrl.symbolic_atoms.by_signature("slotAssignment", 3):
+            if atom.is_fact:
+                continue
+            self.literals[atom.symbol] = atom.literal
+            self.day_literals.setdefault(atom.symbol.arguments[0].number, []).append(atom.literal)
+        self.days = sorted(self.day_literals)
+        self.initial = None
+        self.best = None
+
+    def _solve(self, assumptions, bound, time_limit, until_model=False):
+        """
+        Search under assumptions for models at least as good as bound. Returns the best model record (or None) and
+        whether the search space was exhausted. With until_model, the time limit only applies once there is a model.
+        """
+        self.ctrl.configuration.solve.opt_mode = "opt" if bound is None else f"opt,{','.join(map(str, bound))}"
+        best = None
+
+        def on_model(model):
+            nonlocal best
+            best = {
+                "atoms": model.symbols(shown=True),
+                "cost": list(model.cost),
+                "priority": model.priority,
+                # Optimal within the neighborhood only
+                "optimal": False,
+                "found_time": datetime.datetime.now(),
+            }
+            if self.telemetry:
+                self.telemetry.on_model(model.cost, model.priority)
+
+        start = time.perf_counter()
+        with self.ctrl.solve(assumptions=assumptions, on_model=on_model, async_=True) as handle:
+            while not handle.wait(0.1):
+                # The telemetry asks to stop the whole run if the search has stalled
+                if self.telemetry and self.telemetry.poll():
+                    self.stopped = True
+                    handle.cancel()
+                    break
+                if time.perf_counter() - start > time_limit and (best is not None or not until_model):
+                    handle.cancel()
+                    break
+            result = handle.get()
+        if self.telemetry:
+            self.telemetry.read_statistics(self.ctrl.statistics)
+        return best, bool(result.exhausted)
+
+    def _assumptions(self, fixed_days):
+        assigned = {self.literals[atom] for atom in self.best["atoms"] if atom in self.literals}
+        assumptions = []
+        for day in fixed_days:
+            for literal in self.day_literals[day]:
+                assumptions.append(literal if literal in assigned else -literal)
+        return assumptions
+
+    def _improve(self, record):
+        if self.initial is None:
+            self.initial = record
+        if self.best is None or record["cost"] < self.best["cost"]:
+            self.best = record
+            if self.on_improvement:
+                self.on_improvement(record)
+            return True
+        return False
+
+    def start(self, atoms=None):
+        """
+        Find the starting schedule: the given assignments if they're still feasible, otherwise the best model an
+        unconstrained solve finds in one iteration's time (waiting for the first, however long it takes). Returns False
+        if there's no schedule at all.
+        """
+        if atoms:
+            assigned = set(atoms)
+            assumptions = [literal if symbol in assigned else -literal for symbol, literal in self.literals.items()]
+            record, _ = self._solve(assumptions, None, self.iteration_time_limit, until_model=True)
+            if record:
+                self._improve(record)
+                return True
+            print("Starting schedule is infeasible for this program, solving from scratch")
+        record, _ = self._solve([], None, self.iteration_time_limit, until_model=True)
+        if record is None:
+            return False
+        self._improve(record)
+        return True
+
+    def neighborhood(self, kind):
+        size = min(self.neighborhood_size, len(self.days))
+        if kind == "window":
+            first = self.rng.randrange(len(self.days) - size + 1)
+            return set(self.days[first:first + size])
+        if kind == "exchange":
+            routes = self.instance["routes"]
+            touching = {}
+            for atom in self.best["atoms"]:
+                day, _, route_id = atom.arguments
+                route = routes[route_id.string]
+                for exchange in (route["start_exchange"], route["end_exchange"]):
+                    touching.setdefault(exchange, set()).add(day.number)
+            days = touching[self.rng.choice(sorted(touching))]
+            # Pad out small neighborhoods so they still have room to move
+            others = [day for day in self.days if day not in days]
+            return days | set(self.rng.sample(others, max(0, min(size - len(days), len(others)))))
+        return set(self.rng.sample(self.days, size))
+
+    def step(self):
+        """
+        Free one neighborhood and re-optimize it. Returns the kind of neighborhood, the days freed and whether the
+        schedule improved.
+        """
+        kind = self.rng.choice(NEIGHBORHOODS)
+        free = self.neighborhood(kind)
+        fixed = [day for day in self.days if day not in free]
+        record, exhausted = self._solve(self._assumptions(fixed), self.best["cost"], self.iteration_time_limit)
+        improved = record is not None and self._improve(record)
+        if not improved:
+            if exhausted:
+                self.neighborhood_size = min(len(self.days), self.neighborhood_size + 1)
+            else:
+                self.neighborhood_size = max(1, self.neighborhood_size - 1)
+        return kind, free, improved
+
+    def run(self, atoms=None, time_limit=None, iterations=None):
+        """
+        Improve from a starting schedule until the time limit or number of iterations is reached, or Ctrl-C. Returns
+        the best model record found.
+        """
+        start = time.perf_counter()
+        if not self.start(atoms):
+            print("Stopped before finding a schedule" if self.stopped else "No schedule satisfies the season")
+            return None
+        print(f"LNS starting from cost {self.best['cost']}")
+        iteration = 0
+        try:
+            while iterations is None or iteration < iterations:
+                if self.stopped or (time_limit is not None and time.perf_counter() - start > time_limit):
+                    break
+                kind, free, improved = self.step()
+                iteration += 1
+                if improved:
+                    print(f"Iteration {iteration}: freeing {kind} {sorted(free)} improved cost to {self.best['cost']}")
+        except KeyboardInterrupt:
+            print("Interrupted, stopping LNS")
+        print(f"LNS finished after {iteration} iterations with cost {self.best['cost']}")
+        return self.best
@@ -0,0 +1,310 @@
+import collections
+import time
+
+import clingo
+from clingo import ast
+from clingo.ast import ASTType, ProgramBuilder, Sign, Transformer, parse_files
+
+from run_scheduler.program import _SignatureCollector
+
+PLANS_FILE = "scheduling-plans.lp"
+
+
+def _signatures(nodes):
+    collector = _SignatureCollector()
+    for node in nodes:
+        collector(node)
+    return collector.signatures
+
+
+def _head_literals(head):
+    if head.ast_type in (ASTType.Aggregate, ASTType.Disjunction):
+        return [element.literal for element in head.elements]
+    if head.ast_type == ASTType.HeadAggregate:
+        return [element.condition.literal for element in head.elements]
+    return [head]
+
+
+def _body_literals(statement):
+    body = list(statement.body)
+    head = statement.head
+    if head.ast_type in (ASTType.Aggregate, ASTType.Disjunction):
+        body += [literal for element in head.elements for literal in element.condition]
+    elif head.ast_type == ASTType.HeadAggregate:
+        body += [literal for element in head.elements for literal in element.condition.condition]
+    return body
+
+
+def _is_constraint(statement):
+    return (statement.ast_type == ASTType.Rule and statement.head.ast_type == ASTType.Literal
+            and statement.head.atom.ast_type == ASTType.BooleanConstant)
+
+
+def dynamic_predicates(statements):
+    """
+    Signatures of the predicates whose atoms depend on the solver's choices: heads of choice rules and externals, and
+    everything derived from them. The rest of the program is fully determined by the facts.
+    """
+    dynamic = set()
+    rules = []
+    for statement in statements:
+        if statement.ast_type == ASTType.External:
+            dynamic |= _signatures([statement.atom])
+        elif statement.ast_type == ASTType.Rule and not _is_constraint(statement):
+            heads = _signatures(_head_literals(statement.head))
+            if statement.head.ast_type != ASTType.Literal:
+                dynamic |= heads
+            rules.append((heads, _signatures(_body_literals(statement))))
+    changed = True
+    while changed:
+        changed = False
+        for heads, body in rules:
+            if body & dynamic and not heads <= dynamic:
+                dynamic |= heads
+                changed = True
+    return dynamic
+
+
+def static_statements(statements, dynamic):
+    """
+    The rules (and constants) of a program that only derive predicates fixed by the facts.
+    """
+    static = []
+    for statement in statements:
+        if statement.ast_type in (ASTType.Program, ASTType.Definition):
+            static.append(statement)
+        elif (statement.ast_type == ASTType.Rule and statement.head.ast_type == ASTType.Literal
+              and not _is_constraint(statement) and not _signatures([statement.head]) & dynamic):
+            static.append(statement)
+    return static
+
+
+def _is_choice_of(statement, signature):
+    return (statement.ast_type == ASTType.Rule and statement.head.ast_type != ASTType.Literal
+            and _signatures(_head_literals(statement.head)) == {signature})
+
+
+class _DayAtoms(Transformer):
+    """
+    Finds the day argument of every slotAssignment/3 atom in a statement.
+    """
+
+    def __init__(self):
+        self.days = []
+
+    def visit_SymbolicAtom(self, atom):
+        symbol = atom.symbol
+        if symbol.ast_type == ASTType.Function and symbol.name == "slotAssignment" and len(symbol.arguments) == 3:
+            self.days.append(symbol.arguments[0])
+        return atom
+
+
+class _PlanSubstitution(Transformer):
+    """
+    Replaces slotAssignment(D, S, R) with planRoute(Plan, S, R), to evaluate a day's constraint on a single plan.
+    """
+
+    def __init__(self, plan):
+        self.plan = plan
+
+    def visit_SymbolicAtom(self, atom):
+        symbol = atom.symbol
+        if symbol.ast_type == ASTType.Function and symbol.name == "slotAssignment" and len(symbol.arguments) == 3:
+            return atom.update(symbol=symbol.update(name="planRoute", arguments=[self.plan, *symbol.arguments[1:]]))
+        return atom
+
+
+def per_day_day_variable(statement, dynamic):
+    """
+    The day variable of an integrity constraint that only looks at the routes assigned to one day, or None. Such a
+    constraint's only dynamic atoms are slotAssignment/3 atoms, all of the same day variable, so whether it's violated
+    depends on nothing but the plan chosen for that day.
+    """
+    if not _is_constraint(statement):
+        return None
+    if _signatures(statement.body) & dynamic != {("slotAssignment", 3)}:
+        return None
+    finder = _DayAtoms()
+    for literal in statement.body:
+        finder(literal)
+    if not finder.days or any(day.ast_type != ASTType.Variable for day in finder.days):
+        return None
+    if len({day.name for day in finder.days}) != 1:
+        return None
+    return finder.days[0]
+
+
+def _violation_rule(statement, index, day):
+    """
+    `__violated(index, Plan, D) :- planDay(Plan, D), <body with slotAssignment(D, S, R) as planRoute(Plan, S, R)>.`
+    """
+    location = statement.location
+    plan = ast.Variable(location, "Plan__")
+    substitution = _PlanSubstitution(plan)
+    body = [substitution(literal) for literal in statement.body]
+    body.append(ast.Literal(location, Sign.NoSign, ast.SymbolicAtom(ast.Function(location, "planDay", [plan, day], 0))))
+    head = ast.Literal(location, Sign.NoSign, ast.SymbolicAtom(ast.Function(
+        location, "__violated", [ast.SymbolicTerm(location, clingo.Number(index)), plan, day], 0)))
+    return ast.Rule(location, head, body)
+
+
+def enumerate_chains(routes, distances, slots, max_distance=None):
+    """
+    Every sequence of distinct routes, up to one per slot, where each route starts at the exchange the previous one
+    ended at and the total distance doesn't exceed max_distance (if there is one). Routes are joined through an index
+    of routes by start exchange, so only chains that connect are ever built.
+    """
+    if max_distance is None:
+        max_distance = float("inf")
+    by_start = collections.defaultdict(list)
+    for route_id, (start, end) in routes.items():
+        if route_id in distances:
+            by_start[start].append(route_id)
+    chains = []
+
+    def extend(chain, total, end):
+        chains.append((tuple(chain), total))
+        if len(chain) == slots:
+            return
+        for route_id in by_start.get(end, []):
+            distance = distances[route_id]
+            if route_id in chain or total + distance > max_distance:
+                continue
+            chain.append(route_id)
+            extend(chain, total + distance, routes[route_id][1])
+            chain.pop()
+
+    for route_id, (start, end) in sorted(routes.items()):
+        if route_id in distances and distances[route_id] <= max_distance:
+            extend([route_id], distances[route_id], end)
+    return chains
+
+
+def _plan_facts(chains, plan_days, slots):
+    facts = []
+    for plan, days_of_plan in sorted(plan_days.items()):
+        if not days_of_plan:
+            continue
+        chain, total = chains[plan]
+        facts.append(f"plan({plan},{total}).")
+        facts += [f"planRoute({plan},{slot},{clingo.String(route_id)})." for slot, route_id in zip(slots, chain)]
+        facts += [f"planDay({plan},{day})." for day in sorted(days_of_plan)]
+    return "\n".join(facts)
+
+
+def _is_pin(statement):
+    """
+    Whether a statement derives slotAssignment/3 atoms outside the choice rule: a route pinned to a slot.
+    """
+    return (statement.ast_type == ASTType.Rule and statement.head.ast_type == ASTType.Literal
+            and not _is_constraint(statement) and _signatures([statement.head]) == {("slotAssignment", 3)})
+
+
+def build_plans(statements, facts_path=None, context=None):
+    """
+    Enumerate every feasible day plan ahead of time, and rewrite the program to choose one plan per day instead of a
+    route for every slot.
+
+    The parts of the program that don't depend on the solver's choices are ground first to find the routes, days, slots
+    and distance ranges. Plans are chained routes whose total fits a day's range. Then every integrity constraint that
+    only concerns the routes of one day (slot ordering, exchange chaining, distance ranges, bans) is evaluated against
+    each plan for each day; plans that violate one are dropped for that day, and the constraints themselves are dropped
+    from the program, since no remaining plan can violate them.
+
+    Days without a dayDistRange take chains of any length. Routes pinned to a slot by slotAssignment/3 facts (or rules
+    over facts) only leave the plans of their day that have the route in that slot. If a slotAssignment/3 atom depends
+    on the solver's choices instead, plans can't account for it, and the compiled constraints stay in the program.
+
+    Returns the rewritten statements, the plan facts as ASP text, and a report including the days left without any
+    feasible plan.
+    """
+    timings = {}
+    start = time.perf_counter()
+    dynamic = dynamic_predicates(statements)
+    pins = [statement for statement in statements if _is_pin(statement)]
+    static_pins = [statement for statement in pins if not _signatures(_body_literals(statement)) & dynamic]
+    ctrl = clingo.Control(["--warn=none"])
+    with ProgramBuilder(ctrl) as builder:
+        for statement in static_statements(statements, dynamic) + static_pins:
+            builder.add(statement)
+    if facts_path:
+        ctrl.load(str(facts_path))
+    ctrl.ground([("base", [])], context=context)
+    atoms = ctrl.symbolic_atoms
+    routes = {atom.symbol.arguments[0].string: (atom.symbol.arguments[2], atom.symbol.arguments[3])
+              for atom in atoms.by_signature("route", 4)}
+    distances = {atom.symbol.arguments[0].string: atom.symbol.arguments[1].number
+                 for atom in atoms.by_signature("routeDistance", 2)}
+    days = sorted(atom.symbol.arguments[0].number for atom in atoms.by_signature("day", 1))
+    slots = sorted(atom.symbol.arguments[0].number for atom in atoms.by_signature("daySlot", 1))
+    day_ranges = collections.defaultdict(set)
+    for atom in atoms.by_signature("dayDistRange", 3):
+        day, lower, upper = atom.symbol.arguments
+        day_ranges[day.number].add((lower.number, upper.number))
+    # Days with the same ranges (or none) take the same plans
+    ranges = collections.defaultdict(list)
+    for day in days:
+        ranges[frozenset(day_ranges[day])].append(day)
+    pinned = collections.defaultdict(lambda: collections.defaultdict(set))
+    for atom in atoms.by_signature("slotAssignment", 3):
+        day, slot, route_id = atom.symbol.arguments
+        pinned[day.number][slot.number].add(route_id.string)
+    timings["ground_static"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    # Only bounded if every day has a range
+    max_distance = None
+    if all(day_ranges[day] for day in days):
+        max_distance = max((min(upper for _, upper in bounds) for bounds in ranges), default=0)
+    chains = enumerate_chains(routes, distances, len(slots), max_distance)
+    plan_days = collections.defaultdict(set)
+    for plan, (chain, total) in enumerate(chains):
+        for bounds, range_days in ranges.items():
+            if all(lower <= total <= upper for lower, upper in bounds):
+                plan_days[plan].update(range_days)
+        routes_by_slot = dict(zip(slots, chain))
+        for day, pins_of_day in pinned.items():
+            # Two routes pinned to one slot leave the day without any plan
+            if any({routes_by_slot.get(slot)} != route_ids for slot, route_ids in pins_of_day.items()):
+                plan_days[plan].discard(day)
+    timings["enumerate"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    rewritten = []
+    compiled = []
+    rules = [ast.Program(statements[0].location, "check", [])]
+    for statement in statements:
+        if _is_choice_of(statement, ("slotAssignment", 3)):
+            continue
+        day = per_day_day_variable(statement, dynamic)
+        if day is None:
+            rewritten.append(statement)
+        else:
+            rules.append(_violation_rule(statement, len(compiled), day))
+            compiled.append(statement)
+            if len(static_pins) < len(pins):
+                rewritten.append(statement)
+    ctrl.add("check", [], _plan_facts(chains, plan_days, slots))
+    with ProgramBuilder(ctrl) as builder:
+        for rule in rules:
+            builder.add(rule)
+    ctrl.ground([("check", [])], context=context)
+    violations = collections.Counter()
+    for atom in ctrl.symbolic_atoms.by_signature("__violated", 3):
+        index, plan, day = (argument.number for argument in atom.symbol.arguments)
+        plan_days[plan].discard(day)
+        violations[str(compiled[index])] += 1
+    timings["check"] = time.perf_counter() - start
+
+    facts = _plan_facts(chains, plan_days, slots)
+    plans_per_day = collections.Counter(day for days_of_plan in plan_days.values() for day in days_of_plan)
+    parse_files([PLANS_FILE], rewritten.append)
+    report = {
+        "plans": sum(1 for days_of_plan in plan_days.values() if days_of_plan),
+        "plans_per_day": {day: plans_per_day[day] for day in days},
+        "infeasible_days": [day for day in days if not plans_per_day[day]],
+        "constraints_compiled": len(compiled),
+        "violations": dict(violations),
+        "timings": timings,
+    }
+    return rewritten, facts, report
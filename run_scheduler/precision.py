@@ -0,0 +1,87 @@
+import time
+
+import clingo
+from clingo import ast
+from clingo.ast import ASTType, BinaryOperator, Sign, Transformer, parse_string
+
+from run_scheduler.domain import make_standard_func_ctx
+from run_scheduler.plans import build_plans
+from run_scheduler.program import add_program
+from run_scheduler.schedule import DECISION_SIGNATURES
+
+# Upper bounds of the day distance ranges grow by one unit of precision per slot, see widen_day_ranges
+SLACK_RULE = "coarseSlack(N) :- N = #count{ S: daySlot(S) }."
+
+
+class _WidenDayRanges(Transformer):
+    def visit_Rule(self, rule):
+        head = rule.head
+        if head.ast_type != ASTType.Literal or head.atom.ast_type != ASTType.SymbolicAtom:
+            return rule
+        symbol = head.atom.symbol
+        if symbol.ast_type != ASTType.Function or symbol.name != "dayDistRange" or len(symbol.arguments) != 3:
+            return rule
+        location = rule.location
+        slack = ast.Variable(location, "CoarseSlack__")
+        day, lower, upper = symbol.arguments
+        widened = ast.BinaryOperation(location, BinaryOperator.Plus, upper, slack)
+        head = head.update(atom=head.atom.update(symbol=symbol.update(arguments=[day, lower, widened])))
+        body = [*rule.body, ast.Literal(location, Sign.NoSign, ast.SymbolicAtom(
+            ast.Function(location, "coarseSlack", [slack], 0)))]
+        return rule.update(head=head, body=body)
+
+
+def widen_day_ranges(statements):
+    """
+    Relax every dayDistRange/3 so that no schedule feasible at full precision is lost at a coarser one.
+
+    Distances are always rounded up, so a day's total can only grow, by less than one unit of the coarse precision per
+    route. The lower bounds stay valid; the upper bounds are widened by the number of slots.
+    """
+    widen = _WidenDayRanges()
+    widened = [widen(statement) for statement in statements]
+    parse_string(SLACK_RULE, widened.append)
+    return widened
+
+
+def solve_coarse(statements, facts_path, arguments, time_limit, plans=False):
+    """
+    Ground and optimize the season with widened day ranges over facts at a coarse precision, for at most time_limit
+    seconds. Returns the decision atoms of the best schedule found (None if there isn't one) and a stage report.
+    """
+    statements = widen_day_ranges(statements)
+    ctrl = clingo.Control(arguments + ["--opt-mode=opt", "--warn=none"])
+    start = time.perf_counter()
+    plan_facts = None
+    if plans:
+        statements, plan_facts, _ = build_plans(statements, facts_path, context=make_standard_func_ctx())
+    add_program(ctrl, statements, facts_path, shown=DECISION_SIGNATURES)
+    if plan_facts:
+        ctrl.add("base", [], plan_facts)
+    ctrl.ground([("base", [])], context=make_standard_func_ctx())
+    ground = time.perf_counter() - start
+
+    best = None
+
+    def on_model(model):
+        nonlocal best
+        best = {"atoms": model.symbols(shown=True), "cost": list(model.cost)}
+
+    start = time.perf_counter()
+    with ctrl.solve(on_model=on_model, async_=True) as handle:
+        try:
+            while not handle.wait(1.0):
+                if time.perf_counter() - start > time_limit:
+                    handle.cancel()
+                    break
+        except KeyboardInterrupt:
+            print("Interrupted, moving on from the coarse stage")
+            handle.cancel()
+        result = handle.get()
+    report = {
+        "ground": ground,
+        "solve": time.perf_counter() - start,
+        "cost": best and best["cost"],
+        "optimal": bool(best and result.exhausted),
+    }
+    return best and best["atoms"], report
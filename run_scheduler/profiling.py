@@ -0,0 +1,281 @@
+import collections
+import contextlib
+import json
+import time
+
+import clingo
+from clingo import ast
+from clingo.ast import ASTType, ComparisonOperator, ProgramBuilder, Sign, Transformer
+
+
+class GroundProgramObserver(clingo.Observer):
+    """
+    Tallies what the grounder hands to the solver: normal, choice and weight rules and their sizes, plus the number of
+    literals in each priority level of the objective function.
+    """
+
+    def __init__(self):
+        self.rules = 0
+        self.choice_rules = 0
+        self.integrity_constraints = 0
+        self.rule_body_literals = 0
+        self.weight_rules = 0
+        self.weight_rule_literals = 0
+        self.largest_weight_rule = 0
+        self.minimize_literals = collections.Counter()
+
+    def rule(self, choice, head, body):
+        self.rules += 1
+        self.choice_rules += choice
+        self.integrity_constraints += not head and not choice
+        self.rule_body_literals += len(body)
+
+    def weight_rule(self, choice, head, lower_bound, body):
+        self.weight_rules += 1
+        self.weight_rule_literals += len(body)
+        self.largest_weight_rule = max(self.largest_weight_rule, len(body))
+
+    def minimize(self, priority, literals):
+        self.minimize_literals[priority] += len(literals)
+
+    def report(self):
+        return {
+            "rules": self.rules,
+            "choice_rules": self.choice_rules,
+            "integrity_constraints": self.integrity_constraints,
+            "rule_body_literals": self.rule_body_literals,
+            "weight_rules": self.weight_rules,
+            "weight_rule_literals": self.weight_rule_literals,
+            "largest_weight_rule": self.largest_weight_rule,
+            "minimize_literals_by_priority": {str(priority): count for priority, count in
+                                              sorted(self.minimize_literals.items(), reverse=True)},
+        }
+
+
+class _VariableCollector(Transformer):
+    def __init__(self, direct_only=False):
+        self.direct_only = direct_only
+        self.variables = set()
+
+    def visit_Variable(self, variable):
+        if variable.name != "_":
+            self.variables.add(variable.name)
+        return variable
+
+    def visit_BinaryOperation(self, term):
+        return self._visit_arithmetic(term)
+
+    def visit_UnaryOperation(self, term):
+        return self._visit_arithmetic(term)
+
+    def visit_Interval(self, term):
+        return self._visit_arithmetic(term)
+
+    def _visit_arithmetic(self, term):
+        # The grounder can't bind a variable from inside an arithmetic term
+        if self.direct_only:
+            return term
+        return term.update(**self.visit_children(term))
+
+
+def _variables(node, direct_only=False):
+    collector = _VariableCollector(direct_only)
+    collector(node)
+    return collector.variables
+
+
+def _binding_literals(literals, bound=frozenset()):
+    """
+    The subset of literals that can be used to enumerate the bindings of a rule body: positive atoms, and comparisons
+    whose variables those atoms (or an earlier `X = term` assignment) bind. Negative literals and aggregates can only
+    remove bindings, so leaving them out gives an upper bound on the number of ground instances.
+    """
+    atoms = [literal for literal in literals if literal.ast_type == ASTType.Literal and literal.sign == Sign.NoSign
+             and literal.atom.ast_type == ASTType.SymbolicAtom]
+    comparisons = [literal for literal in literals if literal.ast_type == ASTType.Literal
+                   and literal.sign == Sign.NoSign and literal.atom.ast_type == ASTType.Comparison]
+    bound = set(bound)
+    kept = []
+    changed = True
+    while changed:
+        changed = False
+        for atom in atoms:
+            if atom in kept:
+                continue
+            # Variables only under arithmetic have to be bound elsewhere first
+            if _variables(atom) <= bound | _variables(atom, direct_only=True):
+                kept.append(atom)
+                bound |= _variables(atom)
+                changed = True
+        for comparison in comparisons:
+            if comparison in kept:
+                continue
+            variables = _variables(comparison)
+            guards = comparison.atom.guards
+            if variables <= bound:
+                kept.append(comparison)
+                changed = True
+            elif (len(guards) == 1 and guards[0].comparison == ComparisonOperator.Equal
+                  and comparison.atom.term.ast_type == ASTType.Variable and _variables(guards[0].term) <= bound):
+                kept.append(comparison)
+                bound.add(comparison.atom.term.name)
+                changed = True
+    return kept, bound
+
+
+def _objective_name(literals):
+    for literal in literals:
+        if literal.ast_type != ASTType.Literal or literal.atom.ast_type != ASTType.SymbolicAtom:
+            continue
+        symbol = literal.atom.symbol
+        if symbol.ast_type == ASTType.Function and symbol.name == "objective" and len(symbol.arguments) == 2:
+            name = symbol.arguments[1]
+            if name.ast_type == ASTType.SymbolicTerm and name.symbol.type == clingo.SymbolType.String:
+                return name.symbol.string
+    return None
+
+
+def _aggregate_conditions(statement):
+    """
+    Yields (outer body literals, element condition literals) for every aggregate element in a statement.
+    """
+    body = list(statement.body) if statement.ast_type in (ASTType.Rule, ASTType.Minimize) else []
+    if statement.ast_type == ASTType.Rule:
+        head = statement.head
+        if head.ast_type in (ASTType.Aggregate, ASTType.Disjunction):
+            for element in head.elements:
+                yield body, list(element.condition)
+        elif head.ast_type == ASTType.HeadAggregate:
+            for element in head.elements:
+                yield body, list(element.condition.condition)
+    for literal in body:
+        if literal.ast_type == ASTType.Literal and literal.atom.ast_type in (ASTType.BodyAggregate, ASTType.Aggregate):
+            outer = [other for other in body if other is not literal]
+            for element in literal.atom.elements:
+                condition = element.condition
+                yield outer, list(condition)
+        elif literal.ast_type == ASTType.ConditionalLiteral:
+            outer = [other for other in body if other is not literal]
+            yield outer, list(literal.condition)
+
+
+def _aggregate_assignments(statement):
+    """
+    Number of body aggregates used as assignments (`X = #sum { ... }`). The grounder instantiates those once for every
+    value the aggregate could take, which doesn't show up in binding counts but can dominate the ground program.
+    """
+    count = 0
+    for literal in statement.body:
+        if literal.ast_type != ASTType.Literal or literal.atom.ast_type not in (ASTType.BodyAggregate, ASTType.Aggregate):
+            continue
+        for guard in (literal.atom.left_guard, literal.atom.right_guard):
+            if guard is not None and guard.comparison == ComparisonOperator.Equal and guard.term.ast_type == ASTType.Variable:
+                count += 1
+    return count
+
+
+def _counting_rule(location, index, literals):
+    kept, variables = _binding_literals(literals)
+    tuple_term = ast.Function(location, "", [ast.Variable(location, name) for name in sorted(variables)], 0)
+    head = ast.Literal(location, Sign.NoSign, ast.SymbolicAtom(
+        ast.Function(location, "__profile", [ast.SymbolicTerm(location, clingo.Number(index)), tuple_term], 0)))
+    return ast.Rule(location, head, kept)
+
+
+def rule_sizes(statements, symbolic_atoms, context=None):
+    """
+    Estimate how many ground instances each rule, weak constraint and aggregate element in the program produces.
+
+    Every atom the grounder created is added as a fact to a separate control, and each statement's body is replaced
+    by a rule collecting its variable bindings. Negative literals and aggregates are dropped from the bodies, so the
+    counts are upper bounds on what the real grounding produced, but they're directly comparable between rules.
+    """
+    counter = clingo.Control(["--warn=none"])
+    with counter.backend() as backend:
+        for atom in symbolic_atoms:
+            backend.add_rule([backend.add_atom(atom.symbol)])
+
+    entries = []
+    rules = []
+    for statement in statements:
+        if statement.ast_type not in (ASTType.Rule, ASTType.Minimize):
+            continue
+        # Facts and fact-like rules are already reflected in the atom counts
+        if statement.ast_type == ASTType.Rule and not statement.body:
+            continue
+        location = statement.location
+        entry = {
+            "location": f"{location.begin.filename}:{location.begin.line}",
+            "statement": str(statement),
+            "objective": _objective_name(statement.body),
+            "ground_instances": None,
+            "aggregate_elements": [],
+            "aggregate_assignments": _aggregate_assignments(statement),
+        }
+        rules.append(_counting_rule(location, len(rules), list(statement.body)))
+        entry["ground_instances"] = len(rules) - 1
+        for outer, condition in _aggregate_conditions(statement):
+            kept_outer, _ = _binding_literals(outer)
+            rules.append(_counting_rule(location, len(rules), kept_outer + condition))
+            entry["aggregate_elements"].append(len(rules) - 1)
+        entries.append(entry)
+
+    with ProgramBuilder(counter) as builder:
+        for rule in rules:
+            builder.add(rule)
+    counter.ground([("base", [])], context=context)
+    counts = collections.Counter(atom.symbol.arguments[0].number
+                                 for atom in counter.symbolic_atoms.by_signature("__profile", 2))
+
+    for entry in entries:
+        entry["ground_instances"] = counts[entry["ground_instances"]]
+        entry["aggregate_elements"] = [counts[index] for index in entry["aggregate_elements"]]
+    entries.sort(key=lambda entry: entry["ground_instances"] + sum(entry["aggregate_elements"]), reverse=True)
+    return entries
+
+
+def atom_counts(symbolic_atoms):
+    """
+    Number of ground atoms, and how many of those are facts, per predicate signature, largest first.
+    """
+    counts = []
+    for name, arity, positive in symbolic_atoms.signatures:
+        total = facts = 0
+        for atom in symbolic_atoms.by_signature(name, arity, positive):
+            total += 1
+            facts += atom.is_fact
+        counts.append({"signature": f"{'' if positive else '-'}{name}/{arity}", "atoms": total, "facts": facts})
+    counts.sort(key=lambda count: count["atoms"], reverse=True)
+    return counts
+
+
+class Profiler:
+    """
+    Collects wall times per stage of a run and reports on the size of the ground program, written out as JSON.
+    """
+
+    def __init__(self):
+        self.timings = {}
+        self.observer = GroundProgramObserver()
+        self.report = {"timings": self.timings}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+
+    def record_ground_program(self, ctrl, statements, context=None):
+        self.report["ground_program"] = self.observer.report()
+        self.report["atoms"] = atom_counts(ctrl.symbolic_atoms)
+        with self.stage("profile_rules"):
+            self.report["rules"] = rule_sizes(statements, ctrl.symbolic_atoms, context=context)
+
+    def record_statistics(self, statistics):
+        self.report["statistics"] = statistics
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump(self.report, f, indent=2)
@@ -0,0 +1,75 @@
+from clingo import SymbolType
+from clingo.ast import ASTType, ProgramBuilder, Transformer, parse_files
+
+DOMAIN_FILE = "scheduling-domain.lp"
+
+
+def parse_season(season, season_file=None):
+    """
+    Parse the scheduling domain and a season's file (from `schedules/`, unless a path is given) into a list of
+    statements.
+    """
+    statements = []
+    parse_files([DOMAIN_FILE, str(season_file or f"schedules/{season}.lp")], statements.append)
+    return statements
+
+
+def add_program(ctrl, statements, facts_path=None, shown=()):
+    """
+    Add parsed statements, a facts file and #show statements for the given (name, arity) signatures to a control.
+    """
+    with ProgramBuilder(ctrl) as builder:
+        for statement in statements:
+            builder.add(statement)
+    if facts_path:
+        ctrl.load(str(facts_path))
+    if shown:
+        ctrl.add("base", [], "".join(f"#show {name}/{arity}." for name, arity in shown))
+
+
+class _SignatureCollector(Transformer):
+    def __init__(self):
+        self.signatures = set()
+
+    def visit_SymbolicAtom(self, atom):
+        self._add(atom.symbol)
+        return atom
+
+    def _add(self, term):
+        if term.ast_type == ASTType.UnaryOperation:
+            # Classically negated atom
+            self._add(term.argument)
+        elif term.ast_type == ASTType.Pool:
+            for argument in term.arguments:
+                self._add(argument)
+        elif term.ast_type == ASTType.Function:
+            self.signatures.add((term.name, len(term.arguments)))
+        elif term.ast_type == ASTType.SymbolicTerm and term.symbol.type == SymbolType.Function:
+            self.signatures.add((term.symbol.name, len(term.symbol.arguments)))
+
+
+def referenced_predicates(statements):
+    """
+    Signatures (name, arity) of every predicate the program reads: atoms in rule bodies, in the conditions of head
+    aggregates and disjunctions, in weak constraints and in any other statement with a body. Atoms that only ever
+    occur as rule heads aren't included, since facts for them can't influence anything.
+    """
+    collector = _SignatureCollector()
+    for statement in statements:
+        if statement.ast_type == ASTType.Rule:
+            for literal in statement.body:
+                collector(literal)
+            head = statement.head
+            if head.ast_type in (ASTType.Aggregate, ASTType.Disjunction):
+                for element in head.elements:
+                    for literal in element.condition:
+                        collector(literal)
+            elif head.ast_type == ASTType.HeadAggregate:
+                for element in head.elements:
+                    for literal in element.condition.condition:
+                        collector(literal)
+        elif statement.ast_type == ASTType.ShowSignature:
+            collector.signatures.add((statement.name, statement.arity))
+        else:
+            collector(statement)
+    return collector.signatures
@@ -0,0 +1,67 @@
+import json
+import pathlib
+
+import clingo
+from clingo.backend import HeuristicType
+
+from run_scheduler.solution_log import SolutionLog, has_log
+
+# The settings a solution's costs are measured in, as solution records keep them
+PRECISION_KEYS = ("distance_precision", "duration_precision")
+
+
+def load_checkpoint(solution_dir: pathlib.Path, file_name="solution"):
+    """
+    The decision atoms, costs and precisions (by PRECISION_KEYS, None if not saved) of the best solution in an
+    earlier run's solution log, or of an exported solution if the run predates the log.
+    """
+    if has_log(solution_dir):
+        with SolutionLog(solution_dir) as log:
+            best = log.best()
+        if best is None:
+            raise ValueError(f"{solution_dir} has no solutions to resume from")
+        atoms = [clingo.parse_term(atom) for atom in best["atoms"]]
+    else:
+        with open(solution_dir / f"{file_name}.lp") as f:
+            atoms = [clingo.parse_term(line.strip().rstrip(".")) for line in f if line.strip()]
+        with open(solution_dir / f"{file_name}.json") as f:
+            best = json.load(f)
+    return atoms, best["costs"], {key: best.get(key) for key in PRECISION_KEYS}
+
+
+def add_warm_start(ctrl, atoms, signatures, priority=1):
+    """
+    Add domain heuristics that make the solver decide the atoms of a previous solution true first, and every other
+    atom with the same signatures false, so that its first model is the previous one (or as close as the program
+    allows). Only takes effect with `--heuristic=Domain`. A later warm start with a higher priority overrides an
+    earlier one. Returns how many of the atoms are in the ground program.
+    """
+    seeded = {atom for atom in atoms}
+    found = 0
+    with ctrl.backend() as backend:
+        for name, arity in signatures:
+            for symbolic_atom in ctrl.symbolic_atoms.by_signature(name, arity):
+                if symbolic_atom.is_fact:
+                    continue
+                if symbolic_atom.symbol in seeded:
+                    found += 1
+                    backend.add_heuristic(symbolic_atom.literal, HeuristicType.True_, 1, priority, [])
+                else:
+                    backend.add_heuristic(symbolic_atom.literal, HeuristicType.False_, 1, priority, [])
+    return found
+
+
+def cost_bound(instance, costs, precisions=None, saved_precisions=None):
+    """
+    The saved costs as an upper bound for `--opt-mode`, one value per priority level from the highest, or None unless
+    they were saved under exactly the program's objectives, each at a priority level of its own. A bound is a cost per
+    level, so one that skipped a level or merged two would bound the wrong ones. Also None if the costs were saved at
+    other precisions than the current ones, since they'd be in other units. Bounds are inclusive, so the previous
+    solution itself remains a model.
+    """
+    if precisions != saved_precisions:
+        return None
+    priorities = {name: priority for priority, name in instance["objectives"].items()}
+    if len(priorities) != len(instance["objectives"]) or set(costs) != set(priorities):
+        return None
+    return [costs[name] for name in sorted(costs, key=priorities.get, reverse=True)]
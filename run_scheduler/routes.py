@@ -1,17 +1,27 @@
 import csv
 import json
 import pathlib
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from glob import glob
 
 import clingo
 import clorm
+import numpy as np
 import os
-import haversine
 import yaml
 
 
 from run_scheduler.domain import RouteDistanceK, Ascent, Exchange, RoutePairDistanceK, Descent, Route, \
-    ExchangePairDistanceK
+    ExchangePairDistanceK, RouteOverlap, kPrecision
+from run_scheduler.distances import pairwise_distances, summarize_points, grid_cells, route_overlaps
+
+# List-valued route attributes become one fact per item, under a singular predicate name
+LIST_ATTRIBUTE_PREDICATES = {"neighborhoods": "neighborhood", "coarse_neighborhoods": "coarseNeighborhood"}
+
+# Side in miles of the grid cells tracks are compared on, and the least overlap worth a routeOverlap fact
+OVERLAP_CELL_SIZE = 0.05
+MIN_OVERLAP = 0.2
 
 
 def load_exchanges(exchange_filename: pathlib.Path):
@@ -24,35 +34,55 @@ def load_exchanges(exchange_filename: pathlib.Path):
     return exchanges
 
 
-def load_routes_from_dir(dir_path: pathlib.Path):
-    routes = []
-
-    for route_filename in dir_path.glob("*.geojson"):
+def summarize_route_file(route_filename: pathlib.Path, cell_size=OVERLAP_CELL_SIZE):
+    try:
+        # Load the route and metadata
+        with open(route_filename) as f:
+            route_data = json.load(f)
+        props = route_data["properties"]
+        title = props["name"]
+        # The solver only reasons about summaries of the track, so don't hold on to the points themselves
         try:
-            # Load the route and metadata
-            with open(route_filename) as f:
-                route_data = json.load(f)
-            props = route_data["properties"]
-            title = props["name"]
-            route = {
-                'title': title,
-                'id': props["id"],
-                'distance_mi': float(props["distance_mi"]),
-                'ascent_m': int(props["ascent_m"]),
-                'descent_m': int(props["descent_m"] if props["descent_m"] else -1),
-                'start_exchange': props["start"],
-                'end_exchange': props["end"],
-                'coordinates': route_data["geometry"]["coordinates"],
-                'attributes': {
-                    #"type": props["type"],
-                    "surface": props["surface"],
-                    "deprecated": "deprecated" in props,
-                }
+            centroid, bbox, point_count = summarize_points(route_data["geometry"]["coordinates"])
+            track = {
+                'centroid': centroid,
+                'bbox': bbox,
+                'point_count': point_count,
+                'cells': grid_cells(route_data["geometry"]["coordinates"], cell_size),
             }
-            routes.append(route)
-        except Exception as e:
-            print(f"Error loading route {route_filename}: {e}")
-    return routes
+        except ValueError as e:
+            # Without a track summary the route still gets its other facts, just no routePairDistance or routeOverlap
+            print(f"Route {props['id']} in {route_filename} has an unusable track, leaving it out of the pair "
+                  f"distance and overlap facts: {e}")
+            track = {}
+        return {
+            'title': title,
+            'id': props["id"],
+            'distance_mi': float(props["distance_mi"]),
+            'ascent_m': int(props["ascent_m"]),
+            'descent_m': int(props["descent_m"] if props["descent_m"] else -1),
+            'start_exchange': props["start"],
+            'end_exchange': props["end"],
+            **track,
+            'attributes': {
+                #"type": props["type"],
+                "surface": props["surface"],
+                "deprecated": "deprecated" in props,
+            }
+        }
+    except Exception as e:
+        print(f"Error loading route {route_filename}: {e}")
+        return None
+
+
+def load_routes_from_dir(dir_path: pathlib.Path, max_workers=None, cell_size=OVERLAP_CELL_SIZE):
+    route_filenames = sorted(dir_path.glob("*.geojson"))
+    if not route_filenames:
+        return []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        summaries = executor.map(partial(summarize_route_file, cell_size=cell_size), route_filenames,
+                                 chunksize=max(1, len(route_filenames) // 64))
+        return [route for route in summaries if route is not None]
 
 
 def load_routes_from_table(yaml_path: pathlib.Path):
@@ -83,102 +113,154 @@ def load_routes_from_table(yaml_path: pathlib.Path):
     return routes
 
 
+def load_dataset(routes_table: pathlib.Path, routes_dir: pathlib.Path, exchanges_path: pathlib.Path,
+                 cell_size=OVERLAP_CELL_SIZE):
+    # Load metadata from the compiled routes table
+    legs = load_routes_from_table(routes_table)
+    # Add track summaries from geojson files
+    summaries = {route["id"]: route for route in load_routes_from_dir(routes_dir, cell_size=cell_size)}
+    for leg in legs:
+        if leg["id"] in summaries:
+            summary = summaries[leg["id"]]
+            leg.update({key: summary[key] for key in ("centroid", "bbox", "point_count", "cells") if key in summary})
+    exchanges = load_exchanges(exchanges_path)
+    return legs, exchanges
+
+
 def flip_lat_long(lat_long_ele_point):
     return lat_long_ele_point[1], lat_long_ele_point[0], lat_long_ele_point[2]
 
 
-def routes_to_facts(routes, exchanges, distance_precision, duration_precision):
-    facts = []
-    Distance = RouteDistanceK(distance_precision)
+def route_overlap_percents(routes, min_overlap=MIN_OVERLAP):
+    """
+    (route id, route id, percent) for every pair of routes whose tracks overlap by at least min_overlap, as the
+    percentage of the shorter track's grid cells the other passes through too.
+    """
+    located_routes = [route for route in routes if not route["attributes"]["deprecated"] and "cells" in route]
+    rows, cols, fractions = route_overlaps([route["cells"] for route in located_routes], min_overlap)
+    percents = np.round(fractions * 100).astype(np.int64)
+    return [(located_routes[i]["id"], located_routes[j]["id"], percent)
+            for i, j, percent in zip(rows.tolist(), cols.tolist(), percents.tolist())]
+
+
+def _precision_numbers(values, precision):
+    # Same rounding as IntegerFieldK: always up, in floating point
+    values = np.asarray(values, dtype=np.float64)
+    if not np.isfinite(values).all():
+        # Casting would turn them into arbitrary integers
+        raise ValueError("Distances must be finite to convert them to fixed precision")
+    return np.ceil(values * 10 ** precision).astype(np.int64).tolist()
+
+
+def _fact_arguments(routes, exchanges, distance_precision, pair_radius=None, pair_neighbors=None, predicates=None,
+                    min_overlap=MIN_OVERLAP):
+    """
+    The predicate name and argument symbols of every fact for a dataset, for routes_to_facts and routes_to_symbols to
+    build. Only the fact families whose (name, arity) is in predicates are generated, if given. The predicate names
+    come from the clorm schema in domain.py, and the distance facts are converted to fixed precision a whole array at
+    a time.
+    """
+    def wanted(name, arity):
+        return predicates is None or (name, arity) in predicates
+
+    String, Number = clingo.String, clingo.Number
+    route_name = Route.meta.name
+    distance_name = RouteDistanceK(distance_precision).meta.name
     exchange_coords = {exchange_id: (exchanges[exchange_id]["coordinates"][1], exchanges[exchange_id]["coordinates"][0]) for exchange_id in exchanges}
-    all_dates = set()
     for route in routes:
         if route["attributes"]["deprecated"]:
             continue
-        start_id = exchanges[route["start_exchange"]]["id"]
-        end_id = exchanges[route["end_exchange"]]["id"]
-        facts.append(Route(route_id=route["id"], name=route["title"], start_exchange=start_id, end_exchange=end_id))
-        facts.append(Distance(route_id=route["id"], dist=route["distance_mi"]))
-        if route["ascent_ft"] != -1:
-            facts.append(Ascent(route_id=route["id"], ascent=round(route["ascent_ft"])))
-        if route["descent_ft"] != -1:
-            facts.append(Descent(route_id=route["id"], descent=round(route["descent_ft"])))
-        for attribute_name in route["attributes"]:
-            if not route["attributes"][attribute_name]:
+        route_id = String(route["id"])
+        if wanted(route_name, 4):
+            yield route_name, [route_id, String(route["title"]), String(exchanges[route["start_exchange"]]["id"]),
+                               String(exchanges[route["end_exchange"]]["id"])]
+        if wanted(distance_name, 2):
+            yield distance_name, [route_id, Number(kPrecision(route["distance_mi"], distance_precision))]
+        if route["ascent_ft"] != -1 and wanted(Ascent.meta.name, 2):
+            yield Ascent.meta.name, [route_id, Number(round(route["ascent_ft"]))]
+        if route["descent_ft"] != -1 and wanted(Descent.meta.name, 2):
+            yield Descent.meta.name, [route_id, Number(round(route["descent_ft"]))]
+        for attribute_name, value in route["attributes"].items():
+            name = LIST_ATTRIBUTE_PREDICATES.get(attribute_name, attribute_name)
+            if not value or not wanted(name, 2):
                 continue
             # Any special aspects of the leg which you may want to reason about can be shoved into attributes
-            attribute_type = clorm.simple_predicate(attribute_name, 2)
-            if type(route["attributes"][attribute_name]) == str:
-                facts.append(
-                    attribute_type(clingo.String(route["id"]), clingo.String(route["attributes"][attribute_name])))
-            elif type(route["attributes"][attribute_name]) == int:
-                facts.append(
-                    attribute_type(clingo.String(route["id"]), clingo.Number(route["attributes"][attribute_name])))
-            elif attribute_name == "neighborhoods":
-                attribute_type = clorm.simple_predicate("neighborhood", 2)
-                for neighborhood in route["attributes"][attribute_name]:
-                    facts.append(attribute_type(clingo.String(route["id"]), clingo.String(neighborhood)))
-            elif attribute_name == "coarse_neighborhoods":
-                attribute_type = clorm.simple_predicate("coarseNeighborhood", 2)
-                for neighborhood in route["attributes"][attribute_name]:
-                    facts.append(attribute_type(clingo.String(route["id"]), clingo.String(neighborhood)))
-
-    for route in routes:
-        if "dates_run" in route["attributes"]:
-            all_dates.update(route["attributes"]["dates_run"])
-    # Higher indices -> more recently run
-    sorted_dates = list(sorted(all_dates))
-    for route in routes:
-        if "dates_run" in route["attributes"] and len(route["attributes"]["dates_run"]) > 0:
-            last_run_index = sorted_dates.index(route["attributes"]["dates_run"][-1])
-            facts.append(clorm.simple_predicate("lastRun", 2)(clingo.String(route["id"]), clingo.Number(last_run_index)))
-        else:
-            facts.append(clorm.simple_predicate("lastRun", 2)(clingo.String(route["id"]), clingo.Number(-1)))
+            if type(value) == str:
+                yield name, [route_id, String(value)]
+            elif type(value) == int:
+                yield name, [route_id, Number(value)]
+            elif attribute_name in LIST_ATTRIBUTE_PREDICATES:
+                for item in value:
+                    yield name, [route_id, String(item)]
 
+    if wanted("lastRun", 2):
+        all_dates = set()
+        for route in routes:
+            all_dates.update(route["attributes"].get("dates_run", []))
+        # Higher indices -> more recently run
+        date_indices = {date: index for index, date in enumerate(sorted(all_dates))}
+        for route in routes:
+            dates_run = route["attributes"].get("dates_run")
+            last_run_index = date_indices[dates_run[-1]] if dates_run else -1
+            yield "lastRun", [String(route["id"]), Number(last_run_index)]
 
     for exchange_id, attr in exchanges.items():
-        facts.append(Exchange(exchange_id=exchange_id, name=attr["id"]))
-        for attribute_name in attr:
-            if not attr[attribute_name]:
+        if wanted(Exchange.meta.name, 2):
+            yield Exchange.meta.name, [String(exchange_id), String(attr["id"])]
+        for attribute_name, value in attr.items():
+            if not value or not wanted(attribute_name, 2):
                 continue
-            attribute_type = clorm.simple_predicate(attribute_name, 2)
-            if type(attr[attribute_name]) == str:
-                facts.append(attribute_type(clingo.String(exchange_id), clingo.String(attr[attribute_name])))
-            elif type(attr[attribute_name]) == int:
-                facts.append(attribute_type(clingo.String(exchange_id), clingo.Number(attr[attribute_name])))
-
-    # Compute geographic mean of each route by averaging the lat/long of each point
-    means = {}
-    for route in routes:
-        lat_sum = 0
-        long_sum = 0
-        for coord in route["coordinates"]:
-            lat_sum += coord[1]
-            long_sum += coord[0]
-        means[route["id"]] = ((lat_sum / len(route["coordinates"]), long_sum / len(route["coordinates"])))
-
-    PairDistance = RoutePairDistanceK(distance_precision)
-    pairwise_distances = []
-    for id1, coord1 in means.items():
-        for id2, coord2 in means.items():
-            if id1 != id2:
-                pairwise_distances.append(
-                    (id1, id2, haversine.haversine(coord1[:2], coord2[:2], unit=haversine.Unit.MILES)))
-                facts.append(PairDistance(route_a=id1, route_b=id2, dist=pairwise_distances[-1][2]))
-                facts.append(PairDistance(route_a=id2, route_b=id1, dist=pairwise_distances[-1][2]))
-            else:
-                facts.append(PairDistance(route_a=id1, route_b=id2, dist=0))
-                facts.append(PairDistance(route_a=id2, route_b=id1, dist=0))
-
-    ExchangeDistance = ExchangePairDistanceK(distance_precision)
-    pairwise_distances = []
-    for id1, coord1 in exchange_coords.items():
-        for id2, coord2 in exchange_coords.items():
-            if id1 != id2:
-                pairwise_distances.append((id1, id2, haversine.haversine(coord1[:2], coord2[:2], unit=haversine.Unit.MILES)))
-                facts.append(ExchangeDistance(exchange_a=id1, exchange_b=id2, dist=pairwise_distances[-1][2]))
-                facts.append(ExchangeDistance(exchange_a=id2, exchange_b=id1, dist=pairwise_distances[-1][2]))
-            else:
-                facts.append(ExchangeDistance(exchange_a=id1, exchange_b=id2, dist=0))
-                facts.append(ExchangeDistance(exchange_a=id2, exchange_b=id1, dist=0))
+            if type(value) == str:
+                yield attribute_name, [String(exchange_id), String(value)]
+            elif type(value) == int:
+                yield attribute_name, [String(exchange_id), Number(value)]
+
+    # Geographic mean of each route, computed when its track was loaded
+    located_routes = [route for route in routes if not route["attributes"]["deprecated"] and "centroid" in route]
+    pair_name = RoutePairDistanceK(distance_precision).meta.name
+    route_ids = [String(route["id"]) for route in located_routes]
+    rows, cols, dists = pairwise_distances([route["centroid"] for route in located_routes]
+                                           if wanted(pair_name, 3) else [], radius=pair_radius,
+                                           neighbors=pair_neighbors)
+    for i, j, dist in zip(rows.tolist(), cols.tolist(), _precision_numbers(dists, distance_precision)):
+        yield pair_name, [route_ids[i], route_ids[j], Number(dist)]
+
+    # Routes that share much of their path, compared only where their tracks pass through the same cells
+    if wanted(RouteOverlap.meta.name, 3):
+        for route_a, route_b, percent in route_overlap_percents(routes, min_overlap):
+            yield RouteOverlap.meta.name, [String(route_a), String(route_b), Number(percent)]
+
+    # Exchange pairs stay dense; objectives maximize over them, so the far pairs are the interesting ones
+    exchange_pair_name = ExchangePairDistanceK(distance_precision).meta.name
+    exchange_ids = [String(exchange_id) for exchange_id in exchange_coords]
+    rows, cols, dists = pairwise_distances(list(exchange_coords.values())
+                                           if wanted(exchange_pair_name, 3) else [])
+    for i, j, dist in zip(rows.tolist(), cols.tolist(), _precision_numbers(dists, distance_precision)):
+        yield exchange_pair_name, [exchange_ids[i], exchange_ids[j], Number(dist)]
+
+
+def routes_to_facts(routes, exchanges, distance_precision, duration_precision, pair_radius=None, pair_neighbors=None,
+                    predicates=None, min_overlap=MIN_OVERLAP):
+    """
+    A dataset's facts as clorm Predicate instances.
+    """
+    predicate_types = {}
+    facts = []
+    for name, arguments in _fact_arguments(routes, exchanges, distance_precision, pair_radius, pair_neighbors,
+                                           predicates, min_overlap):
+        signature = (name, len(arguments))
+        if signature not in predicate_types:
+            predicate_types[signature] = clorm.simple_predicate(name, len(arguments))
+        facts.append(predicate_types[signature](*arguments))
     return facts
+
+
+def routes_to_symbols(routes, exchanges, distance_precision, duration_precision, pair_radius=None,
+                      pair_neighbors=None, predicates=None, min_overlap=MIN_OVERLAP):
+    """
+    The same facts as routes_to_facts, in the same order, built directly as clingo symbols, without a clorm Predicate
+    instance per fact.
+    """
+    return [clingo.Function(name, arguments)
+            for name, arguments in _fact_arguments(routes, exchanges, distance_precision, pair_radius, pair_neighbors,
+                                                   predicates, min_overlap)]
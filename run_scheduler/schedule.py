@@ -1,5 +1,66 @@
+import xxhash
 from tabulate import tabulate
 
+# The atoms that make up a solution. Everything else in a model follows from these and the instance, so they're the
+# only atoms we have the solver show us.
+DECISION_SIGNATURES = [("slotAssignment", 3)]
+
+# Input predicates that index_instance reads back out of the ground program, whether or not any rule uses them
+EXTRACTED_PREDICATES = {("route", 4), ("routeDistance", 2)}
+
+
+def index_instance(symbolic_atoms, distance_precision):
+    """
+    Collect the route, day and objective metadata needed to describe schedules from a ground program, so that
+    extracting each model is a single pass over its decision atoms.
+    """
+    scale = 10 ** distance_precision
+    routes = {}
+    for atom in symbolic_atoms.by_signature("route", 4):
+        route_id, name, start, end = (argument.string for argument in atom.symbol.arguments)
+        routes[route_id] = {"name": name, "start_exchange": start, "end_exchange": end, "distance_mi": None}
+    for atom in symbolic_atoms.by_signature("routeDistance", 2):
+        route_id, dist = atom.symbol.arguments
+        if route_id.string in routes:
+            routes[route_id.string]["distance_mi"] = dist.number / scale
+    day_dist_ranges = {}
+    for atom in symbolic_atoms.by_signature("dayDistRange", 3):
+        day, lower, upper = atom.symbol.arguments
+        day_dist_ranges.setdefault(day.number, (lower.number / scale, upper.number / scale))
+    objectives = {atom.symbol.arguments[0].number: atom.symbol.arguments[1].string
+                  for atom in symbolic_atoms.by_signature("objective", 2)}
+    return {"routes": routes, "day_dist_ranges": day_dist_ranges, "objectives": objectives}
+
+
+def extract_schedule(atoms, instance):
+    days = {}
+    for atom in atoms:
+        if atom.match("slotAssignment", 3):
+            day, slot, route_id = atom.arguments
+            days.setdefault(day.number, []).append((slot.number, route_id.string))
+    schedule = []
+    for day in sorted(days):
+        route_ids = [route_id for _, route_id in sorted(days[day])]
+        routes = [instance["routes"][route_id] for route_id in route_ids]
+        schedule.append({
+            "route_id": route_ids,
+            "route_name": [route["name"] for route in routes],
+            "start_exchange": [route["start_exchange"] for route in routes],
+            "end_exchange": [route["end_exchange"] for route in routes],
+            "distance_mi": [route["distance_mi"] for route in routes],
+            "distance_range": instance["day_dist_ranges"].get(day, (None, None)),
+        })
+    return schedule
+
+
+def costs_by_objective(instance, priorities, costs):
+    return {instance["objectives"].get(priority, str(priority)): cost for priority, cost in zip(priorities, costs)}
+
+
+def solution_hash(atoms):
+    # Only comparable between runs of the same program: it's a hash of the decision atoms' text
+    return xxhash.xxh64_hexdigest("\n".join(sorted(str(atom) for atom in atoms)).encode())
+
 
 def schedule_to_str(schedule):
     rows = []
@@ -9,3 +70,11 @@ def schedule_to_str(schedule):
         rows.append([i + 1, "Total", "", sum(slot["distance_mi"]), "", ""])
 
     return tabulate(rows, headers=["Slot", "Index", "Route", "Distance", "Start", "End"], tablefmt="grid", floatfmt=".1f")
+
+
+def schedule_to_rows(schedule):
+    rows = [["day", "index", "route_id", "route_name", "distance_mi", "start_exchange", "end_exchange"]]
+    for i, slot in enumerate(schedule):
+        for j, (route_id, route_name, distance, start, end) in enumerate(zip(slot["route_id"], slot["route_name"], slot["distance_mi"], slot["start_exchange"], slot["end_exchange"])):
+            rows.append([i + 1, j + 1, route_id, route_name, distance, start, end])
+    return rows
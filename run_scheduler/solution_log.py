@@ -0,0 +1,143 @@
+import csv
+import datetime
+import json
+import pathlib
+import struct
+import zlib
+
+from run_scheduler.schedule import schedule_to_rows
+
+LOG_NAME = "solutions.log"
+INDEX_NAME = "solutions.idx"
+EXPORT_FORMATS = ("json", "csv", "lp")
+
+# Offset of the record in the log, its compressed length, whether it was proven optimal, and the id of the best model
+# logged up to and including it
+_INDEX_ENTRY = struct.Struct("<QI?I")
+
+
+def _rank(record):
+    # Models proven optimal first, then by their costs, which records keep in priority order from the highest
+    return not record.get("optimal"), list(record.get("costs", {}).values())
+
+
+class SolutionLog:
+    """
+    Every model of a run in two append-only files: `solutions.log` holds one zlib-compressed JSON record per model,
+    and `solutions.idx` a fixed-size entry per record with its offset, so any model can be read with one seek.
+
+    Models don't always improve on the ones before (a `--staged` stage can start from a worse one), so the best model
+    is the one with the lexicographically smallest costs among the models proven optimal, or failing that, among all.
+    Each index entry also holds the id of the best model so far, so finding the best model takes no more than reading
+    the last entry.
+    """
+
+    def __init__(self, run_dir, mode="r"):
+        """
+        mode is "r" to read a log, or "a" to append to it (creating it if needed) and read it back.
+        """
+        run_dir = pathlib.Path(run_dir)
+        # Appends always go to the end, whatever a read last seeked to
+        file_mode = "a+b" if mode == "a" else mode + "b"
+        self.log = open(run_dir / LOG_NAME, file_mode)
+        self.index = open(run_dir / INDEX_NAME, file_mode)
+        # The best model's id and rank, once an append has needed them
+        self._best = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        self.log.close()
+        self.index.close()
+
+    def __len__(self):
+        return self.index.seek(0, 2) // _INDEX_ENTRY.size
+
+    def append(self, record):
+        """
+        Add a record and return its model id.
+        """
+        model_id = len(self)
+        if self._best is None and model_id:
+            best_id = self.best_id()
+            self._best = best_id, _rank(self.read(best_id))
+        # Of models with the same rank, the latest is best
+        if self._best is None or _rank(record) <= self._best[1]:
+            self._best = model_id, _rank(record)
+        data = zlib.compress(json.dumps({"id": model_id, **record}).encode())
+        offset = self.log.seek(0, 2)
+        self.log.write(data)
+        self.log.flush()
+        # The index entry goes last, so readers never see a record that isn't fully written
+        self.index.write(_INDEX_ENTRY.pack(offset, len(data), bool(record.get("optimal")), self._best[0]))
+        self.index.flush()
+        return model_id
+
+    def _entry(self, model_id):
+        self.index.seek(model_id * _INDEX_ENTRY.size)
+        return _INDEX_ENTRY.unpack(self.index.read(_INDEX_ENTRY.size))
+
+    def read(self, model_id):
+        """
+        The record of a model. Negative ids count from the end.
+        """
+        count = len(self)
+        if model_id < 0:
+            model_id += count
+        if not 0 <= model_id < count:
+            raise IndexError(f"No model {model_id}, the log has {count}")
+        offset, length, _, _ = self._entry(model_id)
+        self.log.seek(offset)
+        return json.loads(zlib.decompress(self.log.read(length)))
+
+    def best_id(self):
+        """
+        The id of the best model, or None if the log is empty. Of models with the same costs, the latest is best.
+        """
+        count = len(self)
+        return self._entry(count - 1)[3] if count else None
+
+    def best(self):
+        best_id = self.best_id()
+        return None if best_id is None else self.read(best_id)
+
+
+def solution_record(passthrough_args, start_time, atoms=None, found_time=None):
+    """
+    A log record: the given fields, when the model was found relative to the start of the solve, and its atoms.
+    """
+    found_time = found_time or datetime.datetime.now()
+    out = {**passthrough_args}
+    out["startTime"] = start_time.isoformat()
+    out["foundTime"] = found_time.isoformat()
+    out["computeTime"] = (found_time - start_time).total_seconds()
+    if atoms:
+        out["atoms"] = [str(atom) for atom in atoms]
+    return out
+
+
+def has_log(run_dir):
+    return (pathlib.Path(run_dir) / INDEX_NAME).exists()
+
+
+def export_record(record, out_dir, file_name="solution", formats=EXPORT_FORMATS):
+    """
+    Write a record as the per-model files runs used to leave behind: `.json` without the atoms, `.csv` of the
+    schedule and `.lp` of the atoms.
+    """
+    out = {key: value for key, value in record.items() if key not in ("id", "atoms")}
+    if "json" in formats:
+        with open(f"{out_dir}/{file_name}.json", "w") as f:
+            json.dump(out, f, indent=2)
+    if "csv" in formats:
+        with open(f"{out_dir}/{file_name}.csv", "w") as f:
+            writer = csv.writer(f)
+            writer.writerows(schedule_to_rows(out["schedule"]))
+    if "lp" in formats and record.get("atoms"):
+        with open(f"{out_dir}/{file_name}.lp", "w") as f:
+            for atom in record["atoms"]:
+                f.write(f"{atom}.\n")
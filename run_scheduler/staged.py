@@ -0,0 +1,224 @@
+import datetime
+import math
+import time
+
+import clingo
+from clingo import ast
+from clingo.ast import ASTType, Sign, Transformer, parse_string
+
+from run_scheduler.resume import add_warm_start
+from run_scheduler.schedule import DECISION_SIGNATURES
+
+# The program part that bounds one priority level's cost, ground once for each level after its stage
+BOUND_PROGRAM = "objectiveBound"
+
+
+class _GateObjectives(Transformer):
+    """
+    Adds `objectiveActive(Priority)` to the body of every minimize (and maximize) element, and collects an external
+    declaring that atom for each, so levels can be switched on and off between solve calls.
+    """
+
+    def __init__(self):
+        self.externals = []
+
+    def visit_Minimize(self, minimize):
+        location = minimize.location
+        gate = ast.SymbolicAtom(ast.Function(location, "objectiveActive", [minimize.priority], 0))
+        false = ast.SymbolicTerm(location, clingo.Function("false"))
+        self.externals.append(ast.External(location, gate, minimize.body, false))
+        return minimize.update(body=[*minimize.body, ast.Literal(location, Sign.NoSign, gate)])
+
+
+def _bound_program(minimizes):
+    """
+    A constraint, for the parameters boundPriority and boundCost, that the sum of the elements at that priority is at
+    most that cost. Elements are summed over the same (weight, priority, terms) tuples the solver's minimize uses.
+    """
+    elements = []
+    for minimize in minimizes:
+        terms = ", ".join(str(term) for term in [minimize.weight, minimize.priority, *minimize.terms])
+        condition = ", ".join([*(str(literal) for literal in minimize.body), f"{minimize.priority} = boundPriority"])
+        elements.append(f"{terms} : {condition}")
+    return f"#program {BOUND_PROGRAM}(boundPriority, boundCost).\n:- #sum{{ {'; '.join(elements)} }} > boundCost."
+
+
+def stage_objectives(statements):
+    """
+    Make a program's objectives switchable one priority level at a time for StagedOptimization: each minimize element
+    only counts while its level's `objectiveActive/1` external is true, and the `objectiveBound(Priority, Cost)`
+    program part fixes a level's cost once its stage is done.
+    """
+    minimizes = [statement for statement in statements if statement.ast_type == ASTType.Minimize]
+    gate = _GateObjectives()
+    staged = [gate(statement) for statement in statements]
+    staged += gate.externals
+    # Switches to the bound part, so it has to come last
+    parse_string(_bound_program(minimizes), staged.append)
+    return staged
+
+
+class StagedOptimization:
+    """
+    Optimize a program's objectives one priority level at a time, from the highest, instead of all at once. Each stage
+    has only its own level switched on, so lower levels don't slow down proving its optimum. Once a stage is done,
+    its level's cost is bound to the best found (plus a tolerance) by grounding an `objectiveBound` part, and the next
+    stage starts on the same ground program.
+
+    Each stage starts from the best schedule so far: the solver is steered towards it with domain heuristics (with
+    `--heuristic=Domain`) and only accepts schedules at least as good at the stage's level, so a stage can't lose
+    ground its predecessors gained there. A stage ends when its optimum is proven, its time budget runs out, or the
+    telemetry flags it as stalled. If it found a better schedule, that's re-solved with every level on to get its full
+    costs and passed to on_improvement; otherwise the previous one stays the best.
+    """
+
+    def __init__(self, ctrl: clingo.Control, instance, tolerance=0.0, time_limits=(), on_improvement=None,
+                 telemetry=None):
+        self.ctrl = ctrl
+        self.instance = instance
+        self.tolerance = tolerance
+        self.time_limits = list(time_limits)
+        self.on_improvement = on_improvement
+        self.telemetry = telemetry
+        self.stopped = False
+        self.priorities = sorted({atom.symbol.arguments[0].number
+                                  for atom in ctrl.symbolic_atoms.by_signature("objectiveActive", 1)}, reverse=True)
+        self.literals = {atom.symbol: atom.literal for atom in ctrl.symbolic_atoms.by_signature("slotAssignment", 3)
+                         if not atom.is_fact}
+        self.stages = []
+        self.best = None
+        # The cost each finished level is bound to
+        self.bounds = {}
+
+    def _activate(self, priorities):
+        for priority in self.priorities:
+            self.ctrl.assign_external(clingo.Function("objectiveActive", [clingo.Number(priority)]),
+                                      priority in priorities)
+
+    def _solve(self, time_limit, assumptions=(), track=True, bound=None):
+        """
+        The best model found within time_limit seconds (None for no limit) at least as good as bound, or None, and
+        whether it's proven optimal. Only models of a stage are tracked by the telemetry.
+        """
+        self.ctrl.configuration.solve.opt_mode = "opt" if bound is None else f"opt,{','.join(map(str, bound))}"
+        best = None
+
+        def on_model(model):
+            nonlocal best
+            best = {
+                "atoms": model.symbols(shown=True),
+                "cost": list(model.cost),
+                "priority": model.priority,
+                "optimal": False,
+                "found_time": datetime.datetime.now(),
+            }
+            if self.telemetry and track:
+                self.telemetry.on_model(model.cost, model.priority)
+
+        start = time.perf_counter()
+        with self.ctrl.solve(assumptions=list(assumptions), on_model=on_model, async_=True) as handle:
+            try:
+                while not handle.wait(0.1):
+                    # A stalled stage moves on to the next one
+                    if self.telemetry and track and self.telemetry.poll():
+                        handle.cancel()
+                        break
+                    if time_limit is not None and time.perf_counter() - start > time_limit:
+                        handle.cancel()
+                        break
+            except KeyboardInterrupt:
+                print("Interrupted, bounding this stage by its best schedule and stopping")
+                self.stopped = True
+                handle.cancel()
+            result = handle.get()
+        if self.telemetry:
+            self.telemetry.read_statistics(self.ctrl.statistics)
+        return best, bool(best and result.exhausted)
+
+    def _evaluate(self, record):
+        """
+        The record with the costs of its schedule at every level.
+        """
+        self._activate(self.priorities)
+        assigned = set(record["atoms"])
+        assumptions = [literal if symbol in assigned else -literal for symbol, literal in self.literals.items()]
+        evaluated, _ = self._solve(None, assumptions, track=False)
+        return {**(evaluated or record), "found_time": record["found_time"]}
+
+    @staticmethod
+    def _cost_at(record, priority):
+        return dict(zip(record["priority"], record["cost"])).get(priority, 0)
+
+    def _bound(self, priority, cost):
+        """
+        Bound a level's cost to cost plus the tolerance, unless it's already bound at least that tightly. Returns the
+        level's bound.
+        """
+        bound = cost + math.ceil(abs(cost) * self.tolerance)
+        if priority not in self.bounds or bound < self.bounds[priority]:
+            self.ctrl.ground([(BOUND_PROGRAM, [clingo.Number(priority), clingo.Number(bound)])])
+            self.bounds[priority] = bound
+        return self.bounds[priority]
+
+    def _time_limit(self, index, deadline):
+        limits = [self.time_limits[min(index, len(self.time_limits) - 1)]] if self.time_limits else []
+        if deadline is not None:
+            limits.append(deadline - time.perf_counter())
+        return min(limits) if limits else None
+
+    def run(self, time_limit=None):
+        """
+        Run the stages in order until they're all done, the overall time limit is reached, or Ctrl-C. Returns the best
+        model record found, with costs at every level.
+        """
+        deadline = None if time_limit is None else time.perf_counter() + time_limit
+        proven = True
+        last = len(self.priorities) - 1
+        for index, priority in enumerate(self.priorities):
+            name = self.instance["objectives"].get(priority, str(priority))
+            stage_limit = self._time_limit(index, deadline)
+            if stage_limit is not None and stage_limit <= 0:
+                print(f"Out of time before the {name} stage")
+                break
+            if self.telemetry:
+                self.telemetry.start_stage(name)
+            self._activate({priority})
+            previous = None
+            bound = None
+            if self.best:
+                previous = self._cost_at(self.best, priority)
+                add_warm_start(self.ctrl, self.best["atoms"], DECISION_SIGNATURES, priority=index + 1)
+                # Every other level is switched off, so costs 0
+                bound = [previous if level == priority else 0 for level in self.priorities]
+            start = time.perf_counter()
+            record, optimal = self._solve(stage_limit, bound=bound)
+            report = {"stage": name, "priority": priority, "solve": time.perf_counter() - start, "cost": None,
+                      "bound": None, "optimal": optimal}
+            self.stages.append(report)
+            improved = record is not None and (previous is None or self._cost_at(record, priority) < previous)
+            if not improved and previous is None:
+                print(f"No schedule in the {name} stage" if self.stopped or stage_limit is not None
+                      else "No schedule satisfies the season")
+                break
+            cost = self._cost_at(record, priority) if improved else previous
+            bound = self._bound(priority, cost)
+            report.update(cost=cost, bound=bound)
+            proven = proven and optimal and bound == cost
+            # Only the last stage's schedule can be optimal for the whole lexicographic order
+            if improved:
+                self.best = {**self._evaluate(record), "optimal": proven and index == last}
+                # It may be better than its predecessors at finished levels too, so later stages mustn't lose that
+                for level in self.bounds:
+                    self._bound(level, self._cost_at(self.best, level))
+                if self.on_improvement:
+                    self.on_improvement(self.best)
+            elif proven and index == last:
+                # Reported again now that it's proven, like optN does
+                self.best = {**self.best, "optimal": True}
+                if self.on_improvement:
+                    self.on_improvement(self.best)
+            print(f"Stage {name}: cost {cost}{'' if improved else ' (no better than before)'}, "
+                  f"{'optimal' if optimal else 'not proven optimal'} after {report['solve']:.1f}s, bounded to {bound}")
+            if self.stopped:
+                break
+        return self.best
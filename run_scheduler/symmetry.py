@@ -0,0 +1,232 @@
+import collections
+
+import clingo
+from clingo import ast
+from clingo.ast import ASTType, ComparisonOperator, ProgramBuilder, Transformer, parse_string
+
+from run_scheduler.plans import dynamic_predicates, static_statements
+
+# Where days come from: the first argument of each of these
+DAY_POSITIONS = {("day", 1): {0}, ("dayDistRange", 3): {0}, ("slotAssignment", 3): {0}}
+
+# Of two interchangeable days, the earlier one gets the route with the smaller id in its first slot. Days never share
+# a route, so sorting the days of any schedule this way gives an equivalent schedule that satisfies it
+SYMMETRY_RULE = """
+firstSlot(S) :- S = #min{ X: daySlot(X) }.
+:- symmetricDays(D1, D2), firstSlot(S), slotAssignment(D1, S, R1), slotAssignment(D2, S, R2), R1 > R2.
+"""
+# Only the routes make a schedule different from another
+PROJECTION = "#project slotAssignment/3."
+
+
+class _Atoms(Transformer):
+    """
+    Collects every symbolic atom (as its Function term) in a statement, every comparison, and the values aggregated by
+    #sum, #min and #max.
+    """
+
+    def __init__(self):
+        self.atoms = []
+        self.comparisons = []
+        self.values = []
+
+    def visit_SymbolicAtom(self, atom):
+        if atom.symbol.ast_type == ASTType.Function:
+            self.atoms.append(atom.symbol)
+        return atom
+
+    def visit_Comparison(self, comparison):
+        self.comparisons.append(comparison)
+        return comparison.update(**self.visit_children(comparison))
+
+    def visit_BodyAggregate(self, aggregate):
+        if aggregate.function != ast.AggregateFunction.Count:
+            self.values += [element.terms[0] for element in aggregate.elements if element.terms]
+        return aggregate.update(**self.visit_children(aggregate))
+
+    def visit_HeadAggregate(self, aggregate):
+        if aggregate.function != ast.AggregateFunction.Count:
+            self.values += [element.terms[0] for element in aggregate.elements if element.terms]
+        return aggregate.update(**self.visit_children(aggregate))
+
+
+class _Variables(Transformer):
+    def __init__(self):
+        self.names = []
+
+    def visit_Variable(self, variable):
+        self.names.append(variable.name)
+        return variable
+
+
+def _variables(node):
+    collector = _Variables()
+    collector(node)
+    return collector.names
+
+
+def _signature(atom):
+    return atom.name, len(atom.arguments)
+
+
+def day_positions(statements):
+    """
+    The argument positions of each predicate that hold days. Starting from DAY_POSITIONS, any argument of any atom in
+    a statement (a rule, whatever its head, a constraint, an external or a minimize) that is a variable also holding a
+    day elsewhere in the statement holds days too. So `startAt(D, E)` joined with `slotAssignment(D, 1, R)` makes the
+    first argument of startAt/2, and its facts, about days.
+    """
+    positions = collections.defaultdict(set, {signature: set(indices) for signature, indices in DAY_POSITIONS.items()})
+    changed = True
+    while changed:
+        changed = False
+        for statement in statements:
+            collector = _Atoms()
+            collector(statement)
+            day_variables = _day_variables(collector.atoms, positions)
+            for atom in collector.atoms:
+                for index, argument in enumerate(atom.arguments):
+                    if (argument.ast_type == ASTType.Variable and argument.name in day_variables
+                            and index not in positions[_signature(atom)]):
+                        positions[_signature(atom)].add(index)
+                        changed = True
+    return positions
+
+
+def _day_variables(atoms, positions):
+    # Every anonymous variable is a different one, so they don't join anything
+    return {atom.arguments[index].name for atom in atoms for index in positions.get(_signature(atom), ())
+            if atom.arguments[index].ast_type == ASTType.Variable and atom.arguments[index].name != "_"}
+
+
+def _order_sensitivity(statement, positions):
+    """
+    Why a statement could tell two days apart by more than their facts, or None: a day that isn't a variable (a day
+    number, or arithmetic like `D + 1`), or a day variable used for anything but matching other atoms and comparing for
+    (in)equality with another day variable, such as an ordering, arithmetic or an optimization weight.
+    """
+    if statement.ast_type == ASTType.External:
+        collector = _Atoms()
+        collector(statement.atom)
+        if any(positions.get(_signature(atom)) for atom in collector.atoms):
+            return "an external can be assigned day by day"
+        return None
+    collector = _Atoms()
+    collector(statement)
+    day_variables = set()
+    for atom in collector.atoms:
+        for index in positions.get(_signature(atom), ()):
+            argument = atom.arguments[index]
+            if argument.ast_type != ASTType.Variable:
+                return f"day {argument} of {atom.name}"
+            day_variables.add(argument.name)
+    if not day_variables:
+        return None
+    for comparison in collector.comparisons:
+        terms = [comparison.term, *(guard.term for guard in comparison.guards)]
+        if not set(_variables(comparison)) & day_variables:
+            continue
+        plain = all(term.ast_type == ASTType.Variable for term in terms)
+        equality = all(guard.comparison in (ComparisonOperator.Equal, ComparisonOperator.NotEqual)
+                       for guard in comparison.guards)
+        if not (plain and equality):
+            return f"comparison {comparison}"
+    if any(set(_variables(value)) & day_variables for value in collector.values):
+        return "a day aggregated as a value"
+    if statement.ast_type == ASTType.Minimize:
+        if set(_variables(statement.weight)) & day_variables or set(_variables(statement.priority)) & day_variables:
+            return "a day in an optimization weight"
+    return None
+
+
+def _is_active(statement, static, ground_atoms):
+    """
+    Whether a statement can apply at all: false if its body needs a static atom that doesn't exist, like the
+    objective/2 of an objective the season doesn't use.
+    """
+    for literal in getattr(statement, "body", []):
+        if (literal.ast_type != ASTType.Literal or literal.sign != ast.Sign.NoSign
+                or literal.atom.ast_type != ASTType.SymbolicAtom or literal.atom.symbol.ast_type != ASTType.Function):
+            continue
+        atom = literal.atom.symbol
+        if _signature(atom) not in static:
+            continue
+        pattern = [(index, argument.symbol) for index, argument in enumerate(atom.arguments)
+                   if argument.ast_type == ASTType.SymbolicTerm]
+        if not any(all(symbol.arguments[index] == value for index, value in pattern)
+                   for symbol in ground_atoms.get(_signature(atom), [])):
+            return False
+    return True
+
+
+def interchangeable_days(statements, facts_path=None, context=None):
+    """
+    Classes of days that can be swapped in any schedule without changing whether it's feasible or what it costs.
+
+    Days are told apart by the facts that mention them (their dayDistRange, say), so only days with exactly the same
+    facts can be interchangeable, and only if no active statement of the program can tell them apart otherwise:
+    objectives comparing consecutive days, constraints on a particular day, or externals that could pin a day.
+
+    Returns the classes of two or more days, and the reasons days aren't interchangeable at all (empty if they are).
+    """
+    positions = day_positions(statements)
+    dynamic = dynamic_predicates(statements)
+    ctrl = clingo.Control(["--warn=none"])
+    with ProgramBuilder(ctrl) as builder:
+        for statement in static_statements(statements, dynamic):
+            builder.add(statement)
+    if facts_path:
+        ctrl.load(str(facts_path))
+    ctrl.ground([("base", [])], context=context)
+    ground_atoms = collections.defaultdict(list)
+    for atom in ctrl.symbolic_atoms:
+        ground_atoms[(atom.symbol.name, len(atom.symbol.arguments))].append(atom.symbol)
+    static = set(ground_atoms) - dynamic
+
+    reasons = []
+    statics = {id(statement) for statement in static_statements(statements, dynamic)}
+    for statement in statements:
+        if id(statement) in statics or not _is_active(statement, static, ground_atoms):
+            continue
+        reason = _order_sensitivity(statement, positions)
+        if reason:
+            reasons.append(f"{reason} in `{statement}`")
+    if reasons:
+        return [], reasons
+
+    # Every static fact about a day, with the day itself left out
+    facts_of_day = collections.defaultdict(set)
+    excluded = set()
+    for signature, indices in positions.items():
+        if signature not in static:
+            continue
+        for symbol in ground_atoms.get(signature, []):
+            days = [symbol.arguments[index] for index in indices]
+            if len(days) > 1:
+                # Relates days to each other, so these can't be swapped independently
+                excluded.update(days)
+                continue
+            others = tuple(argument for index, argument in enumerate(symbol.arguments) if index not in indices)
+            facts_of_day[days[0]].add((signature, others))
+    classes = collections.defaultdict(list)
+    for day in sorted(ground_atoms.get(("day", 1), [])):
+        day = day.arguments[0]
+        if day not in excluded:
+            classes[frozenset(facts_of_day[day])].append(day)
+    return [days for days in classes.values() if len(days) > 1], []
+
+
+def break_symmetry(statements, classes):
+    """
+    Add constraints that order each class of interchangeable days by the route in their first slot, and project models
+    onto slotAssignment/3 so each schedule is only reported once. Projection only applies with the solver's `project`
+    option on.
+    """
+    program = [PROJECTION]
+    if classes:
+        program.append(SYMMETRY_RULE)
+        for days in classes:
+            program += [f"symmetricDays({day}, {next_day})." for day, next_day in zip(days, days[1:])]
+    statements = list(statements)
+    parse_string("\n".join(program), statements.append)
+    return statements
@@ -0,0 +1,122 @@
+import datetime
+import json
+import time
+
+# Solver counters to report, from statistics["solving"]["solvers"]
+COUNTERS = ("conflicts", "choices", "restarts")
+
+
+class Telemetry:
+    """
+    Appends a line of solver progress to a JSONL file every `interval` seconds while solving: models found so far, the
+    best cost at each objective priority, lower bounds when core-guided optimization proves them, and how long it's
+    been since any of those improved.
+
+    Clingo only makes its statistics readable between solve calls, so the conflict, choice and restart counters are
+    totals as of the last call to finish: after every LNS iteration, but only at the end of a single long solve. Lines
+    say how old the counters are.
+
+    If no bound improves for `stall_time` seconds, the run is flagged as stalled, and with `stop_on_stall` poll()
+    returns True so the caller can stop it.
+    """
+
+    def __init__(self, path, interval=10.0, stall_time=None, stop_on_stall=False):
+        self.file = open(path, "a")
+        self.interval = interval
+        self.stall_time = stall_time
+        self.stop_on_stall = stop_on_stall
+        self.start = time.perf_counter()
+        self.last_line = None
+        self.last_improvement = self.start
+        self.models = 0
+        self.priority = None
+        self.cost = None
+        self.lower = None
+        self.counters = dict.fromkeys(COUNTERS)
+        self.counters_read = None
+        self.stalled = False
+        self.stage = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def on_model(self, cost, priority):
+        """
+        Note a model. Cheap enough to call from the solver's on_model.
+        """
+        self.models += 1
+        cost = list(cost)
+        if self.cost is None or cost < self.cost:
+            self.cost = cost
+            self.priority = list(priority)
+            self.last_improvement = time.perf_counter()
+
+    def on_unsat(self, lower):
+        if lower and (self.lower is None or list(lower) > self.lower):
+            self.lower = list(lower)
+            self.last_improvement = time.perf_counter()
+
+    def start_stage(self, name):
+        """
+        Forget the bounds so far, for runs whose stages each optimize something different. Stalls are measured from
+        the start of the stage.
+        """
+        self.cost = self.priority = self.lower = None
+        self.last_improvement = time.perf_counter()
+        self.stalled = False
+        self.stage = name
+        self.write(self.line(event="stage"))
+
+    def read_statistics(self, statistics):
+        """
+        Add the counters of a solve call that just finished to the totals.
+        """
+        solvers = statistics["solving"]["solvers"]
+        for counter in COUNTERS:
+            self.counters[counter] = (self.counters[counter] or 0) + int(solvers[counter])
+        self.counters_read = time.perf_counter()
+
+    def line(self, now=None, event=None):
+        now = now or time.perf_counter()
+        line = {
+            "time": datetime.datetime.now().isoformat(),
+            "elapsed": now - self.start,
+            "models": self.models,
+            "cost": None if self.cost is None else dict(zip(self.priority, self.cost)),
+            "lower": self.lower,
+            "since_improvement": now - self.last_improvement,
+            **self.counters,
+            "counters_age": None if self.counters_read is None else now - self.counters_read,
+            "stalled": self.stalled,
+        }
+        if self.stage is not None:
+            line["stage"] = self.stage
+        if event:
+            line["event"] = event
+        return line
+
+    def write(self, line):
+        self.file.write(json.dumps(line) + "\n")
+        self.file.flush()
+
+    def poll(self):
+        """
+        Write a line if one is due and check for a stall. Returns True if the run should stop.
+        """
+        now = time.perf_counter()
+        if self.stall_time is not None and not self.stalled and now - self.last_improvement > self.stall_time:
+            self.stalled = True
+            print(f"No bound has improved for {self.stall_time}s, the solver looks stalled")
+            self.write(self.line(now, event="stall"))
+        if self.last_line is None or now - self.last_line >= self.interval:
+            self.last_line = now
+            self.write(self.line(now))
+        return self.stalled and self.stop_on_stall
+
+    def close(self):
+        if not self.file.closed:
+            self.write(self.line(event="end"))
+            self.file.close()
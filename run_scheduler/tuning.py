@@ -0,0 +1,193 @@
+import concurrent.futures
+import datetime
+import functools
+import itertools
+import json
+import os
+import pathlib
+import time
+
+import clingo
+
+from run_scheduler.domain import make_standard_func_ctx
+from run_scheduler.program import parse_season, add_program
+
+TUNING_DIR = pathlib.Path("tuning")
+
+# What a run uses when its season hasn't been tuned
+DEFAULT_CONFIG = {"threads": 4, "mode": "split"}
+
+PRESETS = ["frumpy", "jumpy", "tweety", "handy", "crafty", "trendy"]
+HEURISTICS = ["Berkmin", "Vsids", "Unit"]
+
+
+def config_arguments(config):
+    """
+    Clingo command line arguments for a solver configuration.
+    """
+    arguments = [f"--parallel-mode={config['threads']},{config['mode']}"]
+    if "opt_strategy" in config:
+        arguments.append(f"--opt-strategy={config['opt_strategy']}")
+    if "configuration" in config:
+        arguments.append(f"--configuration={config['configuration']}")
+    if "heuristic" in config:
+        arguments.append(f"--heuristic={config['heuristic']}")
+    return arguments
+
+
+def default_portfolio(cores):
+    """
+    Thread counts up to the number of cores, split vs compete and branch-and-bound vs core-guided optimization, then
+    each configuration preset and decision heuristic on top of the most parallel of those.
+    """
+    thread_counts = sorted({1, min(4, cores), max(1, cores // 2), cores})
+    portfolio = []
+    for threads, mode, opt_strategy in itertools.product(thread_counts, ["split", "compete"], ["bb", "usc"]):
+        if threads == 1 and mode == "compete":
+            # Same as split with a single thread
+            continue
+        portfolio.append({"threads": threads, "mode": mode, "opt_strategy": opt_strategy})
+    for preset in PRESETS:
+        portfolio.append({"threads": cores, "mode": "compete", "configuration": preset})
+    for heuristic in HEURISTICS:
+        portfolio.append({"threads": cores, "mode": "split", "heuristic": heuristic})
+    return portfolio
+
+
+def run_trial(season, facts_path, config, time_limit):
+    """
+    Ground the season and solve it to optimality under one configuration, giving up at the time limit. Times are
+    measured from the start of the solve, after grounding.
+    """
+    ctrl = clingo.Control(config_arguments(config) + ["--opt-mode=opt", "--warn=none"])
+    add_program(ctrl, parse_season(season), facts_path)
+    ground_start = time.perf_counter()
+    ctrl.ground([("base", [])], context=make_standard_func_ctx())
+    solve_start = time.perf_counter()
+    first_model = None
+    cost = None
+    models = 0
+
+    def on_model(model):
+        nonlocal first_model, cost, models
+        if first_model is None:
+            first_model = time.perf_counter() - solve_start
+        cost = list(model.cost)
+        models += 1
+
+    with ctrl.solve(on_model=on_model, async_=True) as handle:
+        finished = handle.wait(time_limit)
+        if not finished:
+            handle.cancel()
+        result = handle.get()
+    elapsed = time.perf_counter() - solve_start
+    return {
+        "config": config,
+        "ground": solve_start - ground_start,
+        "first_model": first_model,
+        # Exhausting the search space while optimizing means the last model is optimal
+        "optimum": elapsed if finished and result.exhausted and models else None,
+        "unsatisfiable": bool(finished and result.unsatisfiable),
+        "cost": cost,
+        "models": models,
+    }
+
+
+def trial_rank(trial):
+    # Proven optima first, fastest first. Then the lowest cost found, ties broken by how quickly the first model came.
+    # Trials that failed come last
+    if "error" in trial:
+        return 3, [], float("inf")
+    if trial["optimum"] is not None:
+        return 0, [], trial["optimum"]
+    if trial["cost"] is None:
+        return 2, [], float("inf")
+    return 1, trial["cost"], trial["first_model"]
+
+
+def run_packed(run, tasks, threads, cores):
+    """
+    Call run(task) for every task in a process pool, packing tasks onto the local cores so that the threads of the
+    tasks running at the same time never exceed them. threads(task) is the number of threads a task solves with.
+    Yields each task with its future as it finishes.
+    """
+    pending = sorted(tasks, key=threads, reverse=True)
+    running = {}
+    with concurrent.futures.ProcessPoolExecutor(max_workers=cores) as executor:
+        while pending or running:
+            free = cores - sum(threads(task) for task in running.values())
+            for task in list(pending):
+                # Tasks with more threads than there are cores still get to run, alone
+                if threads(task) > free and running:
+                    continue
+                pending.remove(task)
+                running[executor.submit(run, task)] = task
+                free -= threads(task)
+            done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                yield running.pop(future), future
+
+
+def race(season, facts_path, portfolio, time_limit, cores):
+    """
+    Run every configuration in the portfolio, at most as many threads at a time as there are cores.
+    """
+    results = []
+    run = functools.partial(run_trial, season, facts_path, time_limit=time_limit)
+    for config, future in run_packed(run, portfolio, lambda config: config["threads"], cores):
+        try:
+            trial = future.result()
+        except Exception as e:
+            trial = {"config": config, "error": str(e), "first_model": None, "optimum": None, "cost": None}
+        print(describe_trial(trial))
+        results.append(trial)
+    return results
+
+
+def describe_trial(trial):
+    def seconds(value):
+        return "-" if value is None else f"{value:.1f}s"
+    return (f"{' '.join(config_arguments(trial['config']))}: first model {seconds(trial['first_model'])}, "
+            f"optimum {seconds(trial['optimum'])}, cost {trial['cost']}")
+
+
+def tune(season, facts_path, time_limit, cores=None, portfolio=None):
+    """
+    Race a portfolio of solver configurations on a season and save the winner to `tuning/<season>.json`. If every
+    trial fails, nothing is saved (so runs keep their current configuration) and None is returned.
+    """
+    cores = cores or os.cpu_count()
+    portfolio = portfolio or default_portfolio(cores)
+    print(f"Racing {len(portfolio)} configurations on {cores} cores, {time_limit}s each")
+    results = race(season, facts_path, portfolio, time_limit, cores)
+    results.sort(key=trial_rank)
+    best = results[0]
+    if "error" in best:
+        print(f"Every configuration failed on {season}, not saving a tuned configuration. The first error: "
+              f"{best['error']}")
+        return None
+    TUNING_DIR.mkdir(exist_ok=True)
+    out = {
+        "season": season,
+        "tunedTime": datetime.datetime.now().isoformat(),
+        "cores": cores,
+        "timeLimit": time_limit,
+        "config": best["config"],
+        "arguments": config_arguments(best["config"]),
+        "trials": results,
+    }
+    with open(TUNING_DIR / f"{season}.json", "w") as f:
+        json.dump(out, f, indent=2)
+    print(f"Best configuration for {season}: {describe_trial(best)}")
+    return out
+
+
+def load_tuned_config(season):
+    """
+    The configuration saved by tune() for a season, or None if it hasn't been tuned.
+    """
+    path = TUNING_DIR / f"{season}.json"
+    if not path.exists():
+        return None
+    with open(path) as f:
+        return json.load(f)["config"]
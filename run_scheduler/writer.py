@@ -0,0 +1,64 @@
+import queue
+import threading
+
+_CLOSE = object()
+
+
+class SolutionWriter:
+    """
+    Runs `write(records)` on a background thread so that the solver's on_model callback only has to copy out what it
+    needs and enqueue it. Records that arrive while a batch is being written are collected into the next batch.
+
+    The queue is bounded: if the disk can't keep up, submit() blocks, rather than letting memory grow without limit.
+    Use as a context manager, or call close(), to write out everything still queued and stop the thread.
+    """
+
+    def __init__(self, write, max_pending=256, batch_size=32):
+        self.write = write
+        self.batch_size = batch_size
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.error = None
+        self.thread = threading.Thread(target=self._run, name="solution-writer", daemon=True)
+        self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def submit(self, record):
+        while True:
+            if self.error:
+                raise RuntimeError("Solution writer failed") from self.error
+            try:
+                self.queue.put(record, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def close(self):
+        if self.thread.is_alive():
+            self.queue.put(_CLOSE)
+            self.thread.join()
+        if self.error:
+            raise RuntimeError("Solution writer failed") from self.error
+
+    def _run(self):
+        closing = False
+        while not closing:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if _CLOSE in batch:
+                closing = True
+                batch = [record for record in batch if record is not _CLOSE]
+            try:
+                if batch:
+                    self.write(batch)
+            except Exception as e:
+                self.error = e
+                return
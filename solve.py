@@ -1,77 +1,37 @@
 #!/usr/bin/env python3
 
 import argparse
-import csv
 import datetime
-import json
 import os
 import pathlib
+import secrets
 
 
-import clorm
-import xxhash
-from clingo.ast import ProgramBuilder, parse_files
-from clorm import desc, FactBase
 from clorm.clingo import Control
+from tabulate import tabulate
 
 from run_scheduler.domain import Day, SlotAssignment, Exchange, Route, RouteDescent, Objective, \
     RouteAscent, Ascent, Descent, make_standard_func_ctx, \
-    PreferredDistanceK, DayDistRangeK, RouteDistanceK, DistancePrecision, DurationPrecision
-from run_scheduler.routes import load_routes_from_dir, routes_to_facts, load_exchanges, load_routes_from_table
-from run_scheduler.schedule import schedule_to_str, schedule_to_rows
-
-
-def extract_schedule(facts: clorm.FactBase, distance_precision: float, duration_precision: float):
-    RouteDist = RouteDistanceK(distance_precision)
-    DayDistRange = DayDistRangeK(distance_precision)
-    slot_routes = {slot_num: list(routes) for slot_num, routes in
-                       facts.query(SlotAssignment).group_by(SlotAssignment.day).select(SlotAssignment.route_id).all()}
-    slot_route_names = {slot_num: list(names) for slot_num, names in
-                            facts.query(SlotAssignment, Route).group_by(SlotAssignment.day).join(SlotAssignment.route_id == Route.route_id).select(Route.name).all()}
-    slot_route_starts = {slot_num: list(starts) for slot_num, starts in
-                            facts.query(SlotAssignment, Route).group_by(SlotAssignment.day).join(SlotAssignment.route_id == Route.route_id).select(Route.start_exchange).all()}
-    slot_route_ends = {slot_num: list(ends) for slot_num, ends in
-                            facts.query(SlotAssignment, Route).group_by(SlotAssignment.day).join(SlotAssignment.route_id == Route.route_id).select(Route.end_exchange).all()}
-    slot_route_dists = {slot_num: list(dists) for slot_num, dists in
-                            facts.query(SlotAssignment, RouteDist).group_by(SlotAssignment.day).join(SlotAssignment.route_id == RouteDist.route_id).select(RouteDist.dist).all()}
-    slot_dist_range = {slot_num: list(ranges)[0] for slot_num, ranges in
-                            facts.query(DayDistRangeK(distance_precision)).group_by(DayDistRange.day).select(DayDistRange.lower, DayDistRange.upper).all()}
-    schedule = []
-    for i, routes in slot_routes.items():
-        details = {}
-        details["route_id"] = routes
-        details["route_name"] = slot_route_names[i]
-        details["start_exchange"] =  slot_route_starts[i]
-        details["end_exchange"] =  slot_route_ends[i]
-        #details["start_exchange_name"] = exchange_names[exchange_start]
-        #details["end_exchange_name"] = exchange_names[exchange_end]
-        details["distance_mi"] = slot_route_dists[i]
-        details["distance_range"] = slot_dist_range.get(i, (None, None))
-        #details["ascent_ft"] = leg_ascent[leg_num]
-        #details["descent_ft"] = leg_descent[leg_num]
-        schedule.append(details)
-    return schedule
-
-
-def save_solution(passthrough_args, start_time, event_name="", file_name="solution", atoms=None):
-    out = {**passthrough_args}
-    out["startTime"] = start_time.isoformat()
-    out["foundTime"] = datetime.datetime.now().isoformat()
-    out["computeTime"] = (datetime.datetime.now() - start_time).total_seconds()
-    out_dir = f"solutions/{event_name}_{start_time.isoformat().replace(':', '_')}"
-    # Create solutions directory if it doesn't exist
-    if not os.path.exists(out_dir):
-        os.makedirs(out_dir)
-    with open(f"{out_dir}/{file_name}.json", "w") as f:
-        json.dump(out, f, indent=2)
-    with open(f"{out_dir}/{file_name}.csv", "w") as f:
-        rows = schedule_to_rows(out["schedule"])
-        writer = csv.writer(f)
-        writer.writerows(rows)
-    if atoms:
-        with open(f"{out_dir}/{file_name}.lp", "w") as f:
-            for atom in atoms:
-                f.write(f"{atom}.\n")
+    PreferredDistanceK, DayDistRangeK, RouteDistanceK
+from run_scheduler.cache import prepare
+from run_scheduler.routes import OVERLAP_CELL_SIZE, MIN_OVERLAP
+from run_scheduler.profiling import Profiler
+from run_scheduler.program import referenced_predicates, parse_season, add_program
+from run_scheduler.tuning import tune, load_tuned_config, config_arguments, DEFAULT_CONFIG
+from run_scheduler.schedule import schedule_to_str, index_instance, extract_schedule, \
+    costs_by_objective, solution_hash, DECISION_SIGNATURES, EXTRACTED_PREDICATES
+from run_scheduler.writer import SolutionWriter
+from run_scheduler.interactive import SketchShell, parse_sketch
+from run_scheduler.resume import load_checkpoint, add_warm_start, cost_bound
+from run_scheduler.lns import LargeNeighborhoodSearch
+from run_scheduler.plans import build_plans
+from run_scheduler.precision import solve_coarse
+from run_scheduler.solution_log import SolutionLog, export_record, solution_record, EXPORT_FORMATS, LOG_NAME
+from run_scheduler.telemetry import Telemetry
+from run_scheduler.symmetry import interchangeable_days, break_symmetry
+from run_scheduler.staged import StagedOptimization, stage_objectives
+from run_scheduler.distributed import Coordinator, add_cube_rule, enumerate_cubes, worker_setup, \
+    start_local_workers, parse_address, format_address
 
 
 def main(args):
@@ -82,86 +42,267 @@ def main(args):
     save_all_models = args.save_all_models
     event_name = season
     out_dir = args.out_dir
+    profiler = Profiler()
 
     # Clorm's `Control` wrapper will try to parse model facts into the predicates defined in domain.py.
-    ctrl = Control(
-        unifier=[Day, DayDistRangeK(args.distance_precision), SlotAssignment, RouteDistanceK(args.distance_precision), Exchange, Route,
-                 RouteAscent, RouteDescent, Objective, Ascent, Descent, PreferredDistanceK(args.distance_precision)])
+    unifier = [Day, DayDistRangeK(args.distance_precision), SlotAssignment, RouteDistanceK(args.distance_precision), Exchange, Route,
+               RouteAscent, RouteDescent, Objective, Ascent, Descent, PreferredDistanceK(args.distance_precision)]
+    # Use the configuration `--tune` found fastest for this season, if there is one
+    solver_config = (not args.ignore_tuning and load_tuned_config(season)) or DEFAULT_CONFIG
+    coarse_arguments = config_arguments(solver_config)
+    if args.resume or args.coarse_to_fine or args.staged:
+        # The warm start is expressed as domain heuristics, which replace whatever heuristic was tuned
+        solver_config = {**solver_config, "heuristic": "Domain"}
+    print(f"Solver configuration: {' '.join(config_arguments(solver_config))}")
+    ctrl = Control(arguments=config_arguments(solver_config), unifier=unifier)
     # Makes exceptions inscrutable. Disable if you need to debug
-    ctrl.configuration.solve.parallel_mode = "4,split"
     ctrl.configuration.solve.opt_mode = "optN"
-    with ProgramBuilder(ctrl) as b:
-        # Add season file
-        parse_files(
-            ["scheduling-domain.lp", f"schedules/{season}.lp"],
-        lambda ast: b.add(ast))
+    if args.profile:
+        ctrl.register_observer(profiler.observer)
+    with profiler.stage("parse"):
+        statements = parse_season(season)
+        if args.interactive:
+            parse_sketch(statements)
+    # Only generate the fact families the program can actually observe
+    predicates = None
+    if not args.all_facts:
+        predicates = tuple(sorted(referenced_predicates(statements) | EXTRACTED_PREDICATES))
 
     # You can supply a bundle of geojson routes and we'll
     # turn them into facts. Otherwise, all the facts
     # need to be in an .lp file in the folder.
+    facts_path = None
     if routes_dir:
-        # Load metadata from the compiled routes table
-        legs = load_routes_from_table(routes_table.expanduser())
-        # Add coordinates from geojson files
-        coordinates = load_routes_from_dir(routes_dir.expanduser())
-        for item in coordinates:
-            for leg in legs:
-                if leg["id"] == item["id"]:
-                    leg["coordinates"] = item["coordinates"]
-        exchanges = load_exchanges(args.exchanges.expanduser())
-        facts = routes_to_facts(legs, exchanges,distance_precision=args.distance_precision,
-                                duration_precision=args.duration_precision)
-        facts += [DistancePrecision(str(args.distance_precision)), DurationPrecision(str(args.duration_precision))]
-        ctrl.add_facts(FactBase(facts))
+        snapshot = prepare(routes_table.expanduser(), routes_dir.expanduser(), args.exchanges.expanduser(),
+                           args.cache_dir, distance_precision=args.distance_precision,
+                           duration_precision=args.duration_precision, rebuild=args.rebuild_cache,
+                           pair_radius=args.pair_radius, pair_neighbors=args.pair_neighbors,
+                           overlap_cell_size=args.overlap_cell_size, min_overlap=args.min_overlap,
+                           predicates=predicates)
+        print(f"{'Loaded' if snapshot['cached'] else 'Prepared'} dataset snapshot {snapshot['facts_path']}")
+        profiler.timings.update(snapshot["timings"])
+        if args.prepare:
+            return
+        facts_path = snapshot["facts_path"]
+    if args.tune:
+        tune(season, facts_path, args.tune_time_limit, cores=args.tune_cores)
+        return
+    # LNS holds days fixed, and ordering days would stop it from moving a route to one of them. A sketch can pin any day
+    if not args.no_symmetry_breaking and not (args.lns or args.coarse_to_fine or args.interactive):
+        with profiler.stage("symmetry"):
+            classes, reasons = interchangeable_days(statements, facts_path, context=make_standard_func_ctx())
+            statements = break_symmetry(statements, classes)
+        # Models that only differ in auxiliary atoms are the same schedule. Staged runs only look for the best model
+        if not args.staged:
+            ctrl.configuration.solve.project = "auto"
+        profiler.report["symmetry"] = {"classes": [[day.number for day in days] for days in classes],
+                                       "reasons": reasons}
+        if classes:
+            print(f"Days {', '.join(str([day.number for day in days]) for days in classes)} are interchangeable, "
+                  f"ordering each group by the route in its first slot")
+        elif reasons:
+            print(f"No interchangeable days because of {reasons[0]}")
+    coarse_atoms = None
+    if args.coarse_to_fine:
+        # A second snapshot of the same data, at the coarse precision
+        coarse_snapshot = prepare(routes_table.expanduser(), routes_dir.expanduser(), args.exchanges.expanduser(),
+                                  args.cache_dir, distance_precision=args.coarse_precision,
+                                  duration_precision=args.duration_precision, rebuild=args.rebuild_cache,
+                                  pair_radius=args.pair_radius, pair_neighbors=args.pair_neighbors,
+                                  overlap_cell_size=args.overlap_cell_size, min_overlap=args.min_overlap,
+                                  predicates=predicates)
+        print(f"Solving at precision {args.coarse_precision} for up to {args.coarse_time_limit}s")
+        with profiler.stage("coarse"):
+            coarse_atoms, coarse_report = solve_coarse(statements, coarse_snapshot["facts_path"], coarse_arguments,
+                                                       args.coarse_time_limit, plans=args.plans)
+        profiler.report["stages"] = [{"stage": "coarse", "precision": args.coarse_precision, **coarse_report}]
+        if coarse_atoms is None:
+            print("The coarse stage found no schedule, solving at full precision from scratch")
+    plan_facts = None
+    if args.plans:
+        with profiler.stage("plans"):
+            statements, plan_facts, plan_report = build_plans(statements, facts_path, context=make_standard_func_ctx())
+        profiler.report["plans"] = plan_report
+        print(f"Enumerated {plan_report['plans']} day plans, "
+              f"compiled {plan_report['constraints_compiled']} per-day constraints into them")
+        if plan_report["infeasible_days"]:
+            print(f"No plan satisfies the constraints on days {plan_report['infeasible_days']}, the season is unsatisfiable")
+            return
+    if args.staged:
+        statements = stage_objectives(statements)
+    distributed = args.workers is not None or args.listen is not None
+    if distributed:
+        statements = add_cube_rule(statements)
+    with profiler.stage("add_program"):
+        # Models only need to carry the decision atoms, the rest of the schedule is looked up from the instance
+        add_program(ctrl, statements, facts_path, shown=DECISION_SIGNATURES)
+        if plan_facts:
+            ctrl.add("base", [], plan_facts)
     print("Starting grounding at", datetime.datetime.now())
-    ctrl.ground([("base", [])], context=make_standard_func_ctx())
+    with profiler.stage("ground"):
+        ctrl.ground([("base", [])], context=make_standard_func_ctx())
+    instance = index_instance(ctrl.symbolic_atoms, args.distance_precision)
     if save_ground_model:
         with open("program.lpx", 'w') as f:
             for atom in ctrl.symbolic_atoms:
                 f.write(f"{atom.symbol}.\n")
+    atoms = coarse_atoms
+    if args.resume:
+        atoms, costs, saved_precisions = load_checkpoint(args.resume)
+        print(f"Seeded the solver with {add_warm_start(ctrl, atoms, DECISION_SIGNATURES)} of {len(atoms)} assignments "
+              f"from {args.resume}")
+        precisions = {"distance_precision": args.distance_precision, "duration_precision": args.duration_precision}
+        bound = cost_bound(instance, costs, precisions, saved_precisions)
+        if precisions != saved_precisions:
+            print(f"{args.resume} was saved with other precisions ({saved_precisions}), not bounding the cost")
+        elif bound is None:
+            print(f"Objectives changed since {args.resume} was saved, not bounding the cost")
+        else:
+            ctrl.configuration.solve.opt_mode = f"optN,{','.join(str(cost) for cost in bound)}"
+            print(f"Only looking for solutions at least as good as {costs}")
+    elif atoms:
+        print(f"Seeded the solver with {add_warm_start(ctrl, atoms, DECISION_SIGNATURES)} of {len(atoms)} assignments "
+              f"from the coarse schedule")
     solve_start_time = datetime.datetime.now()
     if not out_dir:
-        out_dir = out_dir = f"solutions/{event_name}_{solve_start_time.isoformat().replace(':', '_')}"
+        out_dir = f"solutions/{event_name}_{solve_start_time.isoformat().replace(':', '_')}"
+    os.makedirs(out_dir, exist_ok=True)
+    if args.profile:
+        profiler.record_ground_program(ctrl, statements, context=make_standard_func_ctx())
+        # Written now too, in case the solve never finishes
+        profiler.save(f"{out_dir}/profile.json")
     print("Starting solve at", solve_start_time)
-    model_id = 0
-    first_optimal_id = None
-    def on_model(model):
-        nonlocal model_id
-        nonlocal first_optimal_id
-        facts = model.facts(atoms=True)
-        # This hash should only be used for comparing solutions generated using the same version/dependencies. Clorm
-        # may change its string representation in the future, and the facts for a solution depend on the Python
-        # bindings for the predicates that we've specified.
-        factbase_hash = xxhash.xxh64_hexdigest(facts.asp_str(sorted=True))
-        objectives_by_priority = dict(
-            facts.query(Objective).order_by(desc(Objective.priority)).select(Objective.priority, Objective.name).all())
-        schedule = extract_schedule(facts, args.distance_precision, args.duration_precision)
+
+    def make_record(record):
+        schedule = extract_schedule(record["atoms"], instance)
         print(schedule_to_str(schedule))
-        costs = {objectives_by_priority[priority]: cost for priority, cost in zip(model.priority, model.cost)}
+        costs = costs_by_objective(instance, record["priority"], record["cost"])
         print(costs)
-        file_name = "solution"
-        if save_all_models:
-            file_name = f"{model_id}"
-        elif model.optimality_proven:
-            if not first_optimal_id:
-                first_optimal_id = model_id
-            file_name += f"_{model_id - first_optimal_id}"
-        save_solution({
+        return solution_record({
             "costs": costs,
             "distance_precision": args.distance_precision,
             "duration_precision": args.duration_precision,
             #"elevation_precision": args.elevation_precision,
-            "optimal": model.optimality_proven,
+            "optimal": record["optimal"],
             "schedule": schedule,
-            "hash": factbase_hash
-        },
-            solve_start_time, event_name, file_name, atoms=model.symbols(atoms=True))
+            "hash": solution_hash(record["atoms"])
+        }, solve_start_time, atoms=record["atoms"], found_time=record["found_time"])
+
+    if args.interactive:
+        SketchShell(ctrl.control_, instance,
+                    save=lambda record: export_record(make_record(record), out_dir, record["file_name"])).cmdloop()
+        return
+
+    def write_models(records):
+        for record in records:
+            model_id = log.append(make_record(record))
+            if save_all_models:
+                export_record(log.read(model_id), out_dir, str(model_id), export_formats or EXPORT_FORMATS)
 
-        model_id += 1
+    def on_model(model):
+        if telemetry:
+            telemetry.on_model(model.cost, model.priority)
+        # Everything else happens on the writer thread so the solver isn't held up by output
+        writer.submit({
+            "atoms": model.symbols(shown=True),
+            "cost": model.cost,
+            "priority": model.priority,
+            "optimal": model.optimality_proven,
+            "found_time": datetime.datetime.now(),
+        })
 
-    ctrl.solve(on_model=on_model)
+    time_limit = datetime.timedelta(seconds=args.time_limit or 0)
+    export_formats = [export_format for export_format in args.export.split(",") if export_format] if args.export else []
+    telemetry = None
+    if args.telemetry:
+        telemetry = Telemetry(f"{out_dir}/telemetry.jsonl", interval=args.telemetry_interval,
+                              stall_time=args.stall_time, stop_on_stall=args.stop_on_stall)
+        print(f"Writing solver progress to {out_dir}/telemetry.jsonl every {args.telemetry_interval}s")
+    with SolutionLog(out_dir, "a") as log:
+        with SolutionWriter(write_models) as writer, profiler.stage("solve"):
+            # The fine stage of --coarse-to-fine only searches around the coarse schedule
+            if args.lns or coarse_atoms:
+                search = LargeNeighborhoodSearch(ctrl.control_, instance, neighborhood_size=args.lns_neighborhood,
+                                                 iteration_time_limit=args.lns_iteration_time, seed=args.lns_seed,
+                                                 on_improvement=writer.submit, telemetry=telemetry)
+                search.run(atoms, time_limit=args.time_limit)
+                if coarse_atoms:
+                    profiler.report["stages"].append({
+                        "stage": "fine", "precision": args.distance_precision,
+                        "solve": (datetime.datetime.now() - solve_start_time).total_seconds(),
+                        "coarse_schedule_cost": search.initial and search.initial["cost"],
+                        "cost": search.best and search.best["cost"],
+                    })
+            elif args.staged:
+                time_limits = [float(limit) for limit in args.stage_time_limit.split(",")] if args.stage_time_limit else []
+                staged = StagedOptimization(ctrl.control_, instance, tolerance=args.stage_tolerance,
+                                            time_limits=time_limits, on_improvement=writer.submit, telemetry=telemetry)
+                staged.run(time_limit=args.time_limit)
+                profiler.report["objective_stages"] = staged.stages
+            elif distributed:
+                cubes = enumerate_cubes(ctrl.symbolic_atoms, args.cube_days)
+                shown = "".join(f"#show {name}/{arity}." for name, arity in DECISION_SIGNATURES)
+                # Each worker is one single-threaded solver, the parallelism comes from running more of them
+                setup = worker_setup(statements, facts_path, (plan_facts or "") + shown,
+                                     config_arguments({**solver_config, "threads": 1}))
+                authkey = (args.authkey or secrets.token_hex(16)).encode()
+                coordinator = Coordinator(cubes, setup, parse_address(args.listen or "localhost:0"), authkey,
+                                          cube_time=args.cube_time or None, on_model=writer.submit,
+                                          telemetry=telemetry)
+                print(f"Split the search into {len(cubes)} cubes by the start exchanges of the first "
+                      f"{args.cube_days} days")
+                if args.listen:
+                    print(f"Workers can join with: ./worker.py {format_address(coordinator.address)} "
+                          f"--authkey {authkey.decode()}")
+                local_workers = start_local_workers(coordinator.address, authkey, args.workers or 0)
+                coordinator.run(time_limit=args.time_limit)
+                for worker in local_workers:
+                    worker.join(timeout=10)
+                    if worker.is_alive():
+                        worker.terminate()
+            else:
+                on_unsat = telemetry.on_unsat if telemetry else None
+                with ctrl.solve(on_model=on_model, on_unsat=on_unsat, async_=True) as handle:
+                    try:
+                        # Wait in short slices so Ctrl-C reaches us; a blocking solve call would swallow it
+                        while not handle.wait(min(1.0, args.telemetry_interval)):
+                            if telemetry and telemetry.poll():
+                                print("Stopping the stalled solve and writing out pending solutions")
+                                handle.cancel()
+                                break
+                            if args.time_limit and datetime.datetime.now() - solve_start_time > time_limit:
+                                print("Time limit reached, stopping solve and writing out pending solutions")
+                                handle.cancel()
+                                break
+                    except KeyboardInterrupt:
+                        print("Interrupted, stopping solve and writing out pending solutions")
+                        handle.cancel()
+                if telemetry:
+                    telemetry.read_statistics(ctrl.statistics)
+        print(f"Saved {len(log)} solutions to {out_dir}/{LOG_NAME}")
+    if telemetry:
+        telemetry.close()
+    if export_formats:
+        with SolutionLog(out_dir) as log:
+            best = log.best()
+        if best:
+            export_record(best, out_dir, "solution", export_formats)
     print("Finished solve at", datetime.datetime.now())
     print("Elapsed time:", datetime.datetime.now() - solve_start_time)
+    if "stages" in profiler.report:
+        print(tabulate([[stage["stage"], stage["precision"], stage.get("ground", profiler.timings.get("ground")),
+                         stage["solve"], stage.get("coarse_schedule_cost", ""), stage["cost"]]
+                        for stage in profiler.report["stages"]],
+                       headers=["Stage", "Precision", "Ground (s)", "Solve (s)", "Starting cost", "Cost"],
+                       floatfmt=".2f"))
+    if "objective_stages" in profiler.report:
+        print(tabulate([[stage["stage"], stage["priority"], stage["solve"], stage["cost"], stage["bound"],
+                         stage["optimal"]] for stage in profiler.report["objective_stages"]],
+                       headers=["Stage", "Priority", "Solve (s)", "Cost", "Bound", "Optimal"], floatfmt=".2f"))
+    if args.profile:
+        profiler.record_statistics(ctrl.statistics)
+        profiler.save(f"{out_dir}/profile.json")
+        print(f"Saved profile to {out_dir}/profile.json")
 
 
 if __name__ == "__main__":
@@ -172,11 +313,49 @@ if __name__ == "__main__":
     parser.add_argument("routes_dir", type=pathlib.Path, help="Path to directory containing route geojson files")
     parser.add_argument("exchanges", type=pathlib.Path, help="Path to file containing exchange metadata")
     parser.add_argument("--out-dir", type=pathlib.Path, help="Path to directory to save solutions")
-    parser.add_argument("--save-all-models", action="store_true", help="Save all (even non-optimal) models found while solving")
+    parser.add_argument("--save-all-models", action="store_true", help="Export every model found while solving as files named by model id, not just the best one. All models are kept in the solution log either way")
+    parser.add_argument("--export", help="Comma separated formats (json, csv, lp) to export the best solution as when the run ends, in addition to the solution log")
     parser.add_argument("--save-ground-program", action="store_true", help="Store the ground program to 'program.lpx'. Use to debug lengthy ground-times, and to see which rules cause your domain to grow")
     parser.add_argument("--distance-precision", default=2.0, type=float, help="Number of decimal places of fixed precision to convert distance terms to")
     # Not implemented yet. Consider implementing if using elevation/duration optimization criteria heavily and programs are too big.
     #parser.add_argument("--elevation-precision", default=0.0, type=float, help="Number of decimal places of fixed precision to convert elevation terms to")
     parser.add_argument("--duration-precision", default=0.0, type=float, help="Number of decimal places of fixed precision to convert distance terms to")
+    parser.add_argument("--pair-radius", type=float, help="Only generate routePairDistance facts for routes whose centroids are within this many miles")
+    parser.add_argument("--pair-neighbors", type=int, help="Only generate routePairDistance facts for each route's k nearest routes")
+    parser.add_argument("--overlap-cell-size", default=OVERLAP_CELL_SIZE, type=float, help="Side in miles of the grid cells route tracks are compared on for routeOverlap facts")
+    parser.add_argument("--min-overlap", default=MIN_OVERLAP, type=float, help="Only generate routeOverlap facts for routes sharing at least this fraction of the shorter one's track")
+    parser.add_argument("--cache-dir", default=pathlib.Path(".cache"), type=pathlib.Path, help="Path to directory to store dataset snapshots in")
+    parser.add_argument("--rebuild-cache", action="store_true", help="Regenerate the dataset snapshot even if the inputs haven't changed")
+    parser.add_argument("--prepare", action="store_true", help="Only build the dataset snapshot, don't solve")
+    parser.add_argument("--all-facts", action="store_true", help="Generate every fact family from the route data, even those no rule refers to")
+    parser.add_argument("--profile", action="store_true", help="Time each stage, measure the ground program per predicate and rule, and save it all with the solver statistics to 'profile.json' next to the solutions")
+    parser.add_argument("--tune", action="store_true", help="Race a portfolio of solver configurations and save the best one for this season to 'tuning/<season>.json', which later runs use automatically")
+    parser.add_argument("--tune-time-limit", default=60.0, type=float, help="Seconds each configuration gets to prove optimality when tuning")
+    parser.add_argument("--tune-cores", type=int, help="Number of cores to race configurations on (default: all)")
+    parser.add_argument("--interactive", action="store_true", help="Ground once, then pin routes, ban exchanges and set day distance ranges from a prompt, re-solving after each change")
+    parser.add_argument("--time-limit", type=float, help="Stop solving after this many seconds, keeping the best solution found so far")
+    parser.add_argument("--resume", type=pathlib.Path, help="Path to an earlier run's solutions. Starts the search from its solution.lp and only accepts solutions at least as good")
+    parser.add_argument("--lns", action="store_true", help="Improve a schedule by repeatedly re-optimizing a few days at a time with the rest fixed, instead of solving the whole season at once. Runs until --time-limit or Ctrl-C")
+    parser.add_argument("--lns-neighborhood", default=4, type=int, help="Number of days LNS frees per iteration to begin with")
+    parser.add_argument("--lns-iteration-time", default=10.0, type=float, help="Seconds LNS spends re-optimizing each neighborhood")
+    parser.add_argument("--lns-seed", default=0, type=int, help="Seed for choosing LNS neighborhoods")
+    parser.add_argument("--plans", action="store_true", help="Enumerate every feasible day plan (chain of routes) before grounding and have the solver pick one per day, instead of a route per slot")
+    parser.add_argument("--coarse-to-fine", action="store_true", help="First solve with distances at --coarse-precision and day ranges widened to match, then improve that schedule at full precision with LNS until --time-limit")
+    parser.add_argument("--coarse-precision", default=0.0, type=float, help="Number of decimal places of distances in the coarse stage")
+    parser.add_argument("--coarse-time-limit", default=60.0, type=float, help="Seconds the coarse stage gets")
+    parser.add_argument("--staged", action="store_true", help="Optimize one objective priority level at a time, from the highest, fixing each level's cost before moving on to the next, instead of all levels at once")
+    parser.add_argument("--stage-time-limit", help="Comma separated seconds each --staged stage gets, from the highest priority. The last applies to the remaining stages (default: until proven optimal)")
+    parser.add_argument("--stage-tolerance", default=0.0, type=float, help="Fraction of a stage's best cost later stages may give up at that level, e.g. 0.05 to allow 5%% worse")
+    parser.add_argument("--workers", type=int, help="Split the search into cubes by the start exchanges of the first days and solve them on this many local worker processes, sharing the best cost between them")
+    parser.add_argument("--listen", help="HOST:PORT or Unix socket path to hand out cubes on, so workers on other hosts can join with worker.py. Use --workers 0 to only use those")
+    parser.add_argument("--authkey", help="Key workers have to present to join (default: random, printed with --listen)")
+    parser.add_argument("--cube-days", default=2, type=int, help="Number of days whose start exchanges split the search into cubes")
+    parser.add_argument("--cube-time", default=1.0, type=float, help="Seconds a worker first searches a cube before it goes to the back of the queue, doubled on each later turn (0 to search each cube until it's exhausted)")
+    parser.add_argument("--no-symmetry-breaking", action="store_true", help="Don't order days that are interchangeable (same facts, no objective telling them apart) or report each distinct schedule only once")
+    parser.add_argument("--telemetry", action="store_true", help="Append the solver's progress (models, best cost per objective priority, bounds, conflicts, choices and restarts) to 'telemetry.jsonl' next to the solutions while solving")
+    parser.add_argument("--telemetry-interval", default=10.0, type=float, help="Seconds between lines of telemetry")
+    parser.add_argument("--stall-time", type=float, help="With --telemetry, flag the run as stalled once no bound has improved for this many seconds")
+    parser.add_argument("--stop-on-stall", action="store_true", help="Stop solving once the run is flagged as stalled, keeping the best solution found so far")
+    parser.add_argument("--ignore-tuning", action="store_true", help="Use the default solver configuration even if the season has been tuned")
     args = parser.parse_args()
     main(args)
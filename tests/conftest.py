@@ -0,0 +1,28 @@
+import shutil
+
+import pytest
+
+from benchmarks.synthetic import generate_dataset
+from run_scheduler.cache import prepare
+
+
+@pytest.fixture(scope="session")
+def dataset(tmp_path_factory):
+    """
+    A small synthetic dataset: paths of its routes table, GeoJSON directory, exchanges and season.
+    """
+    return generate_dataset(tmp_path_factory.mktemp("dataset"), routes=24, exchanges=8, days=3, points_per_mile=10)
+
+
+@pytest.fixture
+def workspace(dataset, tmp_path, monkeypatch):
+    """
+    A working directory with the domain and the synthetic season in schedules/, and the dataset's facts file.
+    """
+    facts = prepare(dataset["routes_table"], dataset["routes_dir"], dataset["exchanges"], tmp_path / "cache",
+                    distance_precision=2, duration_precision=0)["facts_path"]
+    shutil.copy("scheduling-domain.lp", tmp_path)
+    (tmp_path / "schedules").mkdir()
+    shutil.copy(dataset["season"], tmp_path / "schedules" / "synthetic.lp")
+    monkeypatch.chdir(tmp_path)
+    return facts
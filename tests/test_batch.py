@@ -0,0 +1,64 @@
+import clingo
+import pytest
+
+from run_scheduler.batch import job_statements, load_manifest, override_program, run_job
+from run_scheduler.domain import make_standard_func_ctx
+from run_scheduler.program import add_program
+from run_scheduler.solution_log import SolutionLog
+
+
+def _objectives(job):
+    ctrl = clingo.Control(["--warn=none"])
+    ctrl.add("base", [], override_program(job, 2.0))
+    ctrl.ground([("base", [])])
+    return {atom.symbol.arguments[1].string: atom.symbol.arguments[0].number
+            for atom in ctrl.symbolic_atoms.by_signature("objective", 2)}
+
+
+def test_first_listed_objective_has_the_highest_priority():
+    priorities = _objectives({"objectives": ["split-route-mix", "exchange-diversity", "route-recency"]})
+    assert priorities == {"split-route-mix": 3, "exchange-diversity": 2, "route-recency": 1}
+
+
+def test_manifest_defaults_and_names(tmp_path):
+    path = tmp_path / "manifest.yml"
+    path.write_text("time_limit: 60\ncores: 2\njobs:\n  - season: a\n  - season: a\n    cores: 4\n    name: wide\n")
+    assert load_manifest(path) == [{"time_limit": 60, "cores": 2, "season": "a", "name": "0_a"},
+                                   {"time_limit": 60, "cores": 4, "season": "a", "name": "wide"}]
+    path.write_text("jobs:\n  - season: a\n    name: same\n  - season: b\n    name: same\n")
+    with pytest.raises(ValueError, match="same"):
+        load_manifest(path)
+
+
+def _day_ranges(job, facts):
+    ctrl = clingo.Control(["--warn=none"])
+    add_program(ctrl, job_statements(job, 2), facts)
+    ctrl.ground([("base", [])], context=make_standard_func_ctx())
+    ranges = {}
+    for atom in ctrl.symbolic_atoms.by_signature("dayDistRange", 3):
+        day, lower, upper = (argument.number for argument in atom.symbol.arguments)
+        ranges.setdefault(day, []).append((lower, upper))
+    return ranges
+
+
+def test_day_range_overrides_replace_the_seasons(workspace):
+    season = _day_ranges({"season": "synthetic"}, workspace)
+    assert sorted(season) == [1, 2, 3] and all(len(ranges) == 1 for ranges in season.values())
+    single = _day_ranges({"season": "synthetic", "day_ranges": {2: [9, 10]}}, workspace)
+    assert single == {**season, 2: [(900, 1000)]}
+    both = _day_ranges({"season": "synthetic", "day_ranges": {"all": [5, 30], 1: [20, 21]}}, workspace)
+    assert both == {1: [(2000, 2100)], 2: [(500, 3000)], 3: [(500, 3000)]}
+
+
+def test_job_runs_with_its_overrides(workspace, tmp_path):
+    job = {"name": "job", "season": "synthetic", "cores": 1, "time_limit": 60,
+           "objectives": ["route-recency", "exchange-diversity"], "ban": ["X0"]}
+    result = run_job(job, workspace, 2, 0, tmp_path / "out", ignore_tuning=True)
+    assert result["status"] == "optimal"
+    assert list(result["costs"]) == ["route-recency", "exchange-diversity"]
+    assert result["overrides"] == "objectives route-recency, exchange-diversity; ban X0"
+    with SolutionLog(tmp_path / "out" / "job") as log:
+        best = log.read(log.best_id())
+    assert best["optimal"] and best["costs"] == result["costs"]
+    for day in best["schedule"]:
+        assert "X0" not in day["start_exchange"] + day["end_exchange"]
@@ -0,0 +1,45 @@
+import shutil
+
+from run_scheduler.cache import prepare
+
+
+def _prepare(paths, cache_dir, distance_precision=2.0, **options):
+    return prepare(paths["routes_table"], paths["routes_dir"], paths["exchanges"], cache_dir,
+                   distance_precision=distance_precision, duration_precision=0.0, **options)
+
+
+def _copy(dataset, tmp_path):
+    shutil.copytree(dataset["routes_dir"].parent, tmp_path / "data")
+    return {key: tmp_path / "data" / path.relative_to(dataset["routes_dir"].parent) for key, path in dataset.items()}
+
+
+def test_unchanged_inputs_reuse_the_snapshot(dataset, tmp_path):
+    built = _prepare(dataset, tmp_path / "cache")
+    reused = _prepare(dataset, tmp_path / "cache")
+    assert not built["cached"] and reused["cached"]
+    assert reused["digest"] == built["digest"]
+    assert reused["facts_path"].read_text() == built["facts_path"].read_text()
+    assert [leg["id"] for leg in reused["legs"]] == [leg["id"] for leg in built["legs"]]
+    assert all((a["cells"] == b["cells"]).all() for a, b in zip(reused["legs"], built["legs"]))
+    assert reused["exchanges"] == built["exchanges"]
+
+
+def test_rebuild_ignores_the_snapshot(dataset, tmp_path):
+    built = _prepare(dataset, tmp_path / "cache")
+    rebuilt = _prepare(dataset, tmp_path / "cache", rebuild=True)
+    assert not rebuilt["cached"] and rebuilt["digest"] == built["digest"]
+
+
+def test_changed_track_invalidates_the_snapshot(dataset, tmp_path):
+    paths = _copy(dataset, tmp_path)
+    built = _prepare(paths, tmp_path / "cache")
+    track = sorted(paths["routes_dir"].glob("*.geojson"))[0]
+    track.write_text(track.read_text().replace('"surface": "', '"surface": "x'))
+    changed = _prepare(paths, tmp_path / "cache")
+    assert not changed["cached"] and changed["digest"] != built["digest"]
+
+
+def test_changed_settings_invalidate_the_snapshot(dataset, tmp_path):
+    built = _prepare(dataset, tmp_path / "cache")
+    assert _prepare(dataset, tmp_path / "cache", distance_precision=1.0)["digest"] != built["digest"]
+    assert _prepare(dataset, tmp_path / "cache", pair_neighbors=3)["digest"] != built["digest"]
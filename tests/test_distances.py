@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+from haversine import haversine, Unit
+
+from run_scheduler.distances import grid_cells, pairwise_distances, route_overlaps
+from run_scheduler.routes import route_overlap_percents
+
+# (lat, long) of points in a rough line, about a mile apart, and one far away
+POINTS = [(47.60, -122.33), (47.615, -122.33), (47.63, -122.33), (47.645, -122.33), (45.52, -122.68)]
+
+
+def _pairs(rows, cols, dists):
+    return {(i, j): dist for i, j, dist in zip(rows.tolist(), cols.tolist(), dists.tolist())}
+
+
+def test_every_ordered_pair_once_with_haversine_distances():
+    pairs = _pairs(*pairwise_distances(POINTS))
+    assert set(pairs) == {(i, j) for i in range(len(POINTS)) for j in range(len(POINTS))}
+    for (i, j), dist in pairs.items():
+        assert dist == pytest.approx(haversine(POINTS[i], POINTS[j], unit=Unit.MILES), rel=1e-6, abs=1e-9)
+
+
+def test_blocks_give_the_same_pairs():
+    whole = _pairs(*pairwise_distances(POINTS))
+    blocked = _pairs(*pairwise_distances(POINTS, block_size=2))
+    assert whole.keys() == blocked.keys()
+    assert np.allclose([whole[pair] for pair in whole], [blocked[pair] for pair in whole])
+
+
+def test_radius_drops_far_pairs():
+    pairs = _pairs(*pairwise_distances(POINTS, radius=2.5))
+    # The far point only pairs with itself, and the ends of the line are more than 2.5 miles apart
+    assert {pair for pair in pairs if 4 in pair} == {(4, 4)}
+    assert (0, 3) not in pairs and (0, 2) in pairs
+    assert all(dist <= 2.5 for dist in pairs.values())
+
+
+def test_neighbors_keeps_each_points_nearest_and_itself():
+    pairs = _pairs(*pairwise_distances(POINTS, neighbors=1))
+    assert {j for i, j in pairs if i == 0} == {0, 1}
+    assert {j for i, j in pairs if i == 2} in ({2, 1}, {2, 3})
+    # The southern end of the line is closest to the far point
+    assert {j for i, j in pairs if i == 4} == {4, 0}
+
+
+def test_radius_and_neighbors_both_apply():
+    pairs = _pairs(*pairwise_distances(POINTS, radius=2.5, neighbors=1))
+    assert {j for i, j in pairs if i == 4} == {4}
+
+
+def test_no_points():
+    rows, cols, dists = pairwise_distances([])
+    assert len(rows) == len(cols) == len(dists) == 0
+
+
+def _brute_force_overlaps(cells):
+    overlaps = {}
+    for i in range(len(cells)):
+        for j in range(i + 1, len(cells)):
+            shared = len(set(cells[i].tolist()) & set(cells[j].tolist()))
+            if shared:
+                overlaps[(i, j)] = shared / min(len(cells[i]), len(cells[j]))
+    return overlaps
+
+
+@pytest.mark.parametrize("block_size", [1 << 22, 3])
+def test_overlaps_match_comparing_every_pair(block_size):
+    rng = np.random.default_rng(0)
+    cells = [np.unique(rng.integers(0, 60, size=rng.integers(0, 25))) for _ in range(30)]
+    rows, cols, fractions = route_overlaps(cells, block_size=block_size)
+    assert (rows < cols).all()
+    overlaps = _pairs(rows, cols, fractions)
+    expected = _brute_force_overlaps(cells)
+    assert overlaps.keys() == expected.keys()
+    assert [overlaps[pair] for pair in expected] == pytest.approx(list(expected.values()))
+    rows, cols, fractions = route_overlaps(cells, min_overlap=0.5, block_size=block_size)
+    assert set(_pairs(rows, cols, fractions)) == {pair for pair, fraction in expected.items() if fraction >= 0.5}
+
+
+def test_track_along_part_of_another_overlaps_fully():
+    # GeoJSON [long, lat] tracks north along one street, one of them half as far, and one a few miles east
+    long_track = [[-122.33, 47.60], [-122.33, 47.64]]
+    short_track = [[-122.33, 47.61], [-122.33, 47.63]]
+    far_track = [[-122.25, 47.60], [-122.25, 47.64]]
+    cells = [grid_cells(track, 0.1) for track in (long_track, short_track, far_track)]
+    # About 2.8 miles of track in 0.1 mile cells, without gaps
+    assert 28 <= len(cells[0]) <= 30
+    routes = [{"id": route_id, "attributes": {"deprecated": False}, "cells": track_cells}
+              for route_id, track_cells in zip(["long", "short", "far"], cells)]
+    assert route_overlap_percents(routes, min_overlap=0.2) == [("long", "short", 100)]
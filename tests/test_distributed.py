@@ -0,0 +1,91 @@
+import threading
+from multiprocessing.connection import Client
+
+import clingo
+from clingo.ast import parse_string
+
+from run_scheduler.distributed import Coordinator, add_cube_rule, enumerate_cubes, start_local_workers, worker_setup
+
+# Three days of one or two chained routes, each day between 10 and 14 miles, as few miles as possible in all
+PROGRAM = """
+route("R1", "A", "B", 6). route("R2", "B", "C", 5). route("R3", "B", "A", 7).
+route("R4", "C", "C", 12). route("R5", "A", "A", 11). route("R6", "C", "A", 4).
+routeStart(R, E) :- route(R, E, _, _).
+routeEnd(R, E) :- route(R, _, E, _).
+routeDistance(R, Distance) :- route(R, _, _, Distance).
+day(1..3). daySlot(1..2).
+
+0{ slotAssignment(D, S, R): route(R, _, _, _) }1 :- day(D), daySlot(S).
+:- day(D), not slotAssignment(D, 1, _).
+:- slotAssignment(D, 2, _), not slotAssignment(D, 1, _).
+:- slotAssignment(D1, S1, R), slotAssignment(D2, S2, R), (D1, S1) != (D2, S2).
+:- slotAssignment(D, S, R1), slotAssignment(D, S, R2), R1 != R2.
+:- slotAssignment(D, 1, R1), slotAssignment(D, 2, R2), routeEnd(R1, E), not routeStart(R2, E).
+:- day(D), #sum{Distance, S: slotAssignment(D, S, R), routeDistance(R, Distance)} > 14.
+:- day(D), #sum{Distance, S: slotAssignment(D, S, R), routeDistance(R, Distance)} < 10.
+#minimize{ Distance, D, S: slotAssignment(D, S, R), routeDistance(R, Distance) }.
+"""
+
+
+def _statements():
+    statements = []
+    parse_string(PROGRAM, statements.append)
+    return add_cube_rule(statements)
+
+
+def _single_process_optimum():
+    ctrl = clingo.Control(["--opt-mode=opt", "--warn=none"])
+    ctrl.add("base", [], PROGRAM)
+    ctrl.ground([("base", [])])
+    costs = []
+    ctrl.solve(on_model=lambda model: costs.append(list(model.cost)))
+    return costs[-1]
+
+
+def _coordinator(**options):
+    statements = _statements()
+    ctrl = clingo.Control(["--warn=none"])
+    ctrl.add("base", [], "\n".join(str(statement) for statement in statements))
+    ctrl.ground([("base", [])])
+    cubes = enumerate_cubes(ctrl.symbolic_atoms, 2)
+    setup = worker_setup(statements, extra_program="#show slotAssignment/3.", arguments=["--parallel-mode=1"])
+    return Coordinator(cubes, setup, authkey=b"test", **options)
+
+
+def _run(coordinator, workers):
+    processes = start_local_workers(coordinator.address, b"test", workers)
+    best = coordinator.run(time_limit=120)
+    for process in processes:
+        process.join(timeout=10)
+        if process.is_alive():
+            process.terminate()
+    return best
+
+
+def test_workers_search_every_cube_to_the_optimum():
+    coordinator = _coordinator(cube_time=0.5)
+    best = _run(coordinator, 2)
+    assert coordinator.exhausted == len(coordinator.cubes)
+    assert best["optimal"]
+    assert best["cost"] == _single_process_optimum()
+
+
+def test_cube_of_a_worker_that_drops_is_searched_by_another():
+    coordinator = _coordinator()
+    received = []
+
+    def drop_mid_cube():
+        with Client(coordinator.address, authkey=b"test") as conn:
+            conn.recv()
+            conn.send(("ready",))
+            received.append(conn.recv())
+        # Gone without reporting the cube done
+
+    # Connects and asks for work long before a real worker has ground the program
+    dropper = threading.Thread(target=drop_mid_cube)
+    dropper.start()
+    best = _run(coordinator, 1)
+    dropper.join()
+    assert received and received[0][0] == "cube"
+    assert coordinator.exhausted == len(coordinator.cubes)
+    assert best["cost"] == _single_process_optimum()
@@ -0,0 +1,76 @@
+import clingo
+import pytest
+
+from run_scheduler.cache import prepare
+from run_scheduler.domain import make_standard_func_ctx
+from run_scheduler.interactive import SketchShell, parse_sketch
+from run_scheduler.program import add_program, parse_season
+from run_scheduler.schedule import DECISION_SIGNATURES, extract_schedule, index_instance
+
+
+@pytest.fixture
+def shell(dataset, tmp_path):
+    facts = prepare(dataset["routes_table"], dataset["routes_dir"], dataset["exchanges"], tmp_path,
+                    distance_precision=2, duration_precision=0)["facts_path"]
+    ctrl = clingo.Control(["--warn=none"])
+    add_program(ctrl, parse_sketch(parse_season("synthetic", dataset["season"])), facts, shown=DECISION_SIGNATURES)
+    ctrl.ground([("base", [])], context=make_standard_func_ctx())
+    saved = []
+    shell = SketchShell(ctrl, index_instance(ctrl.symbolic_atoms, 2), save=saved.append)
+    shell.saved = saved
+    return shell
+
+
+def _solve(shell):
+    shell.last = None
+    shell.onecmd("solve")
+    return shell.last and extract_schedule(shell.last["atoms"], shell.instance)
+
+
+def test_sketch_edits_constrain_the_next_solve(shell):
+    first = _solve(shell)
+    assert shell.last["optimal"]
+    original_cost = shell.last["cost"]
+
+    shell.onecmd("pin 1 1 R0")
+    assert _solve(shell)[0]["route_id"][0] == "R0"
+    shell.onecmd("unpin 1")
+
+    banned = first[0]["start_exchange"][0]
+    shell.onecmd(f"ban {banned}")
+    schedule = _solve(shell)
+    assert schedule and all(banned not in day["start_exchange"] + day["end_exchange"] for day in schedule)
+    shell.onecmd(f"unban {banned}")
+
+    assert sum(first[0]["distance_mi"]) < 14
+    shell.onecmd("range 1 14 16")
+    schedule = _solve(shell)
+    assert schedule and 14 <= sum(schedule[0]["distance_mi"]) <= 16
+
+    # Dropping every edit gets back to the season's own optimum
+    shell.onecmd("unrange 1")
+    _solve(shell)
+    assert shell.last["cost"] == original_cost and not (shell.pins or shell.bans or shell.ranges)
+
+
+def test_infeasible_sketch_and_bad_edits_are_reported(shell, capsys):
+    shell.onecmd("pin 1 1 R5")
+    assert _solve(shell) is None
+    assert "No schedule satisfies the sketch" in capsys.readouterr().out
+    shell.onecmd("unpin all")
+    for command, message in [("pin 9 1 R1", "No day 9"), ("ban nowhere", "No route starts or ends"),
+                             ("range 1 5 99", "bounds outside"), ("unrange 2", "has no range"), ("pin 1 x R1", "")]:
+        shell.onecmd(command)
+        output = capsys.readouterr().out
+        assert output.startswith("*** ") and message in output
+    assert not (shell.pins or shell.bans or shell.ranges)
+
+
+def test_save_uses_the_last_schedule(shell):
+    shell.onecmd("save")
+    assert not shell.saved
+    _solve(shell)
+    shell.onecmd("save")
+    shell.onecmd("save mine")
+    assert [record["file_name"] for record in shell.saved] == ["sketch_1", "mine"]
+    assert shell.saved[0]["atoms"] == shell.last["atoms"]
@@ -0,0 +1,68 @@
+import clingo
+import pytest
+
+from benchmarks.synthetic import generate_dataset
+from run_scheduler.cache import prepare
+from run_scheduler.domain import make_standard_func_ctx
+from run_scheduler.lns import LargeNeighborhoodSearch
+from run_scheduler.program import add_program, parse_season
+from run_scheduler.schedule import DECISION_SIGNATURES, extract_schedule, index_instance
+
+
+@pytest.fixture(scope="module")
+def season(tmp_path_factory):
+    out_dir = tmp_path_factory.mktemp("lns")
+    paths = generate_dataset(out_dir, routes=40, exchanges=8, days=6, points_per_mile=5)
+    facts = prepare(paths["routes_table"], paths["routes_dir"], paths["exchanges"], out_dir / "cache",
+                    distance_precision=2, duration_precision=0)["facts_path"]
+    return paths["season"], facts
+
+
+def _search(season, **options):
+    season_file, facts = season
+    ctrl = clingo.Control(["--warn=none"])
+    add_program(ctrl, parse_season("synthetic", season_file), facts, shown=DECISION_SIGNATURES)
+    ctrl.ground([("base", [])], context=make_standard_func_ctx())
+    return LargeNeighborhoodSearch(ctrl, index_instance(ctrl.symbolic_atoms, 2), **options)
+
+
+def _days(atoms):
+    days = {}
+    for atom in atoms:
+        days.setdefault(atom.arguments[0].number, set()).add(str(atom))
+    return days
+
+
+def test_steps_only_change_the_freed_days(season):
+    search = _search(season, neighborhood_size=2, iteration_time_limit=0.5)
+    assert search.start()
+    for _ in range(4):
+        before = _days(search.best["atoms"])
+        kind, free, improved = search.step()
+        after = _days(search.best["atoms"])
+        assert all(before.get(day) == after.get(day) for day in search.days if day not in free)
+        if kind == "window":
+            assert free == set(range(min(free), max(free) + 1))
+
+
+def test_improvements_are_strict_and_schedules_stay_feasible(season):
+    improvements = []
+    search = _search(season, neighborhood_size=2, iteration_time_limit=0.5, on_improvement=improvements.append)
+    best = search.run(iterations=8)
+    costs = [record["cost"] for record in improvements]
+    assert costs == sorted(costs, reverse=True) and len(set(map(tuple, costs))) == len(costs)
+    assert best is improvements[-1] and search.initial is improvements[0]
+    schedule = extract_schedule(best["atoms"], search.instance)
+    assert len(schedule) == 6
+    for day in schedule:
+        lower, upper = day["distance_range"]
+        assert lower <= sum(day["distance_mi"]) <= upper
+
+
+def test_infeasible_starting_schedule_is_solved_from_scratch(season, capsys):
+    search = _search(season, iteration_time_limit=1.0)
+    # The same route on two days isn't allowed
+    start = [clingo.parse_term(atom) for atom in ['slotAssignment(1,1,"R1")', 'slotAssignment(2,1,"R1")']]
+    assert search.start(start)
+    assert "solving from scratch" in capsys.readouterr().out
+    assert search.best is search.initial
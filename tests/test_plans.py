@@ -0,0 +1,86 @@
+import clingo
+
+from run_scheduler.domain import make_standard_func_ctx
+from run_scheduler.plans import build_plans
+from run_scheduler.program import add_program, parse_season
+from run_scheduler.schedule import DECISION_SIGNATURES
+
+# Three exchanges, and routes between them that chain into two-route days
+FACTS = """
+route("R1", "Route 1", "A", "B"). routeDistance("R1", 6).
+route("R2", "Route 2", "B", "C"). routeDistance("R2", 5).
+route("R3", "Route 3", "B", "A"). routeDistance("R3", 7).
+route("R4", "Route 4", "C", "C"). routeDistance("R4", 12).
+route("R5", "Route 5", "A", "A"). routeDistance("R5", 11).
+route("R6", "Route 6", "C", "A"). routeDistance("R6", 4).
+"""
+
+SEASON = """
+day(1..2).
+daySlot(1..2).
+objective(1, "exchange-diversity").
+
+0{ slotAssignment(D, S, R): route(R) }1 :- day(D), daySlot(S).
+
+:- day(D), #count{S: slotAssignment(D, S, R)} < 1.
+:- slotAssignment(D, S, R1), slotAssignment(D, S, R2), R1 != R2, day(D).
+:- IndexCount != MaxIndex, day(D), IndexCount=#count{S: slotAssignment(D, S, R), daySlot(S)},  MaxIndex=#max{S: slotAssignment(D, S, R), daySlot(S)}.
+:- slotAssignment(D1, _, R), slotAssignment(D2, _, R), D1 != D2.
+:- slotAssignment(D, S1, R), slotAssignment(D, S2, R), S1 != S2.
+:- dayDistRange(D, Min, Max), Total = #sum{Distance, R: routeDistance(R, Distance), slotAssignment(D, S, R), daySlot(S)}, Total > Max, day(D).
+:- dayDistRange(D, Min, Max), Total = #sum{Distance, R: routeDistance(R, Distance), slotAssignment(D, S, R), daySlot(S)}, Total < Min, day(D).
+:- slotAssignment(D, S1, R1), slotAssignment(D, S2, R2), S2 = S1 + 1, R1End != R2Start, route(R1, _, _, R1End), route(R2, _, R2Start, _).
+"""
+
+
+def _season(tmp_path, extra):
+    facts_path = tmp_path / "facts.lp"
+    facts_path.write_text(FACTS)
+    season_path = tmp_path / "season.lp"
+    season_path.write_text(SEASON + extra)
+    return parse_season(None, season_path), facts_path
+
+
+def _schedules(statements, facts_path, plan_facts=None):
+    """
+    Every schedule the program allows, as sets of slotAssignment/3 atoms.
+    """
+    ctrl = clingo.Control(["--models=0", "--opt-mode=ignore", "--warn=none"])
+    add_program(ctrl, statements, facts_path, shown=DECISION_SIGNATURES)
+    if plan_facts:
+        ctrl.add("base", [], plan_facts)
+    ctrl.ground([("base", [])], context=make_standard_func_ctx())
+    schedules = []
+    ctrl.solve(on_model=lambda model: schedules.append(frozenset(model.symbols(shown=True))))
+    return schedules
+
+
+def _assert_plans_match(tmp_path, extra):
+    statements, facts_path = _season(tmp_path, extra)
+    expected = _schedules(statements, facts_path)
+    rewritten, plan_facts, report = build_plans(statements, facts_path, context=make_standard_func_ctx())
+    schedules = _schedules(rewritten, facts_path, plan_facts)
+    assert expected
+    assert sorted(map(sorted, schedules)) == sorted(map(sorted, expected))
+    return report
+
+
+def test_pinned_slot_assignment_is_respected(tmp_path):
+    _assert_plans_match(tmp_path, 'dayDistRange(1..2, 10, 14).\nslotAssignment(1, 1, "R1").')
+
+
+def test_conflicting_pins_leave_day_without_plan(tmp_path):
+    statements, facts_path = _season(tmp_path, 'dayDistRange(1..2, 10, 14).\n'
+                                               'slotAssignment(1, 1, "R1"). slotAssignment(1, 1, "R5").')
+    _, _, report = build_plans(statements, facts_path, context=make_standard_func_ctx())
+    assert report["infeasible_days"] == [1]
+
+
+def test_day_without_range_takes_any_chain(tmp_path):
+    report = _assert_plans_match(tmp_path, "dayDistRange(1, 10, 14).")
+    assert report["infeasible_days"] == []
+
+
+def test_pin_depending_on_choices_keeps_constraints(tmp_path):
+    _assert_plans_match(tmp_path, 'dayDistRange(1..2, 10, 14).\n'
+                                  'slotAssignment(2, 1, "R4") :- slotAssignment(1, 1, "R1").')
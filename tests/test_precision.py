@@ -0,0 +1,51 @@
+import clingo
+from clingo.ast import parse_string
+
+from run_scheduler.cache import prepare
+from run_scheduler.domain import make_standard_func_ctx
+from run_scheduler.precision import solve_coarse, widen_day_ranges
+from run_scheduler.program import add_program, parse_season
+from run_scheduler.schedule import DECISION_SIGNATURES
+
+
+def _facts(dataset, tmp_path, precision):
+    return prepare(dataset["routes_table"], dataset["routes_dir"], dataset["exchanges"], tmp_path,
+                   distance_precision=precision, duration_precision=0)["facts_path"]
+
+
+def _control(statements, facts):
+    ctrl = clingo.Control(["--warn=none"])
+    add_program(ctrl, statements, facts, shown=DECISION_SIGNATURES)
+    ctrl.ground([("base", [])], context=make_standard_func_ctx())
+    return ctrl
+
+
+def test_upper_bounds_grow_by_the_number_of_slots():
+    statements = []
+    parse_string("daySlot(1..3). dayDistRange(1, 10, 20). dayDistRange(D, 5, 8) :- D = 2..3.", statements.append)
+    ctrl = _control(widen_day_ranges(statements), None)
+    ranges = sorted(tuple(argument.number for argument in atom.symbol.arguments)
+                    for atom in ctrl.symbolic_atoms.by_signature("dayDistRange", 3))
+    assert ranges == [(1, 10, 23), (2, 5, 11), (3, 5, 11)]
+
+
+def test_fine_schedules_stay_feasible_at_coarse_precision(dataset, tmp_path):
+    statements = parse_season("synthetic", dataset["season"])
+    fine = _control(statements, _facts(dataset, tmp_path, 2))
+    fine.configuration.solve.models = 0
+    schedules = []
+    fine.solve(on_model=lambda model: schedules.append(model.symbols(shown=True)))
+    assert schedules
+
+    coarse = _control(widen_day_ranges(statements), _facts(dataset, tmp_path, 0))
+    literals = {atom.symbol: atom.literal for atom in coarse.symbolic_atoms.by_signature("slotAssignment", 3)}
+    for atoms in schedules:
+        assigned = set(atoms)
+        assumptions = [literal if symbol in assigned else -literal for symbol, literal in literals.items()]
+        assert coarse.solve(assumptions=assumptions).satisfiable
+
+
+def test_coarse_stage_finds_an_optimal_schedule(dataset, tmp_path):
+    atoms, report = solve_coarse(parse_season("synthetic", dataset["season"]), _facts(dataset, tmp_path, 0), [], 30)
+    assert atoms and all(atom.match("slotAssignment", 3) for atom in atoms)
+    assert report["optimal"] and report["cost"]
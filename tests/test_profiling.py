@@ -0,0 +1,54 @@
+import json
+
+import clingo
+from clingo.ast import parse_string
+
+from run_scheduler.profiling import Profiler, rule_sizes
+
+PROGRAM = """
+day(1..3). route(a; b; c; d).
+{ assign(R, D) : day(D) } = 1 :- route(R).
+:- assign(R, D), assign(S, D), R < S, D > 1.
+:~ assign(R, D). [D@2, R]
+busy(D) :- day(D), #count { R : assign(R, D) } > 1.
+"""
+
+
+def _statements():
+    statements = []
+    parse_string(PROGRAM, statements.append)
+    return statements
+
+
+def test_profiler_reports_the_ground_program(tmp_path):
+    profiler = Profiler()
+    ctrl = clingo.Control()
+    ctrl.register_observer(profiler.observer)
+    ctrl.add("base", [], PROGRAM)
+    with profiler.stage("ground"):
+        ctrl.ground([("base", [])])
+    profiler.record_ground_program(ctrl, _statements())
+    ctrl.solve()
+    profiler.record_statistics(ctrl.statistics)
+    profiler.save(tmp_path / "profile.json")
+
+    report = json.loads((tmp_path / "profile.json").read_text())
+    assert set(report["timings"]) == {"ground", "profile_rules"}
+    assert report["ground_program"]["choice_rules"] >= 1
+    assert report["ground_program"]["minimize_literals_by_priority"] == {"2": 12}
+    atoms = {count["signature"]: count for count in report["atoms"]}
+    assert atoms["day/1"] == {"signature": "day/1", "atoms": 3, "facts": 3}
+    assert atoms["assign/2"]["atoms"] == 12 and atoms["assign/2"]["facts"] == 0
+    assert report["statistics"]["summary"]["models"]["enumerated"] >= 1
+
+
+def test_rule_sizes_count_body_bindings():
+    ctrl = clingo.Control()
+    ctrl.add("base", [], PROGRAM)
+    ctrl.ground([("base", [])])
+    sizes = {entry["statement"].split(" :- ")[0]: entry for entry in rule_sizes(_statements(), ctrl.symbolic_atoms)}
+    # 4 * 4 routes on the same day, halved by R < S, over the two days after the first
+    assert sizes["#false"]["ground_instances"] == 12
+    assert sizes["busy(D)"]["ground_instances"] == 3
+    assert sizes["busy(D)"]["aggregate_elements"] == [12]
+    assert all(entry["location"].startswith("<string>:") for entry in sizes.values())
@@ -0,0 +1,32 @@
+from clingo.ast import parse_string
+
+from run_scheduler.program import referenced_predicates
+from run_scheduler.routes import load_dataset, routes_to_symbols
+
+
+def _referenced(program):
+    statements = []
+    parse_string(program, statements.append)
+    return referenced_predicates(statements)
+
+
+def test_body_atoms_are_referenced_and_head_only_atoms_are_not():
+    signatures = _referenced("""
+        long(R) :- routeDistance(R, D), D > 10, not -short(R).
+        { assign(R, Day) : route(R, _, _, _), day(Day) } = 1 :- slot(Day; Night).
+        busy :- #count { R : surface(R, "trail") } > 2, weekend.
+        :~ assign(R, D), lastRun(R, I). [I@1, R, D]
+        #show ascent/2.
+    """)
+    assert {("routeDistance", 2), ("short", 1), ("route", 4), ("day", 1), ("slot", 1), ("surface", 2),
+            ("weekend", 0), ("assign", 2), ("lastRun", 2), ("ascent", 2)} <= signatures
+    assert ("long", 1) not in signatures and ("busy", 0) not in signatures
+
+
+def test_facts_are_limited_to_the_referenced_families(dataset):
+    legs, exchanges = load_dataset(dataset["routes_table"], dataset["routes_dir"], dataset["exchanges"])
+    everything = routes_to_symbols(legs, exchanges, 2, 0)
+    wanted = {("route", 4), ("lastRun", 2)}
+    filtered = routes_to_symbols(legs, exchanges, 2, 0, predicates=wanted)
+    assert filtered == [fact for fact in everything if (fact.name, len(fact.arguments)) in wanted]
+    assert {fact.name for fact in filtered} == {"route", "lastRun"}
@@ -0,0 +1,58 @@
+import clingo
+
+from run_scheduler.resume import add_warm_start, cost_bound, load_checkpoint
+from run_scheduler.solution_log import SolutionLog
+
+INSTANCE = {"objectives": {3: "exchange-diversity", 2: "split-route-mix", 1: "route-recency"}}
+
+
+def test_bound_is_in_priority_order():
+    costs = {"route-recency": 200, "exchange-diversity": -20, "split-route-mix": 4}
+    assert cost_bound(INSTANCE, costs) == [-20, 4, 200]
+
+
+def test_missing_objective_leaves_cost_unbounded():
+    assert cost_bound(INSTANCE, {"exchange-diversity": -20, "route-recency": 200}) is None
+
+
+def test_unknown_objective_leaves_cost_unbounded():
+    assert cost_bound(INSTANCE, {"exchange-diversity": -20, "split-route-mix": 4, "reachability": 50}) is None
+
+
+def test_objectives_sharing_a_name_leave_cost_unbounded():
+    instance = {"objectives": {3: "exchange-diversity", 2: "exchange-diversity", 1: "route-recency"}}
+    assert cost_bound(instance, {"exchange-diversity": -20, "route-recency": 200}) is None
+
+
+def test_costs_saved_at_another_precision_leave_cost_unbounded():
+    costs = {"route-recency": 200, "exchange-diversity": -20, "split-route-mix": 4}
+    saved = {"distance_precision": 2.0, "duration_precision": 0.0}
+    assert cost_bound(INSTANCE, costs, saved, saved) == [-20, 4, 200]
+    assert cost_bound(INSTANCE, costs, {**saved, "distance_precision": 0.0}, saved) is None
+
+
+def test_checkpoint_keeps_the_precisions_it_was_saved_at(tmp_path):
+    with SolutionLog(tmp_path, "a") as log:
+        log.append({"costs": {"exchange-diversity": -20}, "optimal": False, "atoms": ['slotAssignment(1,1,"R1")'],
+                    "distance_precision": 2.0, "duration_precision": 0.0})
+    atoms, costs, precisions = load_checkpoint(tmp_path)
+    assert [str(atom) for atom in atoms] == ['slotAssignment(1,1,"R1")']
+    assert costs == {"exchange-diversity": -20}
+    assert precisions == {"distance_precision": 2.0, "duration_precision": 0.0}
+
+
+def _first_model(ctrl):
+    with ctrl.solve(yield_=True) as handle:
+        return sorted(str(atom) for atom in next(iter(handle)).symbols(shown=True))
+
+
+def test_warm_start_makes_the_previous_solution_the_first_model():
+    ctrl = clingo.Control(["--heuristic=Domain"])
+    ctrl.add("base", [], "{ pick(1..6) } = 2. kept(1). #show pick/1.")
+    ctrl.ground([("base", [])])
+    seeded = [clingo.parse_term(atom) for atom in ["pick(4)", "pick(6)", "pick(9)"]]
+    # pick(9) isn't in the ground program
+    assert add_warm_start(ctrl, seeded, [("pick", 1)]) == 2
+    assert _first_model(ctrl) == ["pick(4)", "pick(6)"]
+    add_warm_start(ctrl, [clingo.parse_term("pick(3)"), clingo.parse_term("pick(5)")], [("pick", 1)], priority=2)
+    assert _first_model(ctrl) == ["pick(3)", "pick(5)"]
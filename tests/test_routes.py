@@ -0,0 +1,82 @@
+import json
+
+import numpy as np
+import pytest
+
+from run_scheduler.cache import prepare
+from run_scheduler.distances import summarize_points
+from run_scheduler.routes import _precision_numbers, load_dataset, load_routes_from_dir, routes_to_facts, \
+    routes_to_symbols, summarize_route_file
+
+
+def _route_file(tmp_path, coordinates):
+    path = tmp_path / "R1.geojson"
+    path.write_text(json.dumps({
+        "properties": {"name": "Route 1", "id": "R1", "distance_mi": 5.0, "ascent_m": 10, "descent_m": 10,
+                       "start": "A", "end": "B", "surface": "road"},
+        "geometry": {"coordinates": coordinates},
+    }))
+    return path
+
+
+def test_summarize_points():
+    centroid, bbox, count = summarize_points([[-122.0, 47.0, 10], [-122.2, 47.2, 12]])
+    assert centroid == pytest.approx((47.1, -122.1))
+    assert bbox == pytest.approx((47.0, -122.2, 47.2, -122.0))
+    assert count == 2
+
+
+@pytest.mark.parametrize("coordinates", [[], [[-122.0, 47.0], [-122.1]], [[-122.0, 47.0], [-122.1, 47.1, 5, [1]]]])
+def test_unusable_track_is_rejected(coordinates):
+    with pytest.raises(ValueError, match="track"):
+        summarize_points(coordinates)
+
+
+@pytest.mark.parametrize("coordinates", [[], [[-122.0, 47.0, 10], [-122.1, 47.1]]])
+def test_route_with_unusable_track_keeps_its_metadata_without_a_centroid(tmp_path, coordinates, capsys):
+    route = summarize_route_file(_route_file(tmp_path, coordinates))
+    assert route["id"] == "R1"
+    assert "centroid" not in route and "cells" not in route
+    assert "unusable track" in capsys.readouterr().out
+
+
+def test_non_finite_distances_are_not_converted():
+    assert _precision_numbers([1.234, 2.0], 2) == [124, 200]
+    with pytest.raises(ValueError):
+        _precision_numbers([1.0, np.nan], 2)
+
+
+def test_process_pool_summaries_match_the_serial_ones(dataset, tmp_path):
+    broken = tmp_path / "broken.geojson"
+    broken.write_text("{")
+    for path in dataset["routes_dir"].glob("*.geojson"):
+        (tmp_path / path.name).write_bytes(path.read_bytes())
+    routes = load_routes_from_dir(tmp_path, max_workers=2)
+    serial = [summarize_route_file(path) for path in sorted(dataset["routes_dir"].glob("*.geojson"))]
+    assert [route["id"] for route in routes] == [route["id"] for route in serial]
+    for route, expected in zip(routes, serial):
+        assert route["centroid"] == expected["centroid"] and route["bbox"] == expected["bbox"]
+        assert (route["cells"] == expected["cells"]).all()
+
+
+def test_dataset_legs_get_track_summaries(dataset):
+    legs, exchanges = load_dataset(dataset["routes_table"], dataset["routes_dir"], dataset["exchanges"])
+    assert legs and exchanges
+    assert all({"centroid", "bbox", "point_count", "cells"} <= leg.keys() for leg in legs)
+    assert all(leg["start_exchange"] in exchanges for leg in legs)
+
+
+@pytest.mark.parametrize("options", [{}, {"pair_neighbors": 3}, {"pair_radius": 2.0},
+                                     {"predicates": {("route", 4), ("routeOverlap", 3), ("lastRun", 2)}}])
+def test_facts_and_symbols_give_the_same_program(dataset, options):
+    legs, exchanges = load_dataset(dataset["routes_table"], dataset["routes_dir"], dataset["exchanges"])
+    facts = routes_to_facts(legs, exchanges, 2, 0, **options)
+    symbols = routes_to_symbols(legs, exchanges, 2, 0, **options)
+    assert [fact.raw for fact in facts] == symbols
+
+
+def test_snapshots_built_from_facts_and_symbols_are_identical(dataset, tmp_path):
+    paths = [prepare(dataset["routes_table"], dataset["routes_dir"], dataset["exchanges"], tmp_path / build.__name__,
+                     distance_precision=2, duration_precision=0, build_facts=build)["facts_path"]
+             for build in (routes_to_facts, routes_to_symbols)]
+    assert paths[0].read_text() == paths[1].read_text()
@@ -0,0 +1,38 @@
+import clingo
+
+from run_scheduler.schedule import costs_by_objective, extract_schedule, index_instance, solution_hash
+
+FACTS = """
+route("R1","One","X1","X2"). route("R2","Two","X2","X3"). route("R3","Three","X3","X1").
+routeDistance("R1",450). routeDistance("R2",1200). routeDistance("R3",300).
+dayDistRange(1,1000,2000). dayDistRange(2,200,500).
+objective(2,"distance"). objective(1,"variety").
+"""
+ATOMS = [clingo.parse_term(atom) for atom in
+         ['slotAssignment(1,2,"R1")', 'slotAssignment(2,1,"R3")', 'slotAssignment(1,1,"R2")']]
+
+
+def _instance():
+    ctrl = clingo.Control()
+    ctrl.add("base", [], FACTS)
+    ctrl.ground([("base", [])])
+    return index_instance(ctrl.symbolic_atoms, 2)
+
+
+def test_schedule_orders_each_day_by_slot():
+    schedule = extract_schedule(ATOMS + [clingo.parse_term("other(1)")], _instance())
+    assert schedule == [
+        {"route_id": ["R2", "R1"], "route_name": ["Two", "One"], "start_exchange": ["X2", "X1"],
+         "end_exchange": ["X3", "X2"], "distance_mi": [12.0, 4.5], "distance_range": (10.0, 20.0)},
+        {"route_id": ["R3"], "route_name": ["Three"], "start_exchange": ["X3"], "end_exchange": ["X1"],
+         "distance_mi": [3.0], "distance_range": (2.0, 5.0)},
+    ]
+
+
+def test_costs_are_named_by_objective():
+    assert costs_by_objective(_instance(), [2, 1, 0], [40, 3, 7]) == {"distance": 40, "variety": 3, "0": 7}
+
+
+def test_solution_hash_ignores_atom_order():
+    assert solution_hash(ATOMS) == solution_hash(list(reversed(ATOMS)))
+    assert solution_hash(ATOMS) != solution_hash(ATOMS[:2])
@@ -0,0 +1,48 @@
+from run_scheduler.solution_log import SolutionLog
+
+
+def _log(tmp_path, records):
+    with SolutionLog(tmp_path, "a") as log:
+        for costs, optimal in records:
+            log.append({"costs": dict(zip(["exchange-diversity", "route-recency"], costs)), "optimal": optimal})
+    return SolutionLog(tmp_path)
+
+
+def test_best_is_lexicographically_smallest(tmp_path):
+    # Like a --staged run whose later stage started from a worse schedule
+    with _log(tmp_path, [([-18, 90], False), ([-20, 80], False), ([-19, 10], False)]) as log:
+        assert log.best_id() == 1
+
+
+def test_optimal_is_preferred(tmp_path):
+    with _log(tmp_path, [([-20, 80], False), ([-19, 10], True), ([-20, 70], False)]) as log:
+        assert log.best_id() == 1
+
+
+def test_empty_log_has_no_best(tmp_path):
+    with _log(tmp_path, []) as log:
+        assert log.best_id() is None
+        assert log.best() is None
+
+
+def test_appended_record_reads_back_through_the_same_log(tmp_path):
+    with SolutionLog(tmp_path, "a") as log:
+        first = log.append({"costs": {"exchange-diversity": -18}, "optimal": False})
+        assert log.read(first)["costs"] == {"exchange-diversity": -18}
+        # A read in between mustn't make the next append overwrite anything
+        second = log.append({"costs": {"exchange-diversity": -20}, "optimal": True})
+        assert [log.read(model_id)["id"] for model_id in (first, second)] == [0, 1]
+        assert log.read(second)["costs"] == {"exchange-diversity": -20}
+
+
+def test_best_carries_over_when_a_log_is_appended_to_again(tmp_path):
+    _log(tmp_path, [([-20, 80], False), ([-18, 10], False)]).close()
+    with _log(tmp_path, [([-19, 0], False)]) as log:
+        assert log.best_id() == 0
+
+
+def test_best_is_found_from_the_index_alone(tmp_path):
+    with _log(tmp_path, [([-18, 90], False), ([-20, 80], False), ([-19, 10], False)]) as log:
+        # Records other than the best one are never read
+        log.read = None
+        assert log.best_id() == 1
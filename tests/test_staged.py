@@ -0,0 +1,62 @@
+import clingo
+import pytest
+
+from run_scheduler.cache import prepare
+from run_scheduler.domain import make_standard_func_ctx
+from run_scheduler.program import add_program, parse_season
+from run_scheduler.schedule import DECISION_SIGNATURES, index_instance
+from run_scheduler.staged import StagedOptimization, stage_objectives
+
+
+@pytest.fixture(scope="module")
+def facts(dataset, tmp_path_factory):
+    return prepare(dataset["routes_table"], dataset["routes_dir"], dataset["exchanges"],
+                   tmp_path_factory.mktemp("cache"), distance_precision=2, duration_precision=0)["facts_path"]
+
+
+def _control(dataset, facts, staged):
+    statements = parse_season("synthetic", dataset["season"])
+    ctrl = clingo.Control(["--warn=none", "--heuristic=Domain"])
+    add_program(ctrl, stage_objectives(statements) if staged else statements, facts, shown=DECISION_SIGNATURES)
+    ctrl.ground([("base", [])], context=make_standard_func_ctx())
+    return ctrl
+
+
+def _optimum(dataset, facts):
+    ctrl = _control(dataset, facts, staged=False)
+    models = []
+    result = ctrl.solve(on_model=lambda model: models.append((list(model.priority), list(model.cost))))
+    assert result.exhausted
+    return models[-1]
+
+
+def test_stages_reach_the_lexicographic_optimum(dataset, facts):
+    priorities, costs = _optimum(dataset, facts)
+    ctrl = _control(dataset, facts, staged=True)
+    improvements = []
+    search = StagedOptimization(ctrl, index_instance(ctrl.symbolic_atoms, 2), on_improvement=improvements.append)
+    assert search.priorities == priorities
+    best = search.run()
+    assert best["optimal"] and best["cost"] == costs
+    assert [stage["priority"] for stage in search.stages] == priorities
+    assert all(stage["optimal"] and stage["bound"] == stage["cost"] for stage in search.stages)
+    assert search.bounds == dict(zip(priorities, costs))
+    # Later stages never lose what earlier ones gained
+    for earlier, later in zip(improvements, improvements[1:]):
+        assert later["cost"] <= earlier["cost"]
+
+
+def test_tolerance_loosens_the_bounds(dataset, facts):
+    ctrl = _control(dataset, facts, staged=True)
+    search = StagedOptimization(ctrl, index_instance(ctrl.symbolic_atoms, 2), tolerance=0.5)
+    best = search.run()
+    for stage in search.stages:
+        assert stage["bound"] >= stage["cost"] + abs(stage["cost"]) // 2
+        assert StagedOptimization._cost_at(best, stage["priority"]) <= search.bounds[stage["priority"]]
+
+
+def test_out_of_time_before_any_stage(dataset, facts, capsys):
+    ctrl = _control(dataset, facts, staged=True)
+    search = StagedOptimization(ctrl, index_instance(ctrl.symbolic_atoms, 2))
+    assert search.run(time_limit=0) is None
+    assert "Out of time before" in capsys.readouterr().out and not search.stages
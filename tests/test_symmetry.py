@@ -0,0 +1,38 @@
+from run_scheduler.domain import make_standard_func_ctx
+from run_scheduler.program import parse_season
+from run_scheduler.symmetry import interchangeable_days
+
+FACTS = """
+route("R1", "Route 1", "A", "B"). routeDistance("R1", 6).
+route("R2", "Route 2", "B", "C"). routeDistance("R2", 5).
+route("R3", "Route 3", "B", "A"). routeDistance("R3", 7).
+route("R4", "Route 4", "C", "C"). routeDistance("R4", 12).
+"""
+
+SEASON = """
+day(1..4).
+daySlot(1..2).
+dayDistRange(1..4, 5, 14).
+objective(1, "exchange-diversity").
+
+0{ slotAssignment(D, S, R): route(R) }1 :- day(D), daySlot(S).
+:- slotAssignment(D1, _, R), slotAssignment(D2, _, R), D1 != D2.
+"""
+
+
+def _classes(tmp_path, extra=""):
+    facts_path = tmp_path / "facts.lp"
+    facts_path.write_text(FACTS)
+    season_path = tmp_path / "season.lp"
+    season_path.write_text(SEASON + extra)
+    classes, _ = interchangeable_days(parse_season(None, season_path), facts_path, context=make_standard_func_ctx())
+    return [[day.number for day in days] for days in classes]
+
+
+def test_days_with_same_facts_are_interchangeable(tmp_path):
+    assert _classes(tmp_path) == [[1, 2, 3, 4]]
+
+
+def test_day_keyed_fact_joined_on_a_day_sets_its_day_apart(tmp_path):
+    extra = 'startAt(3, "B").\n:- startAt(D, E), slotAssignment(D, 1, R), not routeStart(R, E).'
+    assert _classes(tmp_path, extra) == [[1, 2, 4]]
@@ -0,0 +1,35 @@
+import clingo
+
+from benchmarks.synthetic import generate_dataset
+from run_scheduler.cache import prepare
+from run_scheduler.domain import make_standard_func_ctx
+from run_scheduler.program import add_program, parse_season
+from run_scheduler.schedule import DECISION_SIGNATURES, extract_schedule, index_instance
+
+
+def _files(out_dir):
+    return {path.relative_to(out_dir): path.read_bytes() for path in sorted(out_dir.rglob("*")) if path.is_file()}
+
+
+def test_datasets_are_reproducible_from_their_seed(tmp_path):
+    for name, seed in [("a", 1), ("b", 1), ("c", 2)]:
+        generate_dataset(tmp_path / name, routes=10, exchanges=4, days=2, seed=seed, points_per_mile=5)
+    assert _files(tmp_path / "a") == _files(tmp_path / "b")
+    assert _files(tmp_path / "a") != _files(tmp_path / "c")
+
+
+def test_generated_season_has_schedules_within_the_day_ranges(dataset, tmp_path):
+    facts = prepare(dataset["routes_table"], dataset["routes_dir"], dataset["exchanges"], tmp_path,
+                    distance_precision=2, duration_precision=0)["facts_path"]
+    ctrl = clingo.Control(["--warn=none"])
+    add_program(ctrl, parse_season("synthetic", dataset["season"]), facts, shown=DECISION_SIGNATURES)
+    ctrl.ground([("base", [])], context=make_standard_func_ctx())
+    instance = index_instance(ctrl.symbolic_atoms, 2)
+    schedules = []
+    result = ctrl.solve(on_model=lambda model: schedules.append(extract_schedule(model.symbols(shown=True), instance)))
+    assert result.satisfiable
+    schedule = schedules[-1]
+    assert len(schedule) == 3
+    for day in schedule:
+        lower, upper = day["distance_range"]
+        assert lower <= sum(day["distance_mi"]) <= upper
@@ -0,0 +1,74 @@
+import json
+import types
+
+import pytest
+
+from run_scheduler import telemetry
+from run_scheduler.telemetry import Telemetry
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = types.SimpleNamespace(now=0.0)
+    monkeypatch.setattr(telemetry, "time", types.SimpleNamespace(perf_counter=lambda: clock.now))
+    return clock
+
+
+def _lines(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_lines_are_written_at_the_interval(tmp_path, clock):
+    with Telemetry(tmp_path / "telemetry.jsonl", interval=10.0) as log:
+        for clock.now in (0.0, 4.0, 9.0, 10.0, 15.0, 21.0):
+            log.poll()
+            log.on_model([clock.now], [1])
+    lines = _lines(tmp_path / "telemetry.jsonl")
+    assert [line["elapsed"] for line in lines] == [0.0, 10.0, 21.0, 21.0]
+    assert lines[-1]["event"] == "end" and lines[-1]["models"] == 6
+
+
+def test_stall_is_flagged_once_and_stops_only_when_asked(tmp_path, clock):
+    log = Telemetry(tmp_path / "telemetry.jsonl", interval=100.0, stall_time=5.0, stop_on_stall=True)
+    log.on_model([10, 3], [2, 1])
+    clock.now = 4.0
+    # Worse at the lower priority, so not an improvement
+    log.on_model([10, 4], [2, 1])
+    assert not log.poll()
+    clock.now = 5.5
+    assert log.poll() and log.poll()
+    log.close()
+    lines = _lines(tmp_path / "telemetry.jsonl")
+    assert [line.get("event") for line in lines] == [None, "stall", "end"]
+    assert lines[1]["cost"] == {"2": 10, "1": 3} and lines[1]["since_improvement"] == 5.5
+    assert Telemetry(tmp_path / "other.jsonl", stall_time=5.0).poll() is False
+
+
+def test_improvements_and_new_stages_reset_the_stall(tmp_path, clock):
+    log = Telemetry(tmp_path / "telemetry.jsonl", interval=100.0, stall_time=5.0, stop_on_stall=True)
+    clock.now = 4.0
+    log.on_unsat([-20])
+    clock.now = 8.0
+    log.on_unsat([-15])
+    # A lower bound that went down isn't an improvement
+    log.on_unsat([-25])
+    clock.now = 12.0
+    assert not log.poll()
+    clock.now = 13.5
+    assert log.poll()
+    log.start_stage("exchange-diversity")
+    assert not log.poll() and log.cost is None and log.lower is None
+    log.close()
+    assert _lines(tmp_path / "telemetry.jsonl")[-2]["stage"] == "exchange-diversity"
+
+
+def test_counters_add_up_across_solve_calls(tmp_path, clock):
+    statistics = {"solving": {"solvers": {"conflicts": 10.0, "choices": 20.0, "restarts": 1.0}}}
+    with Telemetry(tmp_path / "telemetry.jsonl") as log:
+        log.read_statistics(statistics)
+        clock.now = 3.0
+        log.read_statistics(statistics)
+        clock.now = 4.0
+        line = log.line()
+    assert (line["conflicts"], line["choices"], line["restarts"]) == (20, 40, 2)
+    assert line["counters_age"] == 1.0
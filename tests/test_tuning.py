@@ -0,0 +1,52 @@
+import json
+import time
+
+from run_scheduler import tuning
+
+PORTFOLIO = [{"threads": 1, "mode": "split", "opt_strategy": "bb"}, {"threads": 1, "mode": "split", "opt_strategy": "usc"}]
+
+
+def test_nothing_is_saved_when_every_trial_fails(tmp_path, monkeypatch):
+    monkeypatch.setattr(tuning, "TUNING_DIR", tmp_path / "tuning")
+    facts_path = tmp_path / "facts.lp"
+    facts_path.write_text("")
+    # There's no such season, so grounding fails in every trial
+    assert tuning.tune("no-such-season", facts_path, 1.0, cores=1, portfolio=PORTFOLIO) is None
+    assert not (tmp_path / "tuning" / "no-such-season.json").exists()
+    assert tuning.load_tuned_config("no-such-season") is None
+
+
+def test_failed_trials_rank_last():
+    failed = {"config": PORTFOLIO[0], "error": "boom", "first_model": None, "optimum": None, "cost": None}
+    no_model = {"config": PORTFOLIO[1], "first_model": None, "optimum": None, "cost": None}
+    assert sorted([failed, no_model], key=tuning.trial_rank) == [no_model, failed]
+
+
+def test_race_saves_the_fastest_optimal_configuration(workspace):
+    out = tuning.tune("synthetic", workspace, 5.0, cores=1, portfolio=PORTFOLIO)
+    best, *others = out["trials"]
+    assert len(others) == 1 and best["optimum"] is not None
+    for trial in others:
+        # Anything that also proved an optimum found the same one, more slowly
+        if trial["optimum"] is not None:
+            assert trial["cost"] == best["cost"] and trial["optimum"] >= best["optimum"]
+    assert out["config"] == out["trials"][0]["config"]
+    assert json.loads((tuning.TUNING_DIR / "synthetic.json").read_text())["config"] == out["config"]
+    assert tuning.load_tuned_config("synthetic") == out["config"]
+
+
+def _timed(task):
+    start = time.time()
+    time.sleep(0.2)
+    return start, time.time()
+
+
+def test_packed_tasks_never_use_more_threads_than_there_are_cores():
+    tasks = [("a", 2), ("b", 1), ("c", 1), ("d", 3), ("e", 1)]
+    spans = {task: future.result() for task, future in
+             tuning.run_packed(_timed, tasks, lambda task: task[1], cores=2)}
+    assert set(spans) == set(tasks)
+    for task, (start, _) in spans.items():
+        running = [other for other, (other_start, other_end) in spans.items() if other_start <= start < other_end]
+        # Only a task with more threads than cores may run alone over the limit
+        assert sum(other[1] for other in running) <= max(2, task[1])
@@ -0,0 +1,47 @@
+import threading
+
+import pytest
+
+from run_scheduler.writer import SolutionWriter
+
+
+def test_every_submitted_record_is_written_in_order():
+    batches = []
+    with SolutionWriter(batches.append, max_pending=4, batch_size=3) as writer:
+        for record in range(20):
+            writer.submit(record)
+    assert [record for batch in batches for record in batch] == list(range(20))
+    assert all(1 <= len(batch) <= 3 for batch in batches)
+
+
+def test_submit_blocks_while_the_queue_is_full():
+    release = threading.Event()
+    written = []
+
+    def write(batch):
+        release.wait()
+        written.extend(batch)
+
+    writer = SolutionWriter(write, max_pending=1, batch_size=1)
+    writer.submit(0)
+    writer.submit(1)
+    blocked = threading.Thread(target=writer.submit, args=(2,))
+    blocked.start()
+    blocked.join(0.2)
+    # One record is being written and one is queued, so the third has to wait
+    assert blocked.is_alive()
+    release.set()
+    blocked.join()
+    writer.close()
+    assert written == [0, 1, 2]
+
+
+def test_write_errors_reach_the_solver_thread():
+    def write(batch):
+        raise OSError("disk full")
+
+    writer = SolutionWriter(write)
+    writer.submit(0)
+    with pytest.raises(RuntimeError) as info:
+        writer.close()
+    assert isinstance(info.value.__cause__, OSError)
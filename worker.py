@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+
+"""
+Join a `solve.py --listen` run as a worker: ground the program the coordinator sends and solve the cubes of the search
+space it hands out until it's done. Needs clingo and this repository, but not the route data.
+"""
+
+import argparse
+
+from run_scheduler.distributed import parse_address, run_worker
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("address", help="HOST:PORT or Unix socket path the coordinator listens on")
+    parser.add_argument("--authkey", required=True, help="The key the coordinator was started with")
+    parser.add_argument("--threads", type=int, help="Number of solver threads (default: 1)")
+    args = parser.parse_args()
+    run_worker(parse_address(args.address), args.authkey.encode(), threads=args.threads)